@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+仪表盘实时事件（/admin/dashboard/events/，Server-Sent Events）需要以 ASGI 方式部署才能保持长连接，
+例如：uvicorn container_management.asgi:application 或 daphne container_management.asgi:application。
+每个打开的仪表盘页面只占用一个连接与一个协程；WSGI 部署下该接口退化为浏览器定时重连的轮询。
 """
 
 import os
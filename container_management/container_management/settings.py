@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -63,8 +65,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                # 仪表盘统计数据，用于 simpleui 首页图表
-                'management.dashboard_context.dashboard_stats',
+                # 仪表盘统计数据不再作为全局 context processor 注册，
+                # 需要的视图显式合并 management.dashboard_context.dashboard_stats(request)
             ],
         },
     },
@@ -88,6 +90,30 @@ DATABASES = {
 }
 
 
+# Cache
+# 多个 worker 进程共享同一缓存（仪表板视图样本、权限缓存、自动补全结果等）。
+# 默认使用文件缓存；生产环境可通过环境变量切换为 Redis / Memcached，例如
+#   DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+# 文件缓存写满 MAX_ENTRIES（默认仅 300）后随机删除 1/CULL_FREQUENCY 的条目，且每次 set() 都要列目录，
+# 因此按实际键数（环形缓冲区、各用户权限版本、仪表板与自动补全结果）放宽上限；
+# 缓存中的值都允许丢失：权限版本与实时事件序号丢失后取新的时间基值，不会与旧值重复
+# 也可通过 DJANGO_CACHE_MAX_ENTRIES 调整
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get(
+            'DJANGO_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'container_management_cache')
+        ),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 20000)),
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
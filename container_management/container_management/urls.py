@@ -2,8 +2,16 @@ from django.contrib import admin
 from django.urls import path, re_path
 from django.views.generic import RedirectView
 
-from management.dashboard_views import admin_dashboard
-from management.views import aggregate_search
+from management.dashboard_views import admin_dashboard, dashboard_events
+from management.views import (
+    admin_autocomplete,
+    aggregate_search,
+    allocate_slot,
+    batch_complete_tasks,
+    batch_create_tasks,
+    claim_task,
+    export_db_view,
+)
 from management.auth_views import custom_login, custom_logout, dashboard
 
 urlpatterns = [
@@ -20,8 +28,21 @@ urlpatterns = [
     
     # 独立仪表盘页（simpleui 框架内）
     path('admin/dashboard/', admin_dashboard, name='admin_dashboard'),
+    # 仪表盘实时事件（SSE，ASGI 部署时为长连接）
+    path('admin/dashboard/events/', dashboard_events, name='dashboard_events'),
     # 聚合搜索页（simpleui 风格）
     path('admin/search/', aggregate_search, name='aggregate_search'),
+    # 箱位分配（JSON）
+    path('admin/yard/allocate-slot/', allocate_slot, name='allocate_slot'),
+    # 批量任务（JSON）
+    path('admin/tasks/batch/create/', batch_create_tasks, name='batch_create_tasks'),
+    path('admin/tasks/batch/complete/', batch_complete_tasks, name='batch_complete_tasks'),
+    # 任务派发（JSON）
+    path('admin/tasks/claim/', claim_task, name='claim_task'),
+    # 数据库视图导出（CSV / XLSX）
+    path('admin/views/<str:view_name>/export/', export_db_view, name='export_db_view'),
+    # 外键自动补全（覆盖 admin 默认视图，需在 admin.site.urls 之前）
+    path('admin/autocomplete/', admin.site.admin_view(admin_autocomplete), name='admin_autocomplete'),
 
     # 默认 Django Admin（已集成 simpleui）
     path('admin/', admin.site.urls),
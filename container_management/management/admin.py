@@ -1,7 +1,15 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import PermissionDenied
 from django.db import connection
+from django.http import HttpResponseBadRequest
+from django.urls import path
 from django.db.models import Q, F
 from django import forms
+from . import export
+from .container_query import classify, container_number_filter
+from .pagination import EstimatedCountPaginator, KeysetChangeList
+from .select_related import list_display_relation_paths
 from .models import (
     Party,
     PortMaster,
@@ -31,6 +39,15 @@ class ExplicitSaveAdmin(admin.ModelAdmin):
             raise forms.ValidationError({'__all__': '无操作权限：您没有执行该操作的权限。'})
         obj.save()
 
+    def get_list_select_related(self, request):
+        """
+        未显式设置 list_select_related 时，根据 list_display 与关联模型 __str__ 中的外键访问
+        推导需要 JOIN 的关联路径，使列表页的查询数与行数无关（见 select_related.py）
+        """
+        if self.list_select_related:
+            return self.list_select_related
+        return list_display_relation_paths(self.model, tuple(self.get_list_display(request))) or False
+
     def get_form(self, request, obj=None, **kwargs):
         """
         为 viewer 动态替换表单，使其在 clean 时抛出表单级错误（前端红字显示）。
@@ -68,6 +85,66 @@ class ExplicitSaveAdmin(admin.ModelAdmin):
             return False
         return super().has_delete_permission(request, obj)
 
+    # 列表页右上角的导出格式（模板 admin/management/change_list.html）
+    export_formats = export.EXPORT_FORMATS
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('export/', self.admin_site.admin_view(self.export_view),
+                 name=f'{opts.app_label}_{opts.model_name}_export'),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        """按列表页当前的筛选、搜索与排序导出全部行（?format=csv|xlsx），见 export.py"""
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in export.EXPORT_FORMATS:
+            return HttpResponseBadRequest(f'不支持的导出格式: {fmt}')
+        # format 不是列表筛选参数，构造 ChangeList 前移除
+        request.GET = request.GET.copy()
+        request.GET.pop('format', None)
+        try:
+            cl = self.get_changelist_instance(request)
+        except IncorrectLookupParameters:
+            return HttpResponseBadRequest('无效的筛选参数')
+        return export.export_response(export.changelist_rows(cl), self.model._meta.db_table, fmt)
+
+
+class ContainerNumberSearchMixin:
+    """
+    完整箱号、箱主代码（如 ABCU）与箱号前缀（如 ABCD12）改用 UQ_Container_Number 上的等值/前缀查找，
+    箱主代码总是箱号的开头，前缀查找与 '%q%' 的结果相同。
+    search_fields 只有箱号时前缀查找的结果就是最终结果（无结果时不再做必然为空的 '%q%' 扫描）；
+    还有其它搜索字段时，前缀查找无结果再按 search_fields 做普通搜索（纯字母也可能是名称）
+    """
+    container_number_lookup = 'container_number'
+
+    def _searches_container_number_only(self, request):
+        return {field.lstrip('^=@') for field in self.get_search_fields(request)} == {self.container_number_lookup}
+
+    def get_search_results(self, request, queryset, search_term):
+        kind, value = classify(search_term)
+        if kind is None:
+            return super().get_search_results(request, queryset, search_term)
+        results = queryset.filter(container_number_filter(value, field=self.container_number_lookup))
+        if kind == 'exact' or self._searches_container_number_only(request) or results.exists():
+            return results, False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class KeysetPaginationMixin:
+    """
+    大表列表页按排序键（默认主键）翻页，总数取自表统计信息的估算值，
+    不再每次执行精确 COUNT(*) 与深页 OFFSET；见 pagination.py
+    """
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
 
 # 管理站点标题
 admin.site.site_header = "港口集装箱运营管理系统"
@@ -176,11 +253,13 @@ class VesselMasterAdmin(ExplicitSaveAdmin):
 
 
 @admin.register(ContainerMaster)
-class ContainerMasterAdmin(ExplicitSaveAdmin):
+class ContainerMasterAdmin(KeysetPaginationMixin, ContainerNumberSearchMixin, ExplicitSaveAdmin):
     # 模型：ContainerMaster（集装箱主表）后台显示配置
     list_display = ['container_master_id', 'container_number', 'type_code', 'owner_party_id', 'current_status']
     list_filter = ['current_status', 'type_code']
     search_fields = ['container_number']
+    # 自动补全按箱号排序：与箱号前缀查找共用 UQ_Container_Number
+    autocomplete_ordering = ['container_number']
     list_per_page = 20
 
 
@@ -189,15 +268,19 @@ class YardStackAdmin(ExplicitSaveAdmin):
     # 模型：YardStack（堆位栈）后台显示配置
     list_display = ['stack_id', 'block_id', 'bay_number', 'row_number']
     list_filter = ['block_id']
+    search_fields = ['block_id__block_name']
     list_per_page = 20
 
 
 @admin.register(YardSlot)
-class YardSlotAdmin(ExplicitSaveAdmin):
+class YardSlotAdmin(KeysetPaginationMixin, ExplicitSaveAdmin):
     # 模型：YardSlot（具体格位）后台显示配置
     list_display = ['slot_id', 'stack_id', 'tier_number', 'slot_coordinates', 'slot_status', 'current_container_id']
     list_filter = ['slot_status', 'stack_id__block_id']
-    search_fields = ['slot_coordinates']
+    # 前缀匹配（LIKE 'x%'），走 Slot_Coordinates 唯一索引；自动补全也使用该搜索
+    search_fields = ['^slot_coordinates']
+    autocomplete_fields = ['stack_id', 'current_container_id']
+    autocomplete_ordering = ['slot_coordinates']
     list_per_page = 20
 
 
@@ -246,11 +329,17 @@ BookingAdmin.form = BookingForm
 
 
 @admin.register(Task)
-class TaskAdmin(ExplicitSaveAdmin):
+class TaskAdmin(KeysetPaginationMixin, ContainerNumberSearchMixin, ExplicitSaveAdmin):
     # 模型：Task（任务）后台显示配置
     list_display = ['task_id', 'task_type', 'status', 'container_master_id', 'priority', 'created_by_user_id', 'assigned_user_id']
     list_filter = ['task_type', 'status']
     search_fields = ['container_master_id__container_number']
+    container_number_lookup = 'container_master_id__container_number'
+    # 外键改为分页自动补全，不再一次性加载整表下拉框；目标箱位只提供可用箱位（见 autocomplete.py）
+    autocomplete_fields = [
+        'container_master_id', 'from_slot_id', 'to_slot_id', 'vessel_visit_id',
+        'created_by_user_id', 'assigned_user_id', 'actual_executor_id',
+    ]
     list_per_page = 20
     # 留空日期层级避免本地数据库缺少时区表时触发 CONVERT_TZ 错误
     # date_hierarchy = 'movement_timestamp'
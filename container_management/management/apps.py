@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'management'
+
+    def ready(self):
+        # 注册模型信号（状态计数等派生数据的增量维护）
+        from . import signals  # noqa: F401
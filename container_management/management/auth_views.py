@@ -4,12 +4,13 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import authenticate, login as django_login, logout as django_logout
-from django.db import connection
+from django.db.models import Count
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from .models import Users
+from . import counters, yard_utilization
+from .models import Task, Users
 from .utils import get_user_permission_names, get_user_role
-from .dashboard_context import dashboard_stats
+from .dashboard_snapshot import snapshot_context
 from django.template import TemplateDoesNotExist
 
 
@@ -216,25 +217,16 @@ def dashboard(request):
         'embed_url': embed_url,
     }
     
-    # 根据角色加载不同的数据
-    if user_role == 'admin':
-        # 管理员：显示所有统计信息
-        context.update(get_admin_dashboard_data())
-    elif user_role == 'operator':
-        # 操作员：显示任务相关数据
-        context.update(get_operator_dashboard_data(user_id))
-    elif user_role == 'viewer':
-        # 查看者：显示只读统计
-        context.update(get_viewer_dashboard_data())
-    else:
-        # 访客：显示基本信息
-        context.update(get_guest_dashboard_data())
-    # 合并 dashboard_stats（包含仪表盘通用数据和视图样本）
+    # 仪表盘通用数据、视图样本与 admin / viewer / guest 的角色数据来自后台生成的快照（见 dashboard_snapshot.py）
+    snapshot_role = user_role if user_role in ('admin', 'operator', 'viewer') else 'guest'
     try:
-        context.update(dashboard_stats(request))
+        context.update(snapshot_context(snapshot_role))
     except Exception:
-        # 若 dashboard_stats 抛错，仍返回已有 context
+        # 若快照生成失败，仍返回已有 context
         pass
+    if user_role == 'operator':
+        # 操作员：任务数据按用户区分，实时查询
+        context.update(get_operator_dashboard_data(user_id))
 
     # 尝试渲染角色对应的模板；若模板不存在则回退到合理的默认页面
     try:
@@ -247,98 +239,71 @@ def dashboard(request):
         return render(request, 'management/dashboard_guest_minimal.html', context)
 
 
+def get_counter_status_rows(source, limit=None):
+    """
+    从状态计数表读取某张表的状态分布 [{'状态': ..., '数量': ...}]，按数量降序，忽略未设置的状态
+    """
+    histogram = counters.get_histogram(source)
+    items = sorted(
+        ((status, total) for status, total in histogram.items() if status),
+        key=lambda kv: kv[1],
+        reverse=True,
+    )
+    if limit:
+        items = items[:limit]
+    return [{'状态': status, '数量': total} for status, total in items]
+
+
 def get_admin_dashboard_data():
-    """管理员仪表板数据"""
+    """管理员仪表板数据（均读取增量维护的汇总表，不执行原始 SQL）"""
     stats = {}
+    # 集装箱状态统计 / 任务统计：读取增量维护的状态计数表，不再扫描全表
     try:
-        with connection.cursor() as cursor:
-            # 集装箱状态统计
-            try:
-                cursor.execute("""
-                    SELECT 集装箱状态 AS 状态, SUM(数量) AS 数量
-                    FROM View_Container_Status_Summary
-                    GROUP BY 集装箱状态
-                    ORDER BY 数量 DESC
-                """)
-                stats['container_status'] = [dict(zip(['状态', '数量'], row)) for row in cursor.fetchall()]
-            except Exception:
-                stats['container_status'] = []
-            
-            # 任务统计
-            try:
-                cursor.execute("""
-                    SELECT 任务状态 AS 状态, COUNT(*) AS 数量
-                    FROM View_Task_Details
-                    GROUP BY 任务状态
-                """)
-                stats['task_status'] = [dict(zip(['状态', '数量'], row)) for row in cursor.fetchall()]
-            except Exception:
-                stats['task_status'] = []
-            
-            # 堆场利用率
-            try:
-                cursor.execute("""
-                    SELECT SUM(箱位总数) AS 总箱位数,
-                           SUM(已占用箱位数) AS 已占用,
-                           ROUND(AVG(利用率_百分比), 2) AS 利用率
-                    FROM View_Yard_Utilization
-                """)
-                result = cursor.fetchone()
-                if result:
-                    stats['yard_utilization'] = {
-                        '总箱位数': result[0] or 0,
-                        '已占用': result[1] or 0,
-                        '利用率': result[2] or 0
-                    }
-                else:
-                    stats['yard_utilization'] = {'总箱位数': 0, '已占用': 0, '利用率': 0}
-            except Exception:
-                stats['yard_utilization'] = {'总箱位数': 0, '已占用': 0, '利用率': 0}
-            
-            # 船舶访问统计
-            try:
-                cursor.execute("""
-                    SELECT 访问状态 AS 状态, COUNT(*) AS 数量
-                    FROM View_Vessel_Visit_Details
-                    GROUP BY 访问状态
-                """)
-                stats['vessel_visit'] = [dict(zip(['状态', '数量'], row)) for row in cursor.fetchall()]
-            except Exception:
-                stats['vessel_visit'] = []
+        stats['container_status'] = get_counter_status_rows('Container_Master')
     except Exception:
-        stats = {
-            'container_status': [],
-            'task_status': [],
-            'yard_utilization': {'总箱位数': 0, '已占用': 0, '利用率': 0},
-            'vessel_visit': []
-        }
-    
+        stats['container_status'] = []
+
+    try:
+        stats['task_status'] = get_counter_status_rows('Task')
+    except Exception:
+        stats['task_status'] = []
+
+    # 堆场利用率：读取按堆场区物化的 Yard_Utilization 快照
+    try:
+        stats['yard_utilization'] = yard_utilization.get_totals()
+    except Exception:
+        stats['yard_utilization'] = {'总箱位数': 0, '已占用': 0, '利用率': 0}
+
+    # 船舶访问统计
+    try:
+        stats['vessel_visit'] = get_counter_status_rows('Vessel_Visit')
+    except Exception:
+        stats['vessel_visit'] = []
+
     return {'stats': stats}
 
 
 def get_operator_dashboard_data(user_id):
-    """操作员仪表板数据"""
+    """
+    操作员仪表板数据
+    
+    直接按 Task.Assigned_User_ID / Actual_Executor_ID 过滤，分别走
+    IX_Task_Assigned_Status (Assigned_User_ID, Status, Priority) 与
+    IX_Task_Executor_Status (Actual_Executor_ID, Status)，
+    不再经视图按用户名回查整张任务表。
+    """
     data = {}
-    with connection.cursor() as cursor:
-        # 我的待执行任务
-        cursor.execute("""
-            SELECT COUNT(*) AS 数量
-            FROM View_Pending_Tasks
-            WHERE 指派给 = (SELECT Username FROM Users WHERE User_ID = %s)
-        """, [user_id])
-        row = cursor.fetchone()
-        data['my_pending_tasks'] = row[0] if row else 0
-        
-        # 我的已完成任务
-        cursor.execute("""
-            SELECT COUNT(*) AS 数量
-            FROM View_Task_Details
-            WHERE 执行人 = (SELECT Username FROM Users WHERE User_ID = %s)
-            AND 任务状态 = 'Completed'
-        """, [user_id])
-        row = cursor.fetchone()
-        data['my_completed_tasks'] = row[0] if row else 0
+    assigned = Task.objects.filter(assigned_user_id=user_id)
+    executed = Task.objects.filter(actual_executor_id=user_id, status='Completed')
     
+    # 指派给我的任务按状态计数（索引覆盖，一次查询）
+    assigned_counts = dict(
+        assigned.order_by().values_list('status').annotate(total=Count('task_id'))
+    )
+    data['my_pending_tasks'] = assigned_counts.get('Pending', 0)
+    data['my_in_progress_tasks'] = assigned_counts.get('InProgress', 0)
+    # 我执行完成的任务
+    data['my_completed_tasks'] = executed.count()
     return data
 
 
@@ -350,56 +315,22 @@ def get_viewer_dashboard_data():
 def get_guest_dashboard_data():
     """访客仪表板数据 - 显示只读统计信息"""
     stats = {}
+    # 堆场利用率（只读）：读取按堆场区物化的 Yard_Utilization 快照
     try:
-        with connection.cursor() as cursor:
-            # 堆场利用率（只读）
-            try:
-                cursor.execute("""
-                    SELECT SUM(箱位总数) AS 总箱位数,
-                           SUM(已占用箱位数) AS 已占用,
-                           ROUND(AVG(利用率_百分比), 2) AS 利用率
-                    FROM View_Yard_Utilization
-                """)
-                result = cursor.fetchone()
-                if result:
-                    stats['yard_utilization'] = {
-                        '总箱位数': result[0] or 0,
-                        '已占用': result[1] or 0,
-                        '利用率': result[2] or 0
-                    }
-                else:
-                    stats['yard_utilization'] = {'总箱位数': 0, '已占用': 0, '利用率': 0}
-            except Exception:
-                stats['yard_utilization'] = {'总箱位数': 0, '已占用': 0, '利用率': 0}
-            
-            # 集装箱状态统计（只读）
-            try:
-                cursor.execute("""
-                    SELECT 集装箱状态 AS 状态, SUM(数量) AS 数量
-                    FROM View_Container_Status_Summary
-                    GROUP BY 集装箱状态
-                    ORDER BY 数量 DESC
-                    LIMIT 5
-                """)
-                stats['container_status'] = [dict(zip(['状态', '数量'], row)) for row in cursor.fetchall()]
-            except Exception:
-                stats['container_status'] = []
-            
-            # 任务统计（只读）
-            try:
-                cursor.execute("""
-                    SELECT 任务状态 AS 状态, COUNT(*) AS 数量
-                    FROM View_Task_Details
-                    GROUP BY 任务状态
-                """)
-                stats['task_status'] = [dict(zip(['状态', '数量'], row)) for row in cursor.fetchall()]
-            except Exception:
-                stats['task_status'] = []
+        stats['yard_utilization'] = yard_utilization.get_totals()
     except Exception:
-        stats = {
-            'yard_utilization': {'总箱位数': 0, '已占用': 0, '利用率': 0},
-            'container_status': [],
-            'task_status': []
-        }
-    
+        stats['yard_utilization'] = {'总箱位数': 0, '已占用': 0, '利用率': 0}
+
+    # 集装箱状态统计（只读）
+    try:
+        stats['container_status'] = get_counter_status_rows('Container_Master', limit=5)
+    except Exception:
+        stats['container_status'] = []
+
+    # 任务统计（只读）
+    try:
+        stats['task_status'] = get_counter_status_rows('Task')
+    except Exception:
+        stats['task_status'] = []
+
     return {'stats': stats}
@@ -0,0 +1,84 @@
+"""
+后台外键自动补全
+
+Task / YardSlot 编辑页的外键改用 autocomplete_fields 后，表单只渲染已选中的一项，
+候选项由 /admin/autocomplete/ 按输入分页返回。CachedAutocompleteJsonView 替换 Django 默认视图：
+- 不执行 COUNT(*)：多取一行判断是否还有下一页
+- 按目标模型 __str__ 的外键访问 select_related，避免逐行查询
+- 按 (来源字段, 搜索词, 页码) 缓存结果；目标模型保存/删除时递增代号使缓存失效，
+  另有 CACHE_TIMEOUT 兜底触发器、批量 SQL 等不经过信号的修改
+- AUTOCOMPLETE_FILTERS 为特定来源字段附加候选条件（任务目标箱位只提供可用箱位）
+"""
+import hashlib
+
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import JsonResponse
+
+from .select_related import str_relation_paths
+
+
+CACHE_TIMEOUT = 30
+GENERATION_KEY = 'autocomplete:generation:{model}'
+RESULT_KEY = 'autocomplete:{generation}:{source}:{field}:{page}:{term}'
+
+# (来源模型名, 字段名) -> 候选项附加条件
+AUTOCOMPLETE_FILTERS = {
+    ('task', 'to_slot_id'): Q(slot_status='Available', current_container_id__isnull=True),
+}
+
+
+def _generation(model):
+    return cache.get(GENERATION_KEY.format(model=model._meta.label_lower), 0)
+
+
+def invalidate(model):
+    """目标模型数据变化：使其所有自动补全缓存失效"""
+    key = GENERATION_KEY.format(model=model._meta.label_lower)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+class CachedAutocompleteJsonView(AutocompleteJsonView):
+    def get_queryset(self):
+        qs = super().get_queryset()
+        source = (self.source_field.model._meta.model_name, self.source_field.name)
+        if source in AUTOCOMPLETE_FILTERS:
+            qs = qs.filter(AUTOCOMPLETE_FILTERS[source])
+        related = str_relation_paths(qs.model)
+        if related:
+            qs = qs.select_related(*related)
+        ordering = getattr(self.model_admin, 'autocomplete_ordering', None) or ('-pk',)
+        return qs.order_by(*ordering)
+
+    def get(self, request, *args, **kwargs):
+        self.term, self.model_admin, self.source_field, to_field_name = self.process_request(request)
+        if not self.has_perm(request):
+            raise PermissionDenied
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        remote_model = self.source_field.remote_field.model
+        key = RESULT_KEY.format(
+            generation=_generation(remote_model),
+            source=self.source_field.model._meta.label_lower,
+            field=self.source_field.name,
+            page=page,
+            term=hashlib.md5(self.term.strip().lower().encode()).hexdigest(),
+        )
+        data = cache.get(key)
+        if data is None:
+            offset = (page - 1) * self.paginate_by
+            rows = list(self.get_queryset()[offset:offset + self.paginate_by + 1])
+            data = {
+                'results': [self.serialize_result(obj, to_field_name) for obj in rows[:self.paginate_by]],
+                'pagination': {'more': len(rows) > self.paginate_by},
+            }
+            cache.set(key, data, CACHE_TIMEOUT)
+        return JsonResponse(data)
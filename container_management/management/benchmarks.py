@@ -0,0 +1,237 @@
+"""
+热点路径基准测试
+
+对本地数据库（可先用 generate_load_data 生成不同规模的数据）逐个场景发起请求，
+记录每次请求的耗时与 SQL 查询数，输出 p50/p90/p99 等统计：
+- admin_dashboard：/admin/dashboard/
+- dashboard:<角色>：/dashboard/，分别以 admin / operator / viewer / guest 登录
+- search:<关键字>：/admin/search/?q=...
+- require_permission：经 require_permission 包装的视图（权限命中路径）
+- changelist:<模型>：Task / YardSlot / ContainerMaster 的后台列表页
+
+结果为 JSON，可以与另一次提交的结果比较（compare_results），
+查询数增加或耗时超过阈值的场景视为回归。
+"""
+import json
+import statistics
+import subprocess
+import time
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.conf import settings
+
+from .models import ContainerMaster, Permissions, Task, UserPermissions, Users, VesselVisit, YardSlot
+from .utils import require_permission
+
+
+# 各角色对应的基准用户及其权限（权限不存在时自动创建）
+BENCH_ROLES = {
+    'admin': {'username': 'bench_admin', 'superuser': True, 'permissions': ['ADMIN']},
+    'operator': {'username': 'bench_operator', 'superuser': False, 'permissions': ['CREATE_TASK', 'UPDATE_TASK']},
+    'viewer': {'username': 'bench_viewer', 'superuser': False, 'permissions': ['VIEW_STATISTICS']},
+    'guest': {'username': 'bench_guest', 'superuser': False, 'permissions': []},
+}
+BENCH_PERMISSION = 'VIEW_STATISTICS'
+CHANGELISTS = {
+    'task': '/admin/management/task/',
+    'yardslot': '/admin/management/yardslot/',
+    'containermaster': '/admin/management/containermaster/',
+}
+
+
+def percentile(values, pct):
+    """线性插值百分位数（values 已排序）"""
+    if not values:
+        return None
+    k = (len(values) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+def summarize(timings_ms, query_counts, statuses):
+    ordered = sorted(timings_ms)
+    return {
+        'iterations': len(ordered),
+        'p50_ms': round(percentile(ordered, 50), 2),
+        'p90_ms': round(percentile(ordered, 90), 2),
+        'p99_ms': round(percentile(ordered, 99), 2),
+        'mean_ms': round(statistics.fmean(ordered), 2),
+        'min_ms': round(ordered[0], 2),
+        'max_ms': round(ordered[-1], 2),
+        'queries': max(query_counts),
+        'queries_min': min(query_counts),
+        'status_codes': sorted(set(statuses)),
+    }
+
+
+def ensure_bench_user(role):
+    """创建（或复用）某个角色的 Django 用户与 Users 记录，并授予对应权限"""
+    spec = BENCH_ROLES[role]
+    username = spec['username']
+    user, _ = User.objects.get_or_create(
+        username=username,
+        defaults={'is_staff': True, 'is_superuser': spec['superuser'], 'email': f'{username}@bench.example.com'},
+    )
+    db_user, _ = Users.objects.get_or_create(
+        username=username,
+        defaults={'email': f'{username}@bench.example.com', 'full_name': username, 'hashed_password': b''},
+    )
+    for name in spec['permissions']:
+        permission, _ = Permissions.objects.get_or_create(permission_name=name)
+        UserPermissions.objects.get_or_create(user_id=db_user, permission_id=permission)
+    return user, db_user
+
+
+def default_search_queries():
+    """根据现有数据挑选典型搜索词：完整箱号、箱主代码、任务状态、航次号片段"""
+    queries = []
+    number = ContainerMaster.objects.order_by('-container_master_id').values_list('container_number', flat=True).first()
+    if number:
+        queries += [number, number[:4]]
+    queries.append('Pending')
+    voyage = VesselVisit.objects.order_by('-vessel_visit_id').values_list('voyage_number_in', flat=True).first()
+    if voyage:
+        queries.append(voyage[:6])
+    return queries
+
+
+class BenchmarkRunner:
+    def __init__(self, iterations=20, warmup=2, cold_cache=False, log=print):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.cold_cache = cold_cache
+        self.log = log
+        self.results = {}
+
+    def measure(self, name, func):
+        """执行 warmup + iterations 次 func()，func 返回 HTTP 状态码"""
+        for _ in range(self.warmup):
+            if self.cold_cache:
+                cache.clear()
+            func()
+        timings, query_counts, statuses = [], [], []
+        for _ in range(self.iterations):
+            if self.cold_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                statuses.append(func())
+                timings.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(ctx.captured_queries))
+        result = summarize(timings, query_counts, statuses)
+        self.results[name] = result
+        self.log(f"  {name:<40} p50 {result['p50_ms']:>9.2f}ms  p99 {result['p99_ms']:>9.2f}ms  queries {result['queries']}")
+        return result
+
+    def client_for(self, role):
+        user, db_user = ensure_bench_user(role)
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        session = client.session
+        session['user_id'] = db_user.user_id
+        session.save()
+        return client
+
+    def get(self, client, url, **params):
+        return lambda: client.get(url, params).status_code
+
+    def run(self, only=None, search_queries=None):
+        scenarios = []
+        admin_client = self.client_for('admin')
+        scenarios.append(('admin_dashboard', self.get(admin_client, '/admin/dashboard/')))
+        for role in BENCH_ROLES:
+            client = admin_client if role == 'admin' else self.client_for(role)
+            scenarios.append((f'dashboard:{role}', self.get(client, '/dashboard/')))
+        for query in (search_queries or default_search_queries()):
+            scenarios.append((f'search:{query}', lambda q=query: admin_client.get('/admin/search/', {'q': q}).status_code))
+        scenarios.append(('require_permission', self.permission_scenario()))
+        for model_name, url in CHANGELISTS.items():
+            scenarios.append((f'changelist:{model_name}', self.get(admin_client, url)))
+
+        hosts = list(settings.ALLOWED_HOSTS) + ['testserver']
+        with override_settings(ALLOWED_HOSTS=hosts):
+            for name, func in scenarios:
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                self.measure(name, func)
+        return self.results
+
+    def permission_scenario(self):
+        """权限命中路径：经 require_permission 包装的空视图"""
+        user, db_user = ensure_bench_user('viewer')
+        view = require_permission(BENCH_PERMISSION)(lambda request: HttpResponse('ok'))
+        factory = RequestFactory()
+
+        def call():
+            request = factory.get('/bench/permission/')
+            request.user = user
+            request.session = SessionStore()
+            request.session['user_id'] = db_user.user_id
+            return view(request).status_code
+
+        return call
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def scale_snapshot():
+    """记录数据规模，便于比较不同规模下的结果"""
+    return {
+        'containers': ContainerMaster.objects.count(),
+        'tasks': Task.objects.count(),
+        'slots': YardSlot.objects.count(),
+        'visits': VesselVisit.objects.count(),
+    }
+
+
+def build_report(results, label=None, iterations=None, cold_cache=False):
+    return {
+        'meta': {
+            'label': label,
+            'revision': git_revision(),
+            'vendor': connection.vendor,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'iterations': iterations,
+            'cold_cache': cold_cache,
+            'scale': scale_snapshot(),
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, time_ratio=1.25, extra_queries=0, metric='p50_ms'):
+    """
+    比较两次结果，返回回归列表 [(场景, 说明)]：
+    - 查询数比基线多出 extra_queries 以上
+    - 指定耗时指标超过基线的 time_ratio 倍
+    """
+    regressions = []
+    base_results = baseline.get('results', {})
+    for name, result in current.get('results', {}).items():
+        base = base_results.get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries'] + extra_queries:
+            regressions.append((name, f"查询数 {base['queries']} -> {result['queries']}"))
+        if base[metric] and result[metric] > base[metric] * time_ratio:
+            regressions.append((name, f"{metric} {base[metric]} -> {result[metric]}"))
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as fp:
+        return json.load(fp)
@@ -0,0 +1,227 @@
+"""
+变更日志（Change Data Capture）
+
+Task、Yard_Slot、Container_Master、Vessel_Visit 上的每次插入、更新、删除都由行级触发器
+向 Change_Log 追加一行（来源表、记录编号、操作、原/新状态、关键列 JSON），
+因此后台 save_model、TRG_Task_Complete_Update_Slot 等触发器的联动修改、批量 SQL 与脚本
+写入的数据都会被记录。Change_ID 自增，即全局序号。
+
+触发器由迁移 0009 安装（MySQL 与 SQLite 使用同一份 INSERT 语句），MySQL 部署脚本见 sqlutil/triggers.sql。
+MySQL 下触发器在会话变量 @tos_skip_change_log = 1 时不写日志：suppressed() 只对当前连接生效，
+用于压测数据加载（loadgen.py），其它会话的并发写入照常记录。SQLite 没有会话变量，总是记录。
+
+消费方按序号增量读取：
+- read_changes(after)：序号大于 after 的变更与新的游标位置
+- consume(name, handler)：以 Change_Log_Consumer 中保存的位置为起点读取一批交给 handler，
+  handler 成功后推进位置（至少一次投递）；同名消费方并发调用时只有一个取得行锁，其余直接返回
+- catch_up(name, handler)：连续 consume 直到追上
+- purge(before)：删除早于指定时间且所有消费方都已处理过的日志
+
+序号空洞：自增编号在插入时分配、在提交时才可见，编号较小的长事务可能晚于编号较大的事务提交；
+回滚的事务也会留下永远不会出现的编号。读取时遇到空洞即停在空洞之前，
+直到空洞之后的变更已超过 GAP_TIMEOUT 秒（视为回滚）才越过它。
+Changed_At 由数据库按会话时区写入，变更的“年龄”在同一查询中以数据库时钟（NOW(6)）计算，
+不与应用服务器的 timezone.now() 比较，避免会话时区不是 UTC 时整批变更被误判为尚未超时。
+"""
+import datetime
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.db.models.functions import Now
+
+from . import rawsql
+
+from .models import ChangeLog, ChangeLogConsumer
+
+
+# 来源表 -> (主键列, 状态列, 记录在 Detail 中的关键列)
+CHANGE_LOG_TABLES = {
+    'Task': (
+        'Task_ID', 'Status',
+        ('Task_Type', 'Container_Master_ID', 'From_Slot_ID', 'To_Slot_ID', 'Vessel_Visit_ID', 'Assigned_User_ID', 'Priority'),
+    ),
+    'Yard_Slot': ('Slot_ID', 'Slot_Status', ('Stack_ID', 'Slot_Coordinates', 'Current_Container_ID')),
+    'Container_Master': ('Container_Master_ID', 'Current_Status', ('Container_Number', 'Type_Code')),
+    'Vessel_Visit': ('Vessel_Visit_ID', 'Status', ('Vessel_ID', 'Berth_ID', 'ATA', 'ATD')),
+}
+
+OPERATIONS = {'I': 'INSERT', 'U': 'UPDATE', 'D': 'DELETE'}
+
+# 触发器支持的数据库
+TRIGGER_VENDORS = ('mysql', 'sqlite')
+
+# 单次读取的最大行数
+BATCH_SIZE = 1000
+# 序号空洞之后的变更超过该时间（秒）仍未补齐时视为回滚，越过空洞
+GAP_TIMEOUT = 30
+# 清理时每条 DELETE 删除的最大行数
+PURGE_CHUNK = 5000
+# MySQL 会话变量：为 1 时本会话的写入不记变更日志
+SKIP_VARIABLE = '@tos_skip_change_log'
+
+
+# ---------------- 触发器 ----------------
+
+def trigger_name(table, operation):
+    return f'TRG_{table}_Change_Log_{OPERATIONS[operation].title()}'
+
+
+def trigger_sql(table, operation, vendor='mysql'):
+    """
+    单个触发器的 CREATE TRIGGER 语句。
+    整条语句一次交给数据库驱动执行，不需要 DELIMITER；SQLite 同样接受反引号与 JSON_OBJECT。
+    MySQL 版本的 INSERT 包在 @tos_skip_change_log 的判断中
+    """
+    pk, status, columns = CHANGE_LOG_TABLES[table]
+    row = 'OLD' if operation == 'D' else 'NEW'
+    old_status = f'OLD.`{status}`' if operation == 'U' else 'NULL'
+    new_status = 'NULL' if operation == 'D' else f'NEW.`{status}`'
+    detail = ', '.join(f"'{column}', {row}.`{column}`" for column in columns)
+    insert = [
+        'INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)',
+        f"VALUES ('{table}', {row}.`{pk}`, '{operation}', {old_status}, {new_status}, JSON_OBJECT({detail}));",
+    ]
+    if vendor == 'mysql':
+        lines = [f'IF IFNULL({SKIP_VARIABLE}, 0) = 0 THEN', *(f'    {line}' for line in insert), 'END IF;']
+    else:
+        lines = insert
+    body = ''.join(f'    {line}\n' for line in lines)
+    return (
+        f'CREATE TRIGGER `{trigger_name(table, operation)}`\n'
+        f'AFTER {OPERATIONS[operation]} ON `{table}`\n'
+        f'FOR EACH ROW\n'
+        f'BEGIN\n'
+        f'{body}'
+        f'END'
+    )
+
+
+def install_triggers(schema_editor=None):
+    """（重新）创建全部变更日志触发器；不支持的数据库上不做任何事，返回创建的数量"""
+    conn = schema_editor.connection if schema_editor else connection
+    if conn.vendor not in TRIGGER_VENDORS:
+        return 0
+    drop_triggers(schema_editor)
+    count = 0
+    with conn.cursor() as cursor:
+        for table in CHANGE_LOG_TABLES:
+            for operation in OPERATIONS:
+                cursor.execute(trigger_sql(table, operation, conn.vendor))
+                count += 1
+    return count
+
+
+def drop_triggers(schema_editor=None):
+    conn = schema_editor.connection if schema_editor else connection
+    if conn.vendor not in TRIGGER_VENDORS:
+        return
+    with conn.cursor() as cursor:
+        for table in CHANGE_LOG_TABLES:
+            for operation in OPERATIONS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS `{trigger_name(table, operation)}`')
+
+
+@contextmanager
+def suppressed():
+    """MySQL：当前连接在上下文内的写入不记变更日志（其它连接不受影响）；其它数据库照常记录"""
+    if connection.vendor != 'mysql':
+        yield
+        return
+    rawsql.execute(f'SET {SKIP_VARIABLE} = 1', label='change_log')
+    try:
+        yield
+    finally:
+        rawsql.execute(f'SET {SKIP_VARIABLE} = 0', label='change_log')
+
+
+# ---------------- 读取 ----------------
+
+def latest_id():
+    return ChangeLog.objects.aggregate(last=Max('change_id'))['last'] or 0
+
+
+def _contiguous(rows, after):
+    """rows（带数据库当前时间 db_now）中从 after 起连续（或空洞已超时）的前缀"""
+    safe = []
+    expected = after + 1
+    for row in rows:
+        if row.change_id != expected and row.db_now - row.changed_at < datetime.timedelta(seconds=GAP_TIMEOUT):
+            break
+        safe.append(row)
+        expected = row.change_id + 1
+    return safe
+
+
+def read_changes(after, limit=BATCH_SIZE, tables=None):
+    """
+    序号大于 after 的变更（按序号排序，最多 limit 行），返回 (变更列表, 新的游标位置)。
+    tables 只筛选返回的行，游标仍会越过其它表的变更
+    """
+    queryset = ChangeLog.objects.filter(change_id__gt=after).annotate(db_now=Now())
+    rows = _contiguous(list(queryset.order_by('change_id')[:limit]), after)
+    position = rows[-1].change_id if rows else after
+    if tables:
+        rows = [row for row in rows if row.table_name in tables]
+    return rows, position
+
+
+def consume(name, handler, limit=BATCH_SIZE, tables=None, start=None):
+    """
+    消费方 name 读取下一批变更并调用 handler(变更列表)，成功后保存新位置，
+    返回游标前进的序号数（含被 tables 过滤掉的变更，0 表示已追上）。
+    新消费方从 start（缺省为当前最新序号，即只处理此后的变更）开始；
+    handler 抛出异常时位置不变，异常向调用方传播，下次重新投递同一批变更
+    """
+    ChangeLogConsumer.objects.get_or_create(
+        consumer=name, defaults={'position': latest_id() if start is None else start}
+    )
+    with transaction.atomic():
+        consumer = ChangeLogConsumer.objects.select_for_update(skip_locked=True).filter(pk=name).first()
+        if consumer is None:
+            # 其它进程正在处理该消费方
+            return 0
+        rows, position = read_changes(consumer.position, limit, tables)
+        if position == consumer.position:
+            return 0
+        if rows:
+            handler(rows)
+        read = position - consumer.position
+        consumer.position = position
+        consumer.save(update_fields=['position', 'updated_at'])
+    return read
+
+
+def catch_up(name, handler, limit=BATCH_SIZE, tables=None, start=None):
+    """反复调用 consume 直到追上最新变更（或其它进程正在处理），返回游标前进的序号数"""
+    total = 0
+    while True:
+        read = consume(name, handler, limit, tables, start)
+        if not read:
+            return total
+        total += read
+
+
+def consumer_lag():
+    """各消费方的位置与落后的变更数：{消费方: (位置, 落后数)}"""
+    last = latest_id()
+    return {
+        consumer.consumer: (consumer.position, last - consumer.position)
+        for consumer in ChangeLogConsumer.objects.order_by('consumer')
+    }
+
+
+def purge(before):
+    """
+    删除 changed_at 早于 before 且所有消费方都已处理过的变更，返回删除的行数
+    """
+    bound = ChangeLogConsumer.objects.aggregate(low=Min('position'))['low']
+    queryset = ChangeLog.objects.filter(changed_at__lt=before)
+    if bound is not None:
+        queryset = queryset.filter(change_id__lte=bound)
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('change_id').values_list('change_id', flat=True)[:PURGE_CHUNK])
+        if not ids:
+            return deleted
+        deleted += ChangeLog.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,53 @@
+"""
+箱号查询分类
+
+箱号严格为 4 个大写字母（箱主代码）+ 7 位数字，操作员输入的几乎总是箱主代码、
+箱号前缀或完整箱号。识别这几类输入后改用 UQ_Container_Number 上的范围/等值查找，
+不再使用无法走索引的 '%q%' 模糊匹配：
+- exact：完整箱号               -> Container_Number = 'ABCU1234567'
+- owner：4 位箱主代码           -> Container_Number LIKE 'ABCU%'
+- prefix：1-3 个字母，或箱主代码 + 1-6 位数字 -> Container_Number LIKE 'ABCU12%'
+其它输入返回 None，由调用方回退到模糊匹配。
+
+前缀匹配使用 istartswith：MySQL 下生成不带 BINARY 的 LIKE 'x%'，可以走索引范围扫描。
+"""
+import re
+
+from django.db.models import Q
+
+
+EXACT_RE = re.compile(r'^[A-Z]{4}[0-9]{7}$')
+OWNER_RE = re.compile(r'^[A-Z]{4}$')
+PREFIX_RE = re.compile(r'^(?:[A-Z]{1,3}|[A-Z]{4}[0-9]{1,6})$')
+# 常见书写方式中的空格与连字符（如 "ABCU 123456-7"）
+SEPARATORS_RE = re.compile(r'[\s\-]+')
+
+
+def normalize(query):
+    return SEPARATORS_RE.sub('', (query or '').strip()).upper()
+
+
+def classify(query):
+    """
+    返回 (类别, 规范化后的输入)；类别为 'exact' / 'owner' / 'prefix' / None
+    """
+    value = normalize(query)
+    if EXACT_RE.match(value):
+        return 'exact', value
+    if OWNER_RE.match(value):
+        return 'owner', value
+    if PREFIX_RE.match(value):
+        return 'prefix', value
+    return None, value
+
+
+def container_number_filter(query, field='container_number'):
+    """
+    为箱号类输入生成走索引的过滤条件；非箱号类输入返回 None
+    """
+    kind, value = classify(query)
+    if kind == 'exact':
+        return Q(**{field: value})
+    if kind in ('owner', 'prefix'):
+        return Q(**{f'{field}__istartswith': value})
+    return None
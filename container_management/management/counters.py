@@ -0,0 +1,104 @@
+"""
+状态计数器子系统
+
+Status_Counter 表按 (来源表, 状态) 保存记录数，在每次状态流转时增量维护：
+- 模型保存/删除：由 signals.py 中的信号处理器调用 record_transition / apply_delta
+- 任务完成联动：TRG_Task_Complete_Update_Container 触发器直接维护 Container_Master 计数
+- 其它绕过上述路径的批量 SQL：使用 reconcile_status_counters 命令从源表重建
+
+读取直方图只需扫描 O(状态数) 行，不再对大表做 COUNT(*) GROUP BY。
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import ContainerMaster, StatusCounter, Task, VesselVisit
+
+
+# 来源表 -> (模型, 状态字段)
+COUNTER_SOURCES = {
+    'Task': (Task, 'status'),
+    'Container_Master': (ContainerMaster, 'current_status'),
+    'Vessel_Visit': (VesselVisit, 'status'),
+}
+
+
+def _status_key(status):
+    # 计数表中用空字符串代表 NULL 状态
+    return status or ''
+
+
+def fetch_status_histogram(model, field):
+    """
+    直接对源表做单次聚合查询，返回 {状态: 数量}（状态可能为 None）
+    """
+    rows = (
+        model.objects.values(field)
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    return {row[field]: row['total'] for row in rows}
+
+
+def apply_delta(source, status, delta):
+    """
+    对指定来源表的某个状态计数加减 delta
+    """
+    key = _status_key(status)
+    updated = StatusCounter.objects.filter(source_table=source, status=key).update(total=F('total') + delta)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            StatusCounter.objects.create(source_table=source, status=key, total=delta)
+    except IntegrityError:
+        # 并发情况下其它事务已插入该行，改为累加
+        StatusCounter.objects.filter(source_table=source, status=key).update(total=F('total') + delta)
+
+
+def record_transition(source, old_status, new_status, created=False):
+    """
+    记录一次状态流转；created=True 表示新插入的记录（没有旧状态）
+    """
+    if not created and _status_key(old_status) == _status_key(new_status):
+        return
+    if not created:
+        apply_delta(source, old_status, -1)
+    apply_delta(source, new_status, 1)
+
+
+def get_histogram(source):
+    """
+    从计数表读取 {状态: 数量}（NULL 状态以 None 表示，数量为 0 的状态不返回）。
+    若该来源尚未初始化计数，则先从源表重建一次。
+    """
+    rows = list(
+        StatusCounter.objects.filter(source_table=source).values_list('status', 'total')
+    )
+    if not rows:
+        return reconcile_source(source)
+    return {(status or None): total for status, total in rows if total}
+
+
+def reconcile_source(source):
+    """
+    从源表重新统计某个来源的全部状态计数并覆盖计数表，返回新的直方图
+    """
+    model, field = COUNTER_SOURCES[source]
+    with transaction.atomic():
+        totals = {}
+        for status, total in fetch_status_histogram(model, field).items():
+            key = _status_key(status)
+            totals[key] = totals.get(key, 0) + total
+        StatusCounter.objects.filter(source_table=source).delete()
+        StatusCounter.objects.bulk_create([
+            StatusCounter(source_table=source, status=key, total=total)
+            for key, total in totals.items()
+        ])
+    return {(key or None): total for key, total in totals.items() if total}
+
+
+def reconcile_all():
+    """
+    重建所有来源的计数，返回 {来源表: 直方图}
+    """
+    return {source: reconcile_source(source) for source in COUNTER_SOURCES}
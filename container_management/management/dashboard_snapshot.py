@@ -0,0 +1,79 @@
+"""
+仪表盘快照
+
+仪表盘的全部数据（KPI、状态分布、最近船舶访问与任务、各数据库视图样本、admin / viewer / guest
+角色数据）由后台刷新任务（refresh_dashboard_snapshot 命令）每 REFRESH_INTERVAL 秒计算一次，
+作为一个整体写入共享缓存，并附带生成时间。仪表盘请求只读取一次缓存，页面显示数据生成时间。
+
+- 快照的新鲜期为 MAX_AGE 秒（大于刷新间隔）。刷新任务未运行或落后时，请求经
+  shared_cache.get_or_compute 单飞回源：一个请求重新生成，其余请求继续使用旧快照
+- operator 角色的数据按用户区分（指派给自己的任务），仍在请求中实时查询（均为索引查询）
+- 快照记录开始计算时的实时事件序号（live_seq），页面从该序号起订阅 live_events，
+  快照生成之后的变更经 SSE 补齐
+"""
+from django.utils import timezone
+
+from . import live_events, shared_cache
+from .dashboard_context import VIEW_COLUMNS, LazyStat, dashboard_stats, view_sample_key
+
+
+SNAPSHOT_KEY = 'dashboard_snapshot'
+REFRESH_INTERVAL = 30
+MAX_AGE = 90
+# 快照中预先计算的角色数据（operator 数据按用户实时查询）
+SNAPSHOT_ROLES = ('admin', 'viewer', 'guest')
+
+
+def _resolve(value):
+    if isinstance(value, LazyStat):
+        return value()
+    if isinstance(value, dict):
+        return {key: _resolve(item) for key, item in value.items()}
+    return value
+
+
+def build_snapshot():
+    """
+    计算完整的仪表盘数据，返回 {'generated_at': ..., 'live_seq': ..., 'stats': {...}, 'roles': {角色: {...}}}
+    """
+    # 角色数据的计算函数在 auth_views 中，auth_views 又依赖本模块，延迟导入避免循环引用
+    from .auth_views import get_admin_dashboard_data, get_guest_dashboard_data, get_viewer_dashboard_data
+
+    # 先取序号再计算：计算期间发生的变更会被页面重放一次（事件内容为绝对值，重放无副作用）
+    live_seq = live_events.latest_seq()
+    # 视图样本直接回源，不复用各自缓存中的旧值
+    for view_name in VIEW_COLUMNS:
+        shared_cache.invalidate(view_sample_key(view_name))
+    return {
+        'generated_at': timezone.now(),
+        'live_seq': live_seq,
+        'stats': _resolve(dashboard_stats(None)),
+        'roles': {
+            'admin': get_admin_dashboard_data(),
+            'viewer': get_viewer_dashboard_data(),
+            'guest': get_guest_dashboard_data(),
+        },
+    }
+
+
+def refresh():
+    """重新生成并写入快照（后台刷新任务调用）"""
+    return shared_cache.refresh(SNAPSHOT_KEY, build_snapshot, MAX_AGE, jitter=0)
+
+
+def get_snapshot():
+    return shared_cache.get_or_compute(SNAPSHOT_KEY, build_snapshot, MAX_AGE, jitter=0)
+
+
+def snapshot_context(role=None):
+    """
+    仪表盘模板使用的 context：通用数据 + 指定角色的数据（若快照中有）+ 生成时间与数据年龄（秒）
+    """
+    snapshot = get_snapshot()
+    context = dict(snapshot['stats'])
+    if role in SNAPSHOT_ROLES:
+        context.update(snapshot['roles'][role])
+    context['snapshot_generated_at'] = snapshot['generated_at']
+    context['snapshot_age'] = int((timezone.now() - snapshot['generated_at']).total_seconds())
+    context['live_seq'] = snapshot.get('live_seq')
+    return context
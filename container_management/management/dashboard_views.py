@@ -1,7 +1,21 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import render
 
-from .dashboard_context import dashboard_stats
+from . import live_events
+from .dashboard_snapshot import snapshot_context
+
+
+# 实时事件流：服务端读取事件序号的间隔、无事件时的心跳间隔（秒）、浏览器断线重连等待（毫秒）
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15
+RETRY_MS = 3000
 
 
 @login_required
@@ -10,5 +24,80 @@ def admin_dashboard(request):
     """
     独立的后台仪表盘页 (/admin/dashboard)，复用 simpleui 外观。
     """
-    context = dashboard_stats(request)
+    context = snapshot_context()
     return render(request, 'admin/simpleui/dashboard.html', context)
+
+
+def _sse(event_type, data, seq):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'id: {seq}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+def _start_seq(request):
+    """断线重连时浏览器发送 Last-Event-ID，首次连接由页面以 ?after= 传入快照的事件序号"""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _pending_events(after):
+    """
+    after 之后的 SSE 消息与新的序号；错过事件时以 reset + 当前状态代替。
+    先尝试中继一次变更日志（跨进程每 RELAY_INTERVAL 秒只有一个连接真正读取数据库）
+    """
+    await sync_to_async(live_events.relay_due)()
+    events, reset = await live_events.aevents_after(after)
+    messages = [_sse(event['type'], event['data'], event['seq']) for event in events]
+    if events:
+        after = events[-1]['seq']
+    if reset:
+        after = await live_events.alatest_seq()
+        messages.append(_sse('reset', {}, after))
+        state = await sync_to_async(live_events.current_state)()
+        messages.extend(_sse(event_type, data, after) for event_type, data in state)
+    return messages, after
+
+
+async def _event_stream(after):
+    yield f'retry: {RETRY_MS}\n\n'
+    if after is None:
+        after = await live_events.alatest_seq()
+    idle = 0.0
+    while True:
+        messages, after = await _pending_events(after)
+        for message in messages:
+            yield message
+        idle = 0.0 if messages else idle + POLL_INTERVAL
+        if idle >= HEARTBEAT_INTERVAL:
+            # 注释行：保持代理与浏览器连接不被空闲超时断开
+            yield ': ping\n\n'
+            idle = 0.0
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def dashboard_events(request):
+    """
+    仪表盘实时事件（text/event-stream），见 live_events.py。
+
+    ASGI 部署（asgi.py）时为一条长连接：每个打开的页面只占用一个连接与一个协程，
+    等待期间不占用线程；变更日志由全部连接共享的中继读取，数据库负载与打开的页面数无关。WSGI 部署时无法长期持有连接，返回当前已有的事件后结束，
+    浏览器的 EventSource 在 RETRY_MS 后携带 Last-Event-ID 自动重连，退化为轮询。
+    """
+    user = await request.auser()
+    if not (user.is_authenticated and user.is_staff):
+        return HttpResponseForbidden()
+    after = _start_seq(request)
+    if isinstance(request, ASGIRequest):
+        stream = _event_stream(after)
+    else:
+        if after is None:
+            after = await live_events.alatest_seq()
+        messages, after = await _pending_events(after)
+        stream = [f'retry: {RETRY_MS}\n\n', *messages, _sse('sync', {}, after)]
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 等反向代理的响应缓冲
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,102 @@
+"""
+作业任务派发
+
+操作员（设备司机）领取下一条待执行任务：按优先级（数值小者优先）、任务编号取队首的 Pending 任务，
+置为 InProgress 并指派给当前操作员。队列可按堆场区（起始或目标箱位所在堆场区）与任务类型划分。
+
+领取时执行：
+    SELECT ... FROM Task WHERE Status = 'Pending' ... ORDER BY Priority, Task_ID
+    LIMIT 1 FOR UPDATE OF Task SKIP LOCKED
+已被其它事务锁定的队首任务直接跳过，并发领取者各自拿到不同的任务而不必排队等待；
+OF Task 只锁任务行，不锁按堆场区过滤时连接的箱位/堆栈行。
+不支持 SKIP LOCKED 的数据库（SQLite）上 FOR UPDATE 被忽略，此时依靠条件 UPDATE
+（WHERE Status = 'Pending'）保证同一任务只会被领取一次，失败时重取下一条。
+
+状态计数（所有领取者共用 Task/Pending、Task/InProgress 两行）与搜索索引在领取事务提交后
+（transaction.on_commit）各自更新：领取事务只持有任务行锁，并发领取者不在计数行上排队。
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import counters, search_index
+from .models import Task
+
+
+# 单次领取最多尝试的次数（条件 UPDATE 未命中时重取）
+MAX_ATTEMPTS = 10
+
+
+def pending_queue(user_id=None, block_id=None, task_types=None):
+    """
+    待领取的任务队列：未指派或已指派给 user_id 的 Pending 任务，按优先级、任务编号排序
+    """
+    queryset = Task.objects.filter(status='Pending')
+    if user_id is not None:
+        queryset = queryset.filter(Q(assigned_user_id__isnull=True) | Q(assigned_user_id=user_id))
+    if task_types:
+        queryset = queryset.filter(task_type__in=task_types)
+    if block_id is not None:
+        queryset = queryset.filter(
+            Q(from_slot_id__stack_id__block_id=block_id) | Q(to_slot_id__stack_id__block_id=block_id)
+        )
+    return queryset.order_by('priority', 'task_id')
+
+
+def _record_transition(task, old_status, new_status):
+    """条件 UPDATE 不经过模型信号：事务提交后手动维护状态计数与搜索索引"""
+    counters.record_transition('Task', old_status, new_status)
+    search_index.index_object(task)
+
+
+def claim_next(user_id, block_id=None, task_types=None):
+    """
+    为操作员领取队首任务（置为 InProgress 并指派），返回 Task；队列为空时返回 None
+    """
+    for _attempt in range(MAX_ATTEMPTS):
+        with transaction.atomic():
+            task = (
+                pending_queue(user_id, block_id, task_types)
+                .select_related('container_master_id')
+                .select_for_update(skip_locked=True, of=('self',))
+                .first()
+            )
+            if task is None:
+                return None
+            claimed = Task.objects.filter(pk=task.pk, status='Pending').update(
+                status='InProgress', assigned_user_id=user_id
+            )
+            if not claimed:
+                # 已被其它领取者抢先（不支持行锁的数据库），取下一条
+                continue
+            task.status = 'InProgress'
+            task.assigned_user_id_id = user_id
+            transaction.on_commit(lambda: _record_transition(task, 'Pending', 'InProgress'))
+            return task
+    return None
+
+
+def release(task_id, user_id):
+    """
+    操作员放弃已领取的任务：InProgress -> Pending 并取消指派，返回是否成功
+    """
+    with transaction.atomic():
+        released = Task.objects.filter(pk=task_id, status='InProgress', assigned_user_id=user_id).update(
+            status='Pending', assigned_user_id=None
+        )
+        if released:
+            transaction.on_commit(lambda: _record_transition(
+                Task.objects.select_related('container_master_id').get(pk=task_id), 'InProgress', 'Pending'
+            ))
+    return bool(released)
+
+
+def queue_depths(block_id=None, task_types=None):
+    """队列中各任务类型的待领取任务数"""
+    rows = (
+        pending_queue(block_id=block_id, task_types=task_types)
+        .filter(assigned_user_id__isnull=True)
+        .order_by()
+        .values('task_type')
+        .annotate(total=Count('task_id'))
+    )
+    return {row['task_type']: row['total'] for row in rows}
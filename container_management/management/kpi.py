@@ -0,0 +1,69 @@
+"""
+仪表盘 KPI 引擎
+
+每张表的状态直方图只读取一次（来自 Status_Counter 计数表，见 counters.py），
+在内存中推导总数与各状态计数，替代过去每个指标一次 count() 的写法：
+- Task:            总数 / 待处理 / 任务状态分布
+- Container_Master: 总数 / 在堆场 / 集装箱状态分布
+- Vessel_Visit:    总数 / 靠泊
+"""
+from . import counters
+
+
+def histogram_to_stats(histogram, empty_label=None):
+    """
+    将直方图转为模板使用的 [{'name': ..., 'value': ...}]，按状态名排序（None 排在最前）
+    """
+    items = sorted(histogram.items(), key=lambda kv: (kv[0] is not None, kv[0] or ''))
+    stats = []
+    for name, total in items:
+        if empty_label is not None and not name:
+            name = empty_label
+        stats.append({'name': name, 'value': total})
+    return stats
+
+
+class DashboardKpis:
+    """
+    一次请求内的 KPI 计算器：每张表的直方图首次用到时查询一次并缓存，
+    所有派生指标都从缓存的直方图读取，不再产生额外查询。
+    """
+
+    def __init__(self):
+        self._histograms = {}
+
+    def histogram(self, source):
+        if source not in self._histograms:
+            self._histograms[source] = counters.get_histogram(source)
+        return self._histograms[source]
+
+    def total(self, source):
+        return sum(self.histogram(source).values())
+
+    def count(self, source, status):
+        return self.histogram(source).get(status, 0)
+
+    # ---- 模板使用的 KPI ----
+    def task_status_stats(self):
+        return histogram_to_stats(self.histogram('Task'))
+
+    def container_status_stats(self):
+        return histogram_to_stats(self.histogram('Container_Master'), empty_label='未设置')
+
+    def total_containers(self):
+        return self.total('Container_Master')
+
+    def in_yard(self):
+        return self.count('Container_Master', 'InYard')
+
+    def total_tasks(self):
+        return self.total('Task')
+
+    def pending_tasks(self):
+        return self.count('Task', 'Pending')
+
+    def total_visits(self):
+        return self.total('Vessel_Visit')
+
+    def at_berth(self):
+        return self.count('Vessel_Visit', 'AtBerth')
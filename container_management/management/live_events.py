@@ -0,0 +1,214 @@
+"""
+仪表盘实时事件
+
+变更日志（change_log.py）中的新变更由中继（relay）转换为仪表盘事件，追加到共享缓存中的环形缓冲区，
+仪表盘页面经 SSE 长连接（dashboard_views.dashboard_events，ASGI 下由 asgi.py 提供服务）
+增量接收并就地更新页面：
+- task：新建或变化的任务（任务编号、类型、状态、箱号、起止箱位），用于“实时任务动态”列表
+- counts：某张表的完整状态直方图（Task / Container_Master / Vessel_Visit），用于 KPI 与状态分布
+- yard：某个堆场区的箱位总数、已占用数与利用率，用于堆场利用率表
+- visit：船舶访问的状态变化，用于最近船舶访问列表
+
+变更日志由触发器写入，后台修改、触发器联动（如任务完成时的箱位与集装箱状态）、批量完成与
+脚本中的 SQL 修改都会推送，应用代码中不需要逐处发布事件。
+
+中继以 Change_Log_Consumer 中的 CONSUMER 记录位置；各 SSE 连接每次轮询时调用 relay_due()，
+经 cache.add 抢占，全部进程合计每 RELAY_INTERVAL 秒最多读取一次变更日志。
+
+counts / yard 事件携带的是中继时读取的绝对值而不是差量，task / visit 事件按编号覆盖，
+因此重复投递或从快照生成时刻起重放事件都不会使页面数据出错。
+
+事件序号保存在 SEQ_KEY，事件按 序号 % RING_SIZE 写入槽位。每个 SSE 连接在服务端定期读取序号
+（一次缓存读取，不查询数据库），有新事件时按序号批量读取；断线重连时浏览器携带最后收到的序号。
+落后超过 RING_SIZE 条（槽位已被覆盖）时收到 reset 事件，随后服务端补发 current_state()
+（全部状态直方图与堆场利用率的当前值），任务与船舶访问列表中错过的条目不再补发。
+同一时刻只有一个中继写入环形缓冲区，文件缓存 incr 的非原子性不会造成序号冲突。
+序号从当前时间（微秒）起算：缓存被清空或 SEQ_KEY 被淘汰后重新起算的序号远大于旧序号，
+已连接的页面收到 reset，而不会把新事件误认为已收到的旧序号。
+"""
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import change_log, counters
+from .models import ContainerMaster, YardStack, YardUtilization
+
+
+RING_SIZE = 500
+# 事件在缓存中的保留时间（秒）
+EVENT_TIMEOUT = 3600
+# 每批变更只推送最后若干条任务（页面的实时任务列表长度）
+TASK_LIST_SIZE = 10
+
+SEQ_KEY = 'live_events:seq'
+EVENT_KEY = 'live_events:event:{slot}'
+
+# 变更日志中继：消费方名称、最短间隔（秒）与抢占键
+CONSUMER = 'live_dashboard'
+RELAY_INTERVAL = 1
+RELAY_KEY = 'live_events:relay'
+
+
+def _next_seq():
+    try:
+        return cache.incr(SEQ_KEY)
+    except ValueError:
+        base = time.time_ns() // 1000
+        if cache.add(SEQ_KEY, base, None):
+            return base
+        return cache.incr(SEQ_KEY)
+
+
+def _append(event_type, data):
+    seq = _next_seq()
+    event = {'seq': seq, 'type': event_type, 'at': timezone.now().isoformat(), 'data': data}
+    cache.set(EVENT_KEY.format(slot=seq % RING_SIZE), event, EVENT_TIMEOUT)
+    return seq
+
+
+def latest_seq():
+    return cache.get(SEQ_KEY, 0)
+
+
+async def alatest_seq():
+    return await cache.aget(SEQ_KEY, 0)
+
+
+def _collect(after, current, stored):
+    """
+    按序号取出 after 之后的事件；返回 (事件列表, 是否需要 reset)
+    """
+    if current - after > RING_SIZE:
+        return [], True
+    events = []
+    for seq in range(after + 1, current + 1):
+        event = stored.get(EVENT_KEY.format(slot=seq % RING_SIZE))
+        if event is None or event['seq'] != seq:
+            # 槽位已过期或被覆盖：中间有事件丢失
+            return events, True
+        events.append(event)
+    return events, False
+
+
+def _slot_keys(after, current):
+    return [EVENT_KEY.format(slot=seq % RING_SIZE) for seq in range(after + 1, min(current, after + RING_SIZE) + 1)]
+
+
+def events_after(after):
+    """序号大于 after 的事件：返回 (事件列表, 是否需要 reset)"""
+    current = latest_seq()
+    if current <= after:
+        return [], current < after
+    return _collect(after, current, cache.get_many(_slot_keys(after, current)))
+
+
+async def aevents_after(after):
+    current = await alatest_seq()
+    if current <= after:
+        # 序号倒退：缓存被清空过
+        return [], current < after
+    return _collect(after, current, await cache.aget_many(_slot_keys(after, current)))
+
+
+# ---------------- 事件内容 ----------------
+
+def _counts_data(source):
+    histogram = counters.get_histogram(source)
+    return {'source': source, 'histogram': {status or '': total for status, total in histogram.items()}}
+
+
+def _yard_data(item):
+    return {
+        'block_id': item.block_id_id,
+        'slot_count': item.slot_count,
+        'occupied_count': item.occupied_count,
+        'free_count': item.free_count,
+        'utilization_percent': item.utilization_percent,
+    }
+
+
+def current_state():
+    """
+    各表状态直方图与各堆场区利用率的当前值 [(事件类型, 内容), ...]，
+    客户端错过事件（reset）后据此恢复 KPI 与利用率（计数表与快照表均很小）
+    """
+    state = [('counts', _counts_data(source)) for source in counters.COUNTER_SOURCES]
+    state.extend(('yard', _yard_data(item)) for item in YardUtilization.objects.order_by('block_id'))
+    return state
+
+
+def _task_events(changes):
+    """同一任务只取最后一次变更，按变更顺序取最后 TASK_LIST_SIZE 条；箱号一次查询取回"""
+    latest = {}
+    for change in changes:
+        if change.operation != 'D':
+            latest.pop(change.row_id, None)
+            latest[change.row_id] = change
+    changes = list(latest.values())[-TASK_LIST_SIZE:]
+    container_ids = {change.detail.get('Container_Master_ID') for change in changes} - {None}
+    numbers = dict(ContainerMaster.objects.filter(pk__in=container_ids).values_list('pk', 'container_number'))
+    return [
+        ('task', {
+            'task_id': change.row_id,
+            'task_type': change.detail.get('Task_Type'),
+            'status': change.new_status,
+            'container_number': numbers.get(change.detail.get('Container_Master_ID')),
+            'from_slot_id': change.detail.get('From_Slot_ID'),
+            'to_slot_id': change.detail.get('To_Slot_ID'),
+        })
+        for change in changes
+    ]
+
+
+def changes_to_events(changes):
+    """
+    把一批变更日志转换为 [(事件类型, 内容), ...]：
+    有状态变化（含插入、删除）的表推送一次直方图，有箱位变化的堆场区各推送一次利用率
+    """
+    by_table = {}
+    for change in changes:
+        by_table.setdefault(change.table_name, []).append(change)
+
+    events = _task_events(by_table.get('Task', []))
+    events.extend(
+        ('counts', _counts_data(source))
+        for source in counters.COUNTER_SOURCES
+        if any(change.operation != 'U' or change.old_status != change.new_status for change in by_table.get(source, []))
+    )
+
+    stack_ids = {change.detail.get('Stack_ID') for change in by_table.get('Yard_Slot', [])} - {None}
+    if stack_ids:
+        block_ids = set(YardStack.objects.filter(pk__in=stack_ids).values_list('block_id', flat=True))
+        events.extend(
+            ('yard', _yard_data(item))
+            for item in YardUtilization.objects.filter(block_id__in=block_ids).order_by('block_id')
+        )
+
+    for change in by_table.get('Vessel_Visit', []):
+        if change.operation == 'D' or change.old_status == change.new_status:
+            continue
+        events.append(('visit', {
+            'visit_id': change.row_id,
+            'status': change.new_status,
+            'vessel_id': change.detail.get('Vessel_ID'),
+            'ata': change.detail.get('ATA'),
+        }))
+    return events
+
+
+def _publish_changes(changes):
+    for event_type, data in changes_to_events(changes):
+        _append(event_type, data)
+
+
+def relay():
+    """读取一批新的变更日志并写入环形缓冲区，返回游标前进的序号数"""
+    return change_log.consume(CONSUMER, _publish_changes)
+
+
+def relay_due():
+    """距上次中继不足 RELAY_INTERVAL 秒（或本轮已被其它连接抢到）时直接返回 0"""
+    if not cache.add(RELAY_KEY, 1, RELAY_INTERVAL):
+        return 0
+    return relay()
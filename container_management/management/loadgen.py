@@ -0,0 +1,471 @@
+"""
+压测数据生成器
+
+按给定规模生成符合业务规则的合成数据，用于在接近生产的数据量下评估仪表盘、搜索等性能：
+- 主键由生成器直接分配（从各表当前最大值之后开始），外键引用无需回查数据库
+- 多行 INSERT 分批写入，每批一个事务；MySQL 下加载期间关闭会话级外键/唯一性检查
+- MySQL 下加载连接设置 @tos_skip_change_log（change_log.suppressed），变更日志触发器对加载的行
+  不追加 Change_Log；其它会话的并发写入照常记录，各消费方的位置不变
+- 使用固定随机种子与起始日期，同样的参数得到同样的数据
+
+生成的数据遵守触发器与约束的规则：
+- 箱号为 4 个大写字母 + 7 位数字（TRG_Container_Validate_Format / CHK_Container_Number_Format）
+- 一个集装箱最多占用一个箱位，只有“在堆场”的集装箱占用箱位
+- 已确认的订舱单必定关联航次（TRG_Booking_Confirm_Check）
+- 船舶访问的泊位属于挂靠港口；ATD >= ATA（CHK_Visit_Time_Logic）；有 ATD 的访问状态为 Completed
+
+写入完成后重建 Status_Counter、Yard_Utilization、Search_Index 与 Container_Movement（批量插入不经过信号）。
+"""
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import change_log, counters, movements, rawsql, search_index, yard_utilization
+from .models import (
+    Berth,
+    Booking,
+    ContainerMaster,
+    ContainerTypeDict,
+    Party,
+    PortMaster,
+    Task,
+    Users,
+    VesselMaster,
+    VesselVisit,
+    YardBlock,
+    YardSlot,
+    YardStack,
+)
+
+
+# 预设规模；命令行参数可以逐项覆盖
+PRESETS = {
+    'tiny': dict(
+        blocks=2, bays=5, rows=4, tiers=3,
+        containers=200, tasks=500, visits=20, bookings=40,
+        vessels=5, ports=2, parties=10, users=3,
+    ),
+    'small': dict(
+        blocks=6, bays=10, rows=6, tiers=4,
+        containers=5_000, tasks=20_000, visits=500, bookings=1_000,
+        vessels=50, ports=5, parties=50, users=10,
+    ),
+    'medium': dict(
+        blocks=20, bays=20, rows=8, tiers=5,
+        containers=100_000, tasks=500_000, visits=10_000, bookings=20_000,
+        vessels=500, ports=10, parties=200, users=50,
+    ),
+    'production': dict(
+        blocks=50, bays=40, rows=10, tiers=6,
+        containers=1_000_000, tasks=5_000_000, visits=100_000, bookings=200_000,
+        vessels=2_000, ports=20, parties=1_000, users=200,
+    ),
+}
+
+BERTHS_PER_PORT = 4
+COUNTRIES = ['CN', 'SG', 'KR', 'JP', 'DK', 'CH', 'FR', 'DE', 'NL', 'US']
+DEFAULT_TYPES = [
+    ('22G1', 20, 'GP', 2200.00),
+    ('42G1', 40, 'GP', 3800.00),
+    ('45G1', 45, 'GP', 4200.00),
+    ('22R1', 20, 'RF', 2800.00),
+    ('42R1', 40, 'RF', 4500.00),
+    ('22T1', 20, 'TK', 2500.00),
+]
+TASK_TYPES = ['Load', 'Discharge', 'Move', 'GateIn', 'GateOut']
+TASK_TYPE_WEIGHTS = [25, 25, 20, 15, 15]
+# 历史任务大多已完成，少量处于待处理/进行中
+TASK_STATUSES = ['Completed', 'Cancelled', 'InProgress', 'Pending']
+TASK_STATUS_WEIGHTS = [90, 3, 2, 5]
+
+
+def chunked(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class LoadDataGenerator:
+    """
+    按配置生成压测数据；run() 返回 {表名: 插入行数}
+    """
+
+    def __init__(self, config, seed=42, prefix='LD', batch_size=2000, occupancy=0.7,
+                 start_date=None, days=365, log=print):
+        self.config = config
+        self.rng = random.Random(seed)
+        self.prefix = prefix.upper()
+        self.batch_size = batch_size
+        self.occupancy = occupancy
+        self.start = start_date or timezone.make_aware(datetime(2025, 1, 1))
+        self.span_seconds = days * 24 * 3600
+        self.log = log
+        self.summary = {}
+
+    # ---------------- 写入工具 ----------------
+
+    def next_id(self, model):
+        return (model.objects.aggregate(m=Max(model._meta.pk.name))['m'] or 0) + 1
+
+    def insert(self, model, fields, rows):
+        """
+        按批写入多行 INSERT；rows 为与 fields 对应的元组迭代器，返回插入行数
+        """
+        opts = model._meta
+        qn = connection.ops.quote_name
+        columns = [opts.get_field(name).column for name in fields]
+        datetime_positions = [
+            i for i, name in enumerate(fields) if opts.get_field(name).get_internal_type() == 'DateTimeField'
+        ]
+        per_batch = self.batch_size
+        max_params = connection.features.max_query_params
+        if max_params:
+            per_batch = max(1, min(per_batch, max_params // len(columns)))
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        head = f"INSERT INTO {qn(opts.db_table)} ({', '.join(qn(c) for c in columns)}) VALUES "
+
+        total = 0
+        started = time.monotonic()
+        for batch in chunked(rows, per_batch):
+            params = []
+            for row in batch:
+                if datetime_positions:
+                    row = list(row)
+                    for i in datetime_positions:
+                        row[i] = connection.ops.adapt_datetimefield_value(row[i])
+                params.extend(row)
+            with transaction.atomic():
+                rawsql.execute(head + ', '.join([row_sql] * len(batch)), params, label=f'loadgen:{opts.db_table}')
+            total += len(batch)
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        self.log(f'  ✓ {opts.db_table}: {total} 行，用时 {elapsed:.1f}s（{rate:,.0f} 行/秒）')
+        self.summary[opts.db_table] = self.summary.get(opts.db_table, 0) + total
+        return total
+
+    def random_time(self):
+        return self.start + timedelta(seconds=self.rng.randrange(self.span_seconds))
+
+    # ---------------- 各表生成 ----------------
+
+    def check_prefix(self):
+        if YardBlock.objects.filter(block_name__startswith=self.prefix).exists() or \
+                Party.objects.filter(party_name__startswith=self.prefix).exists():
+            raise ValueError(f'前缀 {self.prefix} 的压测数据已存在，请换用其它前缀')
+
+    def generate_parties(self):
+        n = self.config['parties']
+        start = self.next_id(Party)
+        self.party_ids = list(range(start, start + n))
+        # 前 10% 的相关方作为承运人（有 SCAC 代码）
+        carrier_count = max(1, n // 10)
+        self.carrier_ids = self.party_ids[:carrier_count]
+        rows = (
+            (pid, f'{self.prefix}相关方{i:06d}', 'COMPANY', self.rng.choice(COUNTRIES),
+             f'{self.prefix[:2]}{i:02d}'[:10] if i < carrier_count else None)
+            for i, pid in enumerate(self.party_ids)
+        )
+        self.insert(Party, ['party_id', 'party_name', 'party_type', 'country', 'scac_code'], rows)
+
+    def generate_ports(self):
+        n = self.config['ports']
+        start = self.next_id(PortMaster)
+        self.port_ids = list(range(start, start + n))
+        taken = set(PortMaster.objects.values_list('port_code', flat=True))
+        codes = []
+        letters = string.ascii_uppercase
+        while len(codes) < n:
+            code = ''.join(self.rng.choice(letters) for _ in range(5))
+            if code not in taken:
+                taken.add(code)
+                codes.append(code)
+        self.insert(
+            PortMaster,
+            ['port_id', 'port_name', 'port_code', 'country'],
+            ((pid, f'{self.prefix}港口{i:03d}', codes[i], self.rng.choice(COUNTRIES)) for i, pid in enumerate(self.port_ids)),
+        )
+
+        start = self.next_id(Berth)
+        self.berths_by_port = {}
+        rows = []
+        berth_id = start
+        for pid in self.port_ids:
+            self.berths_by_port[pid] = []
+            for j in range(1, BERTHS_PER_PORT + 1):
+                self.berths_by_port[pid].append(berth_id)
+                rows.append((berth_id, pid, f'{self.prefix}-B{j:02d}', 350 + self.rng.randrange(100), 15 + self.rng.randrange(5)))
+                berth_id += 1
+        self.insert(Berth, ['berth_id', 'port_id', 'berth_name', 'length_meters', 'depth_meters'], rows)
+
+    def generate_vessels(self):
+        n = self.config['vessels']
+        start = self.next_id(VesselMaster)
+        self.vessel_ids = list(range(start, start + n))
+        taken = set(VesselMaster.objects.values_list('imo_number', flat=True))
+        imo_numbers = []
+        candidate = 9_000_000 + self.rng.randrange(500_000)
+        while len(imo_numbers) < n:
+            code = str(candidate % 10_000_000).zfill(7)
+            if code not in taken:
+                imo_numbers.append(code)
+            candidate += 1
+        self.insert(
+            VesselMaster,
+            ['vessel_id', 'vessel_name', 'imo_number', 'flag_country', 'carrier_party_id'],
+            ((vid, f'{self.prefix} 船舶 {i:05d}', imo_numbers[i], self.rng.choice(COUNTRIES), self.rng.choice(self.carrier_ids))
+             for i, vid in enumerate(self.vessel_ids)),
+        )
+
+    def ensure_container_types(self):
+        self.type_codes = list(ContainerTypeDict.objects.values_list('type_code', flat=True))
+        if not self.type_codes:
+            ContainerTypeDict.objects.bulk_create([
+                ContainerTypeDict(type_code=code, nominal_size=size, group_code=group, standard_tare_kg=tare)
+                for code, size, group, tare in DEFAULT_TYPES
+            ])
+            self.type_codes = [code for code, _size, _group, _tare in DEFAULT_TYPES]
+
+    def generate_users(self):
+        n = self.config['users']
+        start = self.next_id(Users)
+        self.user_ids = list(range(start, start + n))
+        name = self.prefix.lower()
+        self.insert(
+            Users,
+            ['user_id', 'username', 'hashed_password', 'full_name', 'email', 'is_active'],
+            ((uid, f'{name}_op{i:04d}', b'', f'{self.prefix} 操作员 {i:04d}', f'{name}_op{i:04d}@loadgen.example.com', True)
+             for i, uid in enumerate(self.user_ids)),
+        )
+
+    def generate_yard(self):
+        cfg = self.config
+        block_start = self.next_id(YardBlock)
+        self.block_ids = list(range(block_start, block_start + cfg['blocks']))
+        block_names = {bid: f'{self.prefix}{i + 1:03d}' for i, bid in enumerate(self.block_ids)}
+        # 约 10% 的堆场区为冷藏区
+        self.insert(
+            YardBlock,
+            ['block_id', 'block_name', 'block_type'],
+            ((bid, block_names[bid], 'Reefer' if i % 10 == 9 else 'Standard') for i, bid in enumerate(self.block_ids)),
+        )
+
+        stack_start = self.next_id(YardStack)
+        stacks = []
+        stack_id = stack_start
+        for bid in self.block_ids:
+            for bay in range(1, cfg['bays'] + 1):
+                for row in range(1, cfg['rows'] + 1):
+                    stacks.append((stack_id, bid, bay, row))
+                    stack_id += 1
+        self.insert(YardStack, ['stack_id', 'block_id', 'bay_number', 'row_number'], stacks)
+        self.stacks = stacks
+
+    def generate_containers(self):
+        n = self.config['containers']
+        start = self.next_id(ContainerMaster)
+        self.container_ids = range(start, start + n)
+
+        # 箱主代码：3 个字母 + 'U'（ISO 6346 箱主代码类别），每个代码最多 10^7 个序号
+        owner_count = max(-(-n // 10_000_000), min(len(self.party_ids), 10), 1)
+        owners = []
+        while len(owners) < owner_count:
+            code = ''.join(self.rng.choice(string.ascii_uppercase) for _ in range(3)) + 'U'
+            if code not in owners:
+                owners.append(code)
+        prefix_filter = Q()
+        for code in owners:
+            prefix_filter |= Q(container_number__startswith=code)
+        taken = set(ContainerMaster.objects.filter(prefix_filter).values_list('container_number', flat=True))
+
+        # 在堆场的集装箱数量受箱位数与占用率限制，其余在船上或已出闸
+        total_slots = len(self.stacks) * self.config['tiers']
+        in_yard = min(int(total_slots * self.occupancy), n)
+        statuses = ['InYard'] * in_yard + [
+            'OnVessel' if self.rng.random() < 0.4 else 'GateOut' for _ in range(n - in_yard)
+        ]
+        self.rng.shuffle(statuses)
+        self.container_status = statuses
+
+        serials = {code: 0 for code in owners}
+
+        def numbers():
+            for i in range(n):
+                code = owners[i % owner_count]
+                while True:
+                    number = f'{code}{serials[code]:07d}'
+                    serials[code] += 1
+                    if number not in taken:
+                        yield number
+                        break
+
+        owner_parties = [self.party_ids[i % len(self.party_ids)] for i in range(owner_count)]
+        self.insert(
+            ContainerMaster,
+            ['container_master_id', 'container_number', 'owner_party_id', 'type_code', 'current_status'],
+            ((cid, number, owner_parties[i % owner_count], self.rng.choice(self.type_codes), statuses[i])
+             for i, (cid, number) in enumerate(zip(self.container_ids, numbers()))),
+        )
+
+    def generate_slots(self):
+        tiers = self.config['tiers']
+        block_names = {bid: f'{self.prefix}{i + 1:03d}' for i, bid in enumerate(self.block_ids)}
+        start = self.next_id(YardSlot)
+        total_slots = len(self.stacks) * tiers
+        self.slot_ids = range(start, start + total_slots)
+
+        # 在堆场的集装箱随机分配到互不相同的箱位
+        in_yard = [cid for cid, status in zip(self.container_ids, self.container_status) if status == 'InYard']
+        positions = self.rng.sample(range(total_slots), len(in_yard))
+        occupant = dict(zip(positions, in_yard))
+        self.container_slot = {cid: start + pos for pos, cid in occupant.items()}
+        self.available_slots = [start + pos for pos in range(total_slots) if pos not in occupant]
+
+        def rows():
+            pos = 0
+            for stack_id, bid, bay, row in self.stacks:
+                for tier in range(1, tiers + 1):
+                    container_id = occupant.get(pos)
+                    if container_id is not None:
+                        status = 'Occupied'
+                    else:
+                        status = 'Maintenance' if self.rng.random() < 0.01 else 'Available'
+                    yield (start + pos, stack_id, tier, f'{block_names[bid]}-{bay}-{row}-{tier}', status, container_id)
+                    pos += 1
+
+        self.insert(
+            YardSlot,
+            ['slot_id', 'stack_id', 'tier_number', 'slot_coordinates', 'slot_status', 'current_container_id'],
+            rows(),
+        )
+
+    def generate_visits(self):
+        n = self.config['visits']
+        start = self.next_id(VesselVisit)
+        self.visit_ids = range(start, start + n)
+        self.confirmable_visits = []
+
+        def rows():
+            for i, vid in enumerate(self.visit_ids):
+                port_id = self.rng.choice(self.port_ids)
+                berth_id = self.rng.choice(self.berths_by_port[port_id])
+                roll = self.rng.random()
+                ata = self.random_time()
+                atd = None
+                if roll < 0.85:
+                    status = 'Completed'
+                    atd = ata + timedelta(hours=12 + self.rng.randrange(60))
+                elif roll < 0.90:
+                    status = 'AtBerth'
+                elif roll < 0.95:
+                    status = 'Departing'
+                else:
+                    status, ata, berth_id = 'Approaching', None, None
+                voyage = f'{self.prefix}{i:07d}'
+                yield (vid, self.rng.choice(self.vessel_ids), port_id, berth_id, f'{voyage}W', f'{voyage}E', ata, atd, status)
+
+        self.insert(
+            VesselVisit,
+            ['vessel_visit_id', 'vessel_id', 'port_id', 'berth_id', 'voyage_number_in', 'voyage_number_out', 'ata', 'atd', 'status'],
+            rows(),
+        )
+
+    def generate_bookings(self):
+        n = self.config['bookings']
+        start = self.next_id(Booking)
+
+        def rows():
+            for i in range(n):
+                roll = self.rng.random()
+                status = 'Confirmed' if roll < 0.7 else ('Draft' if roll < 0.9 else 'Cancelled')
+                # 已确认的订舱单必须关联航次，其余状态随机关联
+                voyage_id = self.rng.choice(self.visit_ids) if status == 'Confirmed' or self.rng.random() < 0.5 else None
+                yield (start + i, f'{self.prefix}BK{i:09d}', status, self.rng.choice(self.party_ids),
+                       self.rng.choice(self.party_ids), self.rng.choice(self.party_ids), voyage_id)
+
+        self.insert(
+            Booking,
+            ['booking_id', 'booking_number', 'status', 'shipper_party_id', 'consignee_party_id', 'payer_party_id', 'voyage_id'],
+            rows(),
+        )
+
+    def generate_tasks(self):
+        n = self.config['tasks']
+        start = self.next_id(Task)
+        rng = self.rng
+        container_ids = self.container_ids
+        slot_ids = self.slot_ids
+        available = self.available_slots or list(slot_ids)
+
+        def rows():
+            types = rng.choices(TASK_TYPES, TASK_TYPE_WEIGHTS, k=n)
+            statuses = rng.choices(TASK_STATUSES, TASK_STATUS_WEIGHTS, k=n)
+            for i in range(n):
+                task_type, status = types[i], statuses[i]
+                container_id = rng.choice(container_ids)
+                if status in ('Pending', 'InProgress') and container_id in self.container_slot:
+                    # 未完成任务从集装箱当前箱位出发，移往空闲箱位
+                    from_slot = self.container_slot[container_id]
+                    to_slot = rng.choice(available)
+                else:
+                    from_slot = rng.choice(slot_ids)
+                    to_slot = rng.choice(slot_ids)
+                visit_id = rng.choice(self.visit_ids) if task_type in ('Load', 'Discharge') else None
+                assigned = rng.choice(self.user_ids) if status != 'Pending' or rng.random() < 0.5 else None
+                executor = assigned if status in ('Completed', 'InProgress') else None
+                moved_at = self.random_time() if status == 'Completed' else None
+                yield (start + i, task_type, status, container_id, from_slot, to_slot, visit_id,
+                       rng.choice(self.user_ids), assigned, executor, 1 + rng.randrange(200), moved_at)
+
+        self.insert(
+            Task,
+            ['task_id', 'task_type', 'status', 'container_master_id', 'from_slot_id', 'to_slot_id', 'vessel_visit_id',
+             'created_by_user_id', 'assigned_user_id', 'actual_executor_id', 'priority', 'movement_timestamp'],
+            rows(),
+        )
+
+    # ---------------- 入口 ----------------
+
+    def run(self):
+        self.check_prefix()
+        steps = [
+            ('相关方', self.generate_parties),
+            ('港口与泊位', self.generate_ports),
+            ('船舶', self.generate_vessels),
+            ('集装箱类型', self.ensure_container_types),
+            ('用户', self.generate_users),
+            ('堆场区与堆栈', self.generate_yard),
+            ('集装箱', self.generate_containers),
+            ('箱位', self.generate_slots),
+            ('船舶访问', self.generate_visits),
+            ('订舱单', self.generate_bookings),
+            ('作业任务', self.generate_tasks),
+        ]
+        mysql = connection.vendor == 'mysql'
+        if mysql:
+            # 生成的数据自身满足外键与唯一约束，加载期间关闭会话级检查以加快写入
+            rawsql.execute('SET SESSION foreign_key_checks = 0, unique_checks = 0', label='loadgen')
+        try:
+            with change_log.suppressed():
+                for index, (label, step) in enumerate(steps, start=1):
+                    self.log(f'[{index}/{len(steps)}] {label}')
+                    step()
+        finally:
+            if mysql:
+                rawsql.execute('SET SESSION foreign_key_checks = 1, unique_checks = 1', label='loadgen')
+
+        self.log('重建派生汇总表...')
+        counters.reconcile_all()
+        yard_utilization.refresh()
+        search_index.rebuild(batch_size=self.batch_size)
+        movements.backfill()
+        return self.summary
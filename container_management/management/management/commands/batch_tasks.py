@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from management import task_batch
+from management.models import Task
+from management.slot_allocator import NoSlotAvailable
+
+
+class Command(BaseCommand):
+    help = '批量创建装船/卸船计划任务，或批量完成任务（集合式更新，不逐条触发）'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        create = subparsers.add_parser('create', help='按计划文件（JSON）在一个事务中创建任务')
+        create.add_argument(
+            'file',
+            help='计划文件：{"task_type": "Load", "created_by": 用户, "vessel_visit": 编号, '
+                 '"assigned_user": 用户, "moves": [{"container": 箱号, "from_slot": 坐标, "to_slot": 坐标, "priority": 100}]}',
+        )
+
+        complete = subparsers.add_parser('complete', help='在一个事务中批量完成任务')
+        complete.add_argument('task_ids', nargs='*', type=int, help='任务编号')
+        complete.add_argument('--visit', type=int, help='完成该船舶访问下的全部未完成任务')
+        complete.add_argument('--type', dest='task_type', choices=task_batch.TASK_TYPES, help='只完成该类型的任务')
+        complete.add_argument('--executor', help='实际执行人（用户编号或用户名）')
+
+    def handle(self, *args, **options):
+        if options['action'] == 'create':
+            self.create(options)
+        else:
+            self.complete(options)
+
+    def create(self, options):
+        try:
+            with open(options['file'], encoding='utf-8') as f:
+                plan = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'无法读取计划文件: {exc}')
+        if not plan.get('created_by'):
+            raise CommandError('计划文件缺少 created_by')
+
+        try:
+            result = task_batch.create_plan(
+                plan.get('task_type'),
+                plan.get('moves') or [],
+                created_by=plan['created_by'],
+                vessel_visit=plan.get('vessel_visit'),
+                assigned_user=plan.get('assigned_user'),
+            )
+        except task_batch.BatchError as exc:
+            for index, message in exc.errors:
+                self.stdout.write(self.style.ERROR(f'  ✗ 第 {index + 1} 条: {message}'))
+            raise CommandError(str(exc))
+        except NoSlotAvailable as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'✅ 已创建 {result["created"]} 条任务'))
+
+    def complete(self, options):
+        task_ids = options['task_ids']
+        if options['visit']:
+            queryset = Task.objects.filter(vessel_visit_id=options['visit']).exclude(status__in=['Completed', 'Cancelled'])
+            if options['task_type']:
+                queryset = queryset.filter(task_type=options['task_type'])
+            task_ids = task_ids + list(queryset.values_list('pk', flat=True))
+        elif not task_ids:
+            raise CommandError('请指定任务编号或 --visit')
+        if not task_ids:
+            self.stdout.write('没有需要完成的任务')
+            return
+
+        result = task_batch.complete_tasks(task_ids, executor=options['executor'])
+        self.stdout.write(self.style.SUCCESS(f'✅ 已完成 {result["completed"]} 条任务'))
+        if result['skipped']:
+            self.stdout.write(f'   跳过 {result["skipped"]} 条（已完成或不存在）')
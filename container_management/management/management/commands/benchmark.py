@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from management import benchmarks
+
+
+class Command(BaseCommand):
+    help = '对仪表盘、搜索、权限检查与后台列表等热点路径做基准测试，输出延迟百分位与查询数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='每个场景的计时次数，默认 20')
+        parser.add_argument('--warmup', type=int, default=2, help='每个场景的预热次数，默认 2')
+        parser.add_argument('--only', nargs='*', help='只运行名称以这些前缀开头的场景，如 dashboard search:')
+        parser.add_argument('--search', nargs='*', help='搜索场景使用的关键字，默认从现有数据中挑选')
+        parser.add_argument('--cold-cache', action='store_true', help='每次请求前清空缓存')
+        parser.add_argument('--label', help='写入结果的标签（如分支名）')
+        parser.add_argument('--output', help='结果 JSON 的保存路径')
+        parser.add_argument('--compare', help='与之比较的基线结果 JSON')
+        parser.add_argument('--time-ratio', type=float, default=1.25, help='耗时超过基线多少倍视为回归，默认 1.25')
+        parser.add_argument('--extra-queries', type=int, default=0, help='允许比基线多出的查询数，默认 0')
+        parser.add_argument('--metric', default='p50_ms', choices=['p50_ms', 'p90_ms', 'p99_ms', 'mean_ms'], help='比较耗时使用的指标')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations 至少为 1')
+
+        runner = benchmarks.BenchmarkRunner(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            cold_cache=options['cold_cache'],
+            log=self.stdout.write,
+        )
+        results = runner.run(only=options['only'], search_queries=options['search'])
+        report = benchmarks.build_report(
+            results, label=options['label'], iterations=options['iterations'], cold_cache=options['cold_cache']
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                json.dump(report, fp, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'✅ 结果已写入 {options["output"]}'))
+        else:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+        if options['compare']:
+            baseline = benchmarks.load_report(options['compare'])
+            regressions = benchmarks.compare_results(
+                baseline, report,
+                time_ratio=options['time_ratio'],
+                extra_queries=options['extra_queries'],
+                metric=options['metric'],
+            )
+            if regressions:
+                for name, detail in regressions:
+                    self.stderr.write(f'❌ {name}: {detail}')
+                raise CommandError(f'发现 {len(regressions)} 项回归')
+            self.stdout.write(self.style.SUCCESS('✅ 与基线相比没有回归'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from management import shared_cache
+from management.dashboard_context import VIEW_COLUMNS, view_sample_key
+
+
+class Command(BaseCommand):
+    help = '查看仪表板视图样本在共享缓存中的命中统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='输出后清零统计')
+
+    def handle(self, *args, **options):
+        keys = [view_sample_key(view_name) for view_name in VIEW_COLUMNS]
+        totals = dict.fromkeys(shared_cache.COUNTER_KINDS, 0)
+        self.stdout.write(f'  {"缓存键":<50} {"命中":>8} {"旧值":>8} {"未命中":>8}')
+        for key, counts in shared_cache.stats(keys).items():
+            self.stdout.write(f'  {key:<50} {counts["hit"]:>8} {counts["stale"]:>8} {counts["miss"]:>8}')
+            for kind, value in counts.items():
+                totals[kind] += value
+        requests = sum(totals.values())
+        ratio = (totals['hit'] + totals['stale']) / requests * 100 if requests else 0
+        self.stdout.write(self.style.SUCCESS(f'✅ 共 {requests} 次读取，命中率 {ratio:.1f}%'))
+        if options['reset']:
+            shared_cache.reset_stats(keys)
+            self.stdout.write('   统计已清零')
@@ -0,0 +1,65 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from management import change_log
+
+
+class Command(BaseCommand):
+    help = '查看变更日志（Change_Log）、各消费方的位置，清理已处理的旧日志或重建触发器'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        tail = subparsers.add_parser('tail', help='输出指定序号之后的变更')
+        tail.add_argument('--after', type=int, help='起始序号（不含），默认输出最近 --limit 条')
+        tail.add_argument('--table', action='append', choices=list(change_log.CHANGE_LOG_TABLES), help='只输出该表（可重复）')
+        tail.add_argument('--limit', type=int, default=50, help='最多输出的行数')
+
+        subparsers.add_parser('consumers', help='各消费方的位置与落后的变更数')
+
+        purge = subparsers.add_parser('purge', help='删除早于指定天数且所有消费方都已处理的变更')
+        purge.add_argument('--days', type=int, default=7, help='保留最近多少天（默认 7）')
+
+        subparsers.add_parser('install-triggers', help='（重新）创建变更日志触发器')
+
+    def handle(self, *args, **options):
+        getattr(self, options['action'].replace('-', '_'))(options)
+
+    def tail(self, options):
+        after = options['after']
+        if after is None:
+            after = max(change_log.latest_id() - options['limit'], 0)
+        rows, position = change_log.read_changes(after, options['limit'], options['table'])
+        for row in rows:
+            status = row.new_status if row.operation == 'I' else f'{row.old_status} -> {row.new_status}'
+            self.stdout.write(
+                f'  #{row.change_id} {timezone.localtime(row.changed_at):%Y-%m-%d %H:%M:%S} '
+                f'{row.table_name}:{row.row_id} {row.operation} {status} {json.dumps(row.detail, ensure_ascii=False)}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✅ 共 {len(rows)} 条变更，下次从 --after {position} 继续'))
+
+    def consumers(self, options):
+        lag = change_log.consumer_lag()
+        if not lag:
+            self.stdout.write('没有消费方')
+            return
+        self.stdout.write(f'  {"消费方":<30} {"位置":>12} {"落后":>10}')
+        for name, (position, behind) in lag.items():
+            self.stdout.write(f'  {name:<30} {position:>12} {behind:>10}')
+        self.stdout.write(self.style.SUCCESS(f'✅ 最新序号 {change_log.latest_id()}'))
+
+    def purge(self, options):
+        if options['days'] < 0:
+            raise CommandError('--days 不能为负数')
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        deleted = change_log.purge(before)
+        self.stdout.write(self.style.SUCCESS(f'✅ 已删除 {deleted} 条变更日志'))
+
+    def install_triggers(self, options):
+        count = change_log.install_triggers()
+        if not count:
+            raise CommandError('当前数据库不支持变更日志触发器（仅 MySQL / SQLite）')
+        self.stdout.write(self.style.SUCCESS(f'✅ 已创建 {count} 个触发器'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from management import query_plans
+
+
+class Command(BaseCommand):
+    help = '对登记的热点查询执行 EXPLAIN，出现全表扫描时失败'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='只检查指定名称的查询，默认全部')
+        parser.add_argument(
+            '--min-rows', type=int, default=0,
+            help='MySQL 下预估行数低于该值的全表扫描不视为失败（小表优化器可能直接全表扫描），默认 0',
+        )
+        parser.add_argument('--show-plan', action='store_true', help='输出每条查询的执行计划')
+
+    def handle(self, *args, **options):
+        unknown = [name for name in options['names'] if name not in query_plans.HOT_QUERIES]
+        if unknown:
+            raise CommandError(f'未登记的查询: {", ".join(unknown)}；可选: {", ".join(query_plans.HOT_QUERIES)}')
+
+        reports = query_plans.check(options['names'] or None, min_rows=options['min_rows'])
+        failed = []
+        for report in reports:
+            if report['skipped']:
+                self.stdout.write(f'  - {report["name"]:<28} 跳过（当前数据库不适用）')
+                continue
+            if report['violations']:
+                failed.append(report['name'])
+                self.stdout.write(self.style.ERROR(f'  ✗ {report["name"]:<28} {report["description"]}'))
+                for table, detail in report['violations']:
+                    self.stdout.write(f'      全表扫描 {table}: {detail}')
+            else:
+                self.stdout.write(f'  ✓ {report["name"]:<28} {report["description"]}')
+            if options['show_plan']:
+                for row in report['plan']:
+                    self.stdout.write(f'      {row}')
+
+        if failed:
+            raise CommandError(f'{len(failed)} 条热点查询出现全表扫描: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(reports)} 条热点查询均未出现全表扫描'))
@@ -0,0 +1,105 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import dateparse, timezone
+
+from management import movements
+from management.models import ContainerMaster
+
+
+def _parse_time(value):
+    """ISO 日期或日期时间（按当前时区）"""
+    parsed = dateparse.parse_datetime(value)
+    if parsed is None:
+        day = dateparse.parse_date(value)
+        if day is None:
+            raise CommandError(f'无法解析时间：{value}')
+        parsed = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = '维护集装箱移动历史（Container_Movement）：同步变更日志、重建历史、维护分区，查询位置与堆场停留时间'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        subparsers.add_parser('sync', help='把变更日志中的新移动写入历史')
+        subparsers.add_parser('backfill', help='清空并按已完成任务重建全部历史')
+
+        partitions = subparsers.add_parser('partitions', help='（MySQL）建立未来的月分区，建议每月定时执行')
+        partitions.add_argument('--ahead', type=int, default=movements.PARTITION_MONTHS_AHEAD, help='提前建立的月数')
+
+        location = subparsers.add_parser('location', help='集装箱在某时刻的位置')
+        location.add_argument('container', help='集装箱编号或箱号')
+        location.add_argument('--at', help='时刻（ISO 格式），默认现在')
+        location.add_argument('--history', action='store_true', help='输出该集装箱的全部位置记录')
+
+        dwell = subparsers.add_parser('dwell', help='时间段内各堆场区的停留时间')
+        dwell.add_argument('--start', required=True, help='起始时间（ISO 格式）')
+        dwell.add_argument('--end', help='结束时间（ISO 格式），默认现在')
+        dwell.add_argument('--block', type=int, action='append', help='只统计该堆场区（可重复）')
+
+    def handle(self, *args, **options):
+        getattr(self, options['action'])(options)
+
+    def sync(self, options):
+        read = movements.sync()
+        self.stdout.write(self.style.SUCCESS(f'✅ 已处理 {read} 条变更日志'))
+
+    def backfill(self, options):
+        total, skipped = movements.backfill()
+        if skipped:
+            self.stdout.write(f'   跳过 {skipped} 个没有移动时间的已完成任务（变更日志已清理）')
+        self.stdout.write(self.style.SUCCESS(f'✅ 已重建 {total} 条移动记录'))
+
+    def partitions(self, options):
+        if options['ahead'] < 0:
+            raise CommandError('--ahead 不能为负数')
+        if not movements.existing_partitions():
+            raise CommandError('Container_Movement 未分区（仅 MySQL 下由迁移 0010 分区）')
+        created = movements.ensure_partitions(options['ahead'])
+        self.stdout.write(self.style.SUCCESS(f'✅ 新建分区：{", ".join(created) or "无"}'))
+
+    def _format(self, row):
+        if row['location_type'] == 'Yard':
+            place = f'堆场区 {row["block_id"]} 箱位 {row["slot_id__slot_coordinates"]}'
+        elif row['location_type'] == 'Vessel':
+            place = f'船上（船舶访问 {row["vessel_visit_id"]}）'
+        else:
+            place = '已出闸'
+        left = f'{timezone.localtime(row["left_at"]):%Y-%m-%d %H:%M:%S}' if row['left_at'] else '至今'
+        return f'  {timezone.localtime(row["moved_at"]):%Y-%m-%d %H:%M:%S} ~ {left}  {place}'
+
+    def location(self, options):
+        try:
+            if options['history']:
+                rows = movements.history(options['container'])
+                for row in rows:
+                    self.stdout.write(self._format(row))
+                self.stdout.write(self.style.SUCCESS(f'✅ 共 {len(rows)} 条位置记录'))
+                return
+            at = _parse_time(options['at']) if options['at'] else timezone.now()
+            row = movements.location_at(options['container'], at)
+        except ContainerMaster.DoesNotExist:
+            raise CommandError(f'集装箱不存在：{options["container"]}')
+        if row is None:
+            raise CommandError(f'{timezone.localtime(at):%Y-%m-%d %H:%M:%S} 之前没有该集装箱的位置记录')
+        self.stdout.write(self._format(row))
+        self.stdout.write(self.style.SUCCESS(f'✅ {timezone.localtime(at):%Y-%m-%d %H:%M:%S} 的位置'))
+
+    def dwell(self, options):
+        start = _parse_time(options['start'])
+        end = _parse_time(options['end']) if options['end'] else timezone.now()
+        if end <= start:
+            raise CommandError('--end 必须晚于 --start')
+        stats = movements.dwell_by_block(start, end, options['block'])
+        self.stdout.write(f'  {"堆场区":<20} {"停留次数":>8} {"集装箱数":>8} {"总时长(h)":>12} {"平均(h)":>10}')
+        for block_id, item in stats.items():
+            name = f'{block_id} {item["block_name"] or ""}'
+            self.stdout.write(
+                f'  {name:<20} {item["stays"]:>8} {item["containers"]:>8} {item["total_hours"]:>12} {item["avg_hours"]:>10}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✅ 共 {len(stats)} 个堆场区'))
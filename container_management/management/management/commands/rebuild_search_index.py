@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from management import search_index
+
+
+class Command(BaseCommand):
+    help = '从源表全量重建 Search_Index 聚合搜索索引（批量 SQL 绕过信号后使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'types',
+            nargs='*',
+            help=f'要重建的对象类型，默认全部：{", ".join(search_index.SOURCES)}',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='每批处理的对象数，默认 2000')
+
+    def handle(self, *args, **options):
+        types = options['types'] or list(search_index.SOURCES)
+        unknown = [t for t in types if t not in search_index.SOURCES]
+        if unknown:
+            raise CommandError(f'未知对象类型: {", ".join(unknown)}')
+
+        summary = search_index.rebuild(types, batch_size=options['batch_size'])
+        for object_type, total in summary.items():
+            self.stdout.write(self.style.SUCCESS(f'✅ {object_type}: {total} 行'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from management import counters
+
+
+class Command(BaseCommand):
+    help = '从源表重建 Status_Counter 状态计数（批量 SQL 绕过信号/触发器后使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sources',
+            nargs='*',
+            help=f'要重建的来源表，默认全部：{", ".join(counters.COUNTER_SOURCES)}',
+        )
+
+    def handle(self, *args, **options):
+        sources = options['sources'] or list(counters.COUNTER_SOURCES)
+        unknown = [s for s in sources if s not in counters.COUNTER_SOURCES]
+        if unknown:
+            raise CommandError(f'未知来源表: {", ".join(unknown)}')
+
+        for source in sources:
+            histogram = counters.reconcile_source(source)
+            self.stdout.write(self.style.SUCCESS(f'✅ {source}: 共 {sum(histogram.values())} 行'))
+            for status, total in sorted(histogram.items(), key=lambda kv: kv[0] or ''):
+                self.stdout.write(f'   {status or "未设置"}: {total}')
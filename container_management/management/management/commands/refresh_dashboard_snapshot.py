@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from management import dashboard_snapshot
+
+
+class Command(BaseCommand):
+    help = '后台刷新仪表盘快照：周期性计算全部仪表盘数据并写入共享缓存'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=dashboard_snapshot.REFRESH_INTERVAL,
+            help=f'刷新间隔（秒），默认 {dashboard_snapshot.REFRESH_INTERVAL}；应小于快照新鲜期 {dashboard_snapshot.MAX_AGE} 秒',
+        )
+        parser.add_argument('--once', action='store_true', help='只刷新一次后退出')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            try:
+                snapshot = dashboard_snapshot.refresh()
+            except Exception as exc:
+                # 数据库暂时不可用等：记录后继续下一轮，缓存中的旧快照在新鲜期内仍可使用
+                self.stderr.write(self.style.ERROR(f'✗ 快照生成失败: {exc}'))
+                if options['once']:
+                    raise
+            else:
+                elapsed = (time.monotonic() - started) * 1000
+                self.stdout.write(self.style.SUCCESS(
+                    f'✅ {snapshot["generated_at"]:%Y-%m-%d %H:%M:%S} 快照已刷新，用时 {elapsed:.0f} ms'
+                ))
+            if options['once']:
+                return
+            # 长时间运行：每轮结束时关闭失效的数据库连接
+            close_old_connections()
+            time.sleep(max(0, options['interval'] - (time.monotonic() - started)))
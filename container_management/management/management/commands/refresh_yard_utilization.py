@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from management import yard_utilization
+
+
+class Command(BaseCommand):
+    help = '从箱位表全量重建 Yard_Utilization 堆场利用率快照'
+
+    def add_arguments(self, parser):
+        parser.add_argument('block_ids', nargs='*', type=int, help='只重建指定堆场区编号，默认全部')
+
+    def handle(self, *args, **options):
+        block_ids = options['block_ids'] or None
+        count = yard_utilization.refresh(block_ids)
+        self.stdout.write(self.style.SUCCESS(f'✅ 已重建 {count} 个堆场区的利用率快照'))
+        totals = yard_utilization.get_totals()
+        self.stdout.write(f'   总箱位数: {totals["总箱位数"]}  已占用: {totals["已占用"]}  平均利用率: {totals["利用率"]}%')
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:09
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# 来源表 -> (模型名, 状态字段)，与 management.counters.COUNTER_SOURCES 保持一致
+COUNTER_SOURCES = {
+    'Task': ('Task', 'status'),
+    'Container_Master': ('ContainerMaster', 'current_status'),
+    'Vessel_Visit': ('VesselVisit', 'status'),
+}
+
+
+def seed_status_counters(apps, schema_editor):
+    """用已有数据初始化计数表，避免上线后计数只包含增量部分"""
+    StatusCounter = apps.get_model('management', 'StatusCounter')
+    rows = []
+    for source, (model_name, field) in COUNTER_SOURCES.items():
+        model = apps.get_model('management', model_name)
+        totals = {}
+        for item in model.objects.values(field).annotate(total=Count('pk')).order_by():
+            key = item[field] or ''
+            totals[key] = totals.get(key, 0) + item['total']
+        rows.extend(
+            StatusCounter(source_table=source, status=key, total=total)
+            for key, total in totals.items()
+        )
+    StatusCounter.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0002_alter_yardblock_block_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCounter',
+            fields=[
+                ('counter_id', models.AutoField(db_column='Counter_ID', primary_key=True, serialize=False)),
+                ('source_table', models.CharField(db_column='Source_Table', max_length=50, verbose_name='来源表')),
+                ('status', models.CharField(blank=True, db_column='Status', max_length=20, verbose_name='状态')),
+                ('total', models.BigIntegerField(db_column='Total', default=0, verbose_name='数量')),
+            ],
+            options={
+                'verbose_name': '状态计数',
+                'verbose_name_plural': '状态计数',
+                'db_table': 'Status_Counter',
+                'unique_together': {('source_table', 'status')},
+            },
+        ),
+        migrations.RunPython(seed_status_counters, migrations.RunPython.noop),
+    ]
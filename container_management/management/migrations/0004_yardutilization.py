@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_yard_utilization(apps, schema_editor):
+    """用现有堆场数据初始化利用率快照"""
+    YardBlock = apps.get_model('management', 'YardBlock')
+    YardStack = apps.get_model('management', 'YardStack')
+    YardSlot = apps.get_model('management', 'YardSlot')
+    YardUtilization = apps.get_model('management', 'YardUtilization')
+
+    stack_totals = dict(
+        YardStack.objects.values('block_id').annotate(total=Count('pk')).order_by().values_list('block_id', 'total')
+    )
+    slot_totals = {
+        row['stack_id__block_id']: row
+        for row in YardSlot.objects.values('stack_id__block_id')
+        .annotate(total=Count('pk'), occupied=Count('current_container_id'))
+        .order_by()
+    }
+    YardUtilization.objects.bulk_create([
+        YardUtilization(
+            block_id_id=block_id,
+            stack_count=stack_totals.get(block_id, 0),
+            slot_count=slot_totals.get(block_id, {}).get('total', 0),
+            occupied_count=slot_totals.get(block_id, {}).get('occupied', 0),
+        )
+        for block_id in YardBlock.objects.values_list('block_id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0003_statuscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YardUtilization',
+            fields=[
+                ('block_id', models.OneToOneField(db_column='Block_ID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='management.yardblock', verbose_name='堆场区')),
+                ('stack_count', models.IntegerField(db_column='Stack_Count', default=0, verbose_name='堆栈总数')),
+                ('slot_count', models.IntegerField(db_column='Slot_Count', default=0, verbose_name='箱位总数')),
+                ('occupied_count', models.IntegerField(db_column='Occupied_Count', default=0, verbose_name='已占用箱位数')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='Updated_At', verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '堆场利用率',
+                'verbose_name_plural': '堆场利用率',
+                'db_table': 'Yard_Utilization',
+            },
+        ),
+        migrations.RunPython(seed_yard_utilization, migrations.RunPython.noop),
+    ]
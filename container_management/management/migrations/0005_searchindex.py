@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+def add_fulltext_index(apps, schema_editor):
+    """MySQL：Content 上建立 ngram 全文索引（其它数据库使用 LIKE 回退，不建索引）"""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE `Search_Index` ADD FULLTEXT INDEX `FT_Search_Content` (`Content`) WITH PARSER ngram"
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute("ALTER TABLE `Search_Index` DROP INDEX `FT_Search_Content`")
+
+
+# 迁移时的索引内容规则（与当时的 management.search_index.SOURCES 一致）。
+# 冻结在迁移中，之后修改 search_index 不会改变本迁移的行为；规则变化后用 rebuild_search_index 命令重建
+def _join(*parts):
+    return ' '.join(str(p) for p in parts if p)
+
+
+def _party_name(party):
+    return party.party_name if party else None
+
+
+# 对象类型 -> (模型名, select_related, 主标识, 索引内容)
+SOURCES = {
+    'container': (
+        'ContainerMaster', ('owner_party_id',),
+        lambda c: c.container_number,
+        lambda c: _join(c.container_number, c.type_code_id, _party_name(c.owner_party_id)),
+    ),
+    'booking': (
+        'Booking', ('shipper_party_id', 'consignee_party_id'),
+        lambda b: b.booking_number,
+        lambda b: _join(b.booking_number, b.status, _party_name(b.shipper_party_id), _party_name(b.consignee_party_id)),
+    ),
+    'task': (
+        'Task', ('container_master_id',),
+        lambda t: t.container_master_id.container_number,
+        lambda t: _join(t.container_master_id.container_number, t.task_type, t.status),
+    ),
+    'visit': (
+        'VesselVisit', ('vessel_id', 'port_id'),
+        lambda v: v.voyage_number_in,
+        lambda v: _join(v.voyage_number_in, v.voyage_number_out, v.vessel_id.vessel_name, v.port_id.port_name),
+    ),
+    'party': (
+        'Party', (),
+        lambda p: p.party_name,
+        lambda p: _join(p.party_name, p.contact_person, p.scac_code),
+    ),
+}
+BATCH_SIZE = 2000
+
+
+def build_search_index(apps, schema_editor):
+    """用现有数据初始化搜索索引（按主键分批读取、批量插入）"""
+    SearchIndex = apps.get_model('management', 'SearchIndex')
+    for object_type, (model_name, related, key, content) in SOURCES.items():
+        queryset = apps.get_model('management', model_name).objects.select_related(*related).order_by('pk')
+        last_pk = None
+        while True:
+            batch = list((queryset if last_pk is None else queryset.filter(pk__gt=last_pk))[:BATCH_SIZE])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            SearchIndex.objects.bulk_create(
+                SearchIndex(object_type=object_type, object_id=obj.pk, search_key=key(obj) or '', content=content(obj))
+                for obj in batch
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0004_yardutilization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndex',
+            fields=[
+                ('entry_id', models.AutoField(db_column='Entry_ID', primary_key=True, serialize=False)),
+                ('object_type', models.CharField(db_column='Object_Type', max_length=20, verbose_name='对象类型')),
+                ('object_id', models.IntegerField(db_column='Object_ID', verbose_name='对象编号')),
+                ('search_key', models.CharField(db_column='Search_Key', max_length=255, verbose_name='主标识')),
+                ('content', models.TextField(db_column='Content', verbose_name='索引内容')),
+            ],
+            options={
+                'verbose_name': '搜索索引',
+                'verbose_name_plural': '搜索索引',
+                'db_table': 'Search_Index',
+                'indexes': [models.Index(fields=['search_key'], name='IX_Search_Key')],
+                'unique_together': {('object_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0005_searchindex'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_user_id', 'status', 'priority'], name='IX_Task_Assigned_Status'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['actual_executor_id', 'status'], name='IX_Task_Executor_Status'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0006_task_user_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'priority'], name='IX_Task_Status_Priority'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['task_type'], name='IX_Task_Type'),
+        ),
+        migrations.AddIndex(
+            model_name='vesselvisit',
+            index=models.Index(fields=['status'], name='IX_Visit_Status'),
+        ),
+        migrations.AddIndex(
+            model_name='vesselvisit',
+            index=models.Index(fields=['ata'], name='IX_Visit_ATA'),
+        ),
+        migrations.AddIndex(
+            model_name='yardslot',
+            index=models.Index(fields=['slot_status'], name='IX_Slot_Status'),
+        ),
+    ]
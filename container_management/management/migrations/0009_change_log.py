@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:48
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+def install_triggers(apps, schema_editor):
+    """MySQL / SQLite：在四张表上安装写入 Change_Log 的触发器（其它数据库不记录变更日志）"""
+    from management import change_log
+
+    change_log.install_triggers(schema_editor)
+
+
+def drop_triggers(apps, schema_editor):
+    from management import change_log
+
+    change_log.drop_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0008_task_queue_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogConsumer',
+            fields=[
+                ('consumer', models.CharField(db_column='Consumer', max_length=50, primary_key=True, serialize=False, verbose_name='消费方')),
+                ('position', models.BigIntegerField(db_column='Position', default=0, verbose_name='已处理序号')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='Updated_At', verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '变更日志消费位置',
+                'verbose_name_plural': '变更日志消费位置',
+                'db_table': 'Change_Log_Consumer',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('change_id', models.BigAutoField(db_column='Change_ID', primary_key=True, serialize=False)),
+                ('table_name', models.CharField(db_column='Table_Name', max_length=30, verbose_name='来源表')),
+                ('row_id', models.IntegerField(db_column='Row_ID', verbose_name='记录编号')),
+                ('operation', models.CharField(choices=[('I', '插入'), ('U', '更新'), ('D', '删除')], db_column='Operation', max_length=1, verbose_name='操作')),
+                ('old_status', models.CharField(blank=True, db_column='Old_Status', max_length=20, null=True, verbose_name='原状态')),
+                ('new_status', models.CharField(blank=True, db_column='New_Status', max_length=20, null=True, verbose_name='新状态')),
+                ('detail', models.JSONField(blank=True, db_column='Detail', null=True, verbose_name='关键列')),
+                ('changed_at', models.DateTimeField(db_column='Changed_At', db_default=django.db.models.functions.datetime.Now(), verbose_name='变更时间')),
+            ],
+            options={
+                'verbose_name': '变更日志',
+                'verbose_name_plural': '变更日志',
+                'db_table': 'Change_Log',
+                'indexes': [models.Index(fields=['table_name', 'row_id'], name='IX_Change_Log_Row')],
+            },
+        ),
+        migrations.RunPython(install_triggers, drop_triggers),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def partition_table(apps, schema_editor):
+    """MySQL：按 Moved_At 按月分区（其它数据库保持普通表）；历史数据由 container_movements backfill 命令重建"""
+    from management import movements
+
+    movements.partition_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0009_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContainerMovement',
+            fields=[
+                ('movement_id', models.BigAutoField(db_column='Movement_ID', primary_key=True, serialize=False)),
+                ('location_type', models.CharField(choices=[('Yard', '堆场'), ('Vessel', '船上'), ('Gate', '已出闸')], db_column='Location_Type', max_length=10, verbose_name='位置类型')),
+                ('moved_at', models.DateTimeField(db_column='Moved_At', verbose_name='到达时间')),
+                ('left_at', models.DateTimeField(blank=True, db_column='Left_At', null=True, verbose_name='离开时间')),
+                ('block_id', models.ForeignKey(blank=True, db_column='Block_ID', db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='management.yardblock', verbose_name='堆场区')),
+                ('container_master_id', models.ForeignKey(db_column='Container_Master_ID', db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='movements', to='management.containermaster', verbose_name='集装箱')),
+                ('slot_id', models.ForeignKey(blank=True, db_column='Slot_ID', db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='management.yardslot', verbose_name='箱位')),
+                ('task_id', models.ForeignKey(blank=True, db_column='Task_ID', db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='management.task', verbose_name='任务')),
+                ('vessel_visit_id', models.ForeignKey(blank=True, db_column='Vessel_Visit_ID', db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='management.vesselvisit', verbose_name='船舶访问')),
+            ],
+            options={
+                'verbose_name': '集装箱移动历史',
+                'verbose_name_plural': '集装箱移动历史',
+                'db_table': 'Container_Movement',
+                'indexes': [models.Index(fields=['container_master_id', 'moved_at'], name='IX_Movement_Container'), models.Index(fields=['block_id', 'left_at', 'moved_at'], name='IX_Movement_Block')],
+            },
+        ),
+        migrations.RunPython(partition_table, migrations.RunPython.noop),
+    ]
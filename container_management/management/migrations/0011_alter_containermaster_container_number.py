@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:07
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0010_container_movement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='containermaster',
+            name='container_number',
+            field=models.CharField(db_column='Container_Number', max_length=11, unique=True, validators=[django.core.validators.RegexValidator(message='箱号格式必须为 4 个大写字母后跟 7 位数字，例如 ABCD1234567', regex='^[A-Z]{4}[0-9]{7}$')], verbose_name='箱号'),
+        ),
+    ]
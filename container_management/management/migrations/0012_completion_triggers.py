@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def install_completion_triggers(apps, schema_editor):
+    """
+    MySQL：按 sqlutil/triggers.sql 替换任务完成触发器。
+    0003 / 0004 建立并初始化了 Status_Counter 与 Yard_Utilization，已有数据库中的旧触发器不维护这两张表，
+    也不识别 @tos_batch_mode，不替换时第一次由触发器联动的任务完成就会使计数与利用率失准
+    """
+    from management import task_batch
+
+    task_batch.install_completion_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0011_alter_containermaster_container_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_completion_triggers, migrations.RunPython.noop),
+    ]
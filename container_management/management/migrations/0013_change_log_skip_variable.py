@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def install_triggers(apps, schema_editor):
+    """MySQL：重新创建变更日志触发器，使其在 @tos_skip_change_log = 1 的会话中不写日志（SQLite 语句不变）"""
+    from management import change_log
+
+    change_log.install_triggers(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0012_completion_triggers'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_triggers, migrations.RunPython.noop),
+    ]
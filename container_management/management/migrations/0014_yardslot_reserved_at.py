@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('management', '0013_change_log_skip_variable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='yardslot',
+            name='reserved_at',
+            field=models.DateTimeField(blank=True, db_column='Reserved_At', null=True, verbose_name='预留时间'),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from decimal import ROUND_HALF_UP, Decimal
+
 from django.db import models
+from django.db.models.functions import Now
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 
@@ -254,12 +257,16 @@ class YardSlot(models.Model):
     current_container_id = models.OneToOneField(
         ContainerMaster, on_delete=models.SET_NULL, null=True, blank=True, db_column="Current_Container_ID", verbose_name="当前集装箱"
     )
+    # 箱位分配器预留的时间；超时且没有未完成任务引用的预留由 slot_allocator 归还（手工预留为空，不自动归还）
+    reserved_at = models.DateTimeField(null=True, blank=True, db_column="Reserved_At", verbose_name="预留时间")
 
     class Meta:
         db_table = "Yard_Slot"
         verbose_name = "箱位"
         verbose_name_plural = "箱位"
         unique_together = [["stack_id", "tier_number"]]
+        # 可用箱位查询（View_Yard_Available_Slots、后台筛选）按状态过滤
+        indexes = [models.Index(fields=["slot_status"], name="IX_Slot_Status")]
 
     def __str__(self):
         return self.slot_coordinates
@@ -287,6 +294,10 @@ class VesselVisit(models.Model):
         db_table = "Vessel_Visit"
         verbose_name = "船舶访问"
         verbose_name_plural = "船舶访问"
+        indexes = [
+            models.Index(fields=["status"], name="IX_Visit_Status"),
+            models.Index(fields=["ata"], name="IX_Visit_ATA"),
+        ]
 
     def __str__(self):
         return f"{self.vessel_id.vessel_name} - {self.voyage_number_in}"
@@ -369,6 +380,193 @@ class Task(models.Model):
         db_table = "Task"
         verbose_name = "作业任务"
         verbose_name_plural = "作业任务"
+        # 操作员仪表板按“指派给我 / 由我执行”+ 状态计数和取列表
+        indexes = [
+            models.Index(fields=["assigned_user_id", "status", "priority"], name="IX_Task_Assigned_Status"),
+            models.Index(fields=["actual_executor_id", "status"], name="IX_Task_Executor_Status"),
+            # 待执行任务（View_Pending_Tasks）按状态过滤、按优先级排序；也覆盖单独按状态的过滤
+            models.Index(fields=["status", "priority"], name="IX_Task_Status_Priority"),
+            models.Index(fields=["task_type"], name="IX_Task_Type"),
+            # 任务派发按类型划分的队列：状态 + 类型过滤后按优先级取队首（dispatch.py）
+            models.Index(fields=["status", "task_type", "priority"], name="IX_Task_Queue"),
+        ]
+
+    def __str__(self):
+        return f"{self.task_type} - {self.container_master_id.container_number}"
+
+# 状态计数表：按来源表+状态增量维护的汇总计数，替代全表 COUNT(*) GROUP BY
+class StatusCounter(models.Model):
+    counter_id = models.AutoField(primary_key=True, db_column="Counter_ID")
+    source_table = models.CharField(max_length=50, db_column="Source_Table", verbose_name="来源表")
+    # 空字符串表示状态为 NULL（如未设置状态的集装箱）
+    status = models.CharField(max_length=20, blank=True, db_column="Status", verbose_name="状态")
+    total = models.BigIntegerField(default=0, db_column="Total", verbose_name="数量")
+
+    class Meta:
+        db_table = "Status_Counter"
+        verbose_name = "状态计数"
+        verbose_name_plural = "状态计数"
+        unique_together = [["source_table", "status"]]
+
+    def __str__(self):
+        return f"{self.source_table}.{self.status or '未设置'} = {self.total}"
+
+
+def decimal_round(value, *scales):
+    """
+    按 MySQL DECIMAL 运算的口径依次舍入到各个小数位数（四舍五入，远离零），
+    例如除法结果先保留到被除数小数位 + 4 位，再由 ROUND(x, 2) 舍入
+    """
+    for scale in scales:
+        value = value.quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP)
+    return value
+
+
+# 堆场利用率快照：按堆场区增量维护，替代 View_Yard_Utilization 的多表 COUNT(DISTINCT) 扫描
+class YardUtilization(models.Model):
+    block_id = models.OneToOneField(YardBlock, on_delete=models.CASCADE, primary_key=True, db_column="Block_ID", verbose_name="堆场区")
+    stack_count = models.IntegerField(default=0, db_column="Stack_Count", verbose_name="堆栈总数")
+    slot_count = models.IntegerField(default=0, db_column="Slot_Count", verbose_name="箱位总数")
+    occupied_count = models.IntegerField(default=0, db_column="Occupied_Count", verbose_name="已占用箱位数")
+    updated_at = models.DateTimeField(auto_now=True, db_column="Updated_At", verbose_name="更新时间")
+
+    class Meta:
+        db_table = "Yard_Utilization"
+        verbose_name = "堆场利用率"
+        verbose_name_plural = "堆场利用率"
+
+    def __str__(self):
+        return f"{self.block_id_id}: {self.occupied_count}/{self.slot_count}"
+
+    @property
+    def free_count(self):
+        return self.slot_count - self.occupied_count
+
+    @property
+    def utilization_percent_decimal(self):
+        """
+        与视图 ROUND(已占用 * 100.0 / NULLIF(箱位总数, 0), 2) 相同：100.0 为 1 位小数，
+        除法结果保留 5 位后再舍入到 2 位；无箱位时为 None
+        """
+        if not self.slot_count:
+            return None
+        return decimal_round(Decimal(self.occupied_count * 100) / self.slot_count, 5, 2)
+
+    @property
+    def utilization_percent(self):
+        percent = self.utilization_percent_decimal
+        return None if percent is None else float(percent)
+
+
+# 聚合搜索索引：每个可搜索对象一行，Content 汇总箱号/订舱号/航次号/船名/相关方名称/SCAC 等关键字
+# MySQL 下 Content 上建有 ngram FULLTEXT 索引（见迁移 0005 与 sqlutil/createtable.sql）
+class SearchIndex(models.Model):
+    entry_id = models.AutoField(primary_key=True, db_column="Entry_ID")
+    object_type = models.CharField(max_length=20, db_column="Object_Type", verbose_name="对象类型")
+    object_id = models.IntegerField(db_column="Object_ID", verbose_name="对象编号")
+    # 对象的主标识（箱号、订舱号等），用于精确/前缀命中加权
+    search_key = models.CharField(max_length=255, db_column="Search_Key", verbose_name="主标识")
+    content = models.TextField(db_column="Content", verbose_name="索引内容")
+
+    class Meta:
+        db_table = "Search_Index"
+        verbose_name = "搜索索引"
+        verbose_name_plural = "搜索索引"
+        unique_together = [["object_type", "object_id"]]
+        indexes = [models.Index(fields=["search_key"], name="IX_Search_Key")]
+
+    def __str__(self):
+        return f"{self.object_type}:{self.object_id} {self.search_key}"
+
+
+# 变更日志（CDC）：Task / Yard_Slot / Container_Master / Vessel_Visit 的每次插入、更新、删除由触发器追加一行，
+# Change_ID 即全局序号，消费方按序号增量读取（见 change_log.py、迁移 0009 与 sqlutil/triggers.sql）
+class ChangeLog(models.Model):
+    OPERATION_CHOICES = [
+        ("I", "插入"),
+        ("U", "更新"),
+        ("D", "删除"),
+    ]
+
+    change_id = models.BigAutoField(primary_key=True, db_column="Change_ID")
+    table_name = models.CharField(max_length=30, db_column="Table_Name", verbose_name="来源表")
+    row_id = models.IntegerField(db_column="Row_ID", verbose_name="记录编号")
+    operation = models.CharField(max_length=1, choices=OPERATION_CHOICES, db_column="Operation", verbose_name="操作")
+    old_status = models.CharField(max_length=20, null=True, blank=True, db_column="Old_Status", verbose_name="原状态")
+    new_status = models.CharField(max_length=20, null=True, blank=True, db_column="New_Status", verbose_name="新状态")
+    # 变更后（删除时为删除前）的关键列，{列名: 值}
+    detail = models.JSONField(null=True, blank=True, db_column="Detail", verbose_name="关键列")
+    changed_at = models.DateTimeField(db_default=Now(), db_column="Changed_At", verbose_name="变更时间")
+
+    class Meta:
+        db_table = "Change_Log"
+        verbose_name = "变更日志"
+        verbose_name_plural = "变更日志"
+        indexes = [models.Index(fields=["table_name", "row_id"], name="IX_Change_Log_Row")]
+
+    def __str__(self):
+        return f"#{self.change_id} {self.table_name}:{self.row_id} {self.operation}"
+
+
+# 变更日志消费位置：每个消费方一行，Position 为已处理的最大 Change_ID
+class ChangeLogConsumer(models.Model):
+    consumer = models.CharField(max_length=50, primary_key=True, db_column="Consumer", verbose_name="消费方")
+    position = models.BigIntegerField(default=0, db_column="Position", verbose_name="已处理序号")
+    updated_at = models.DateTimeField(auto_now=True, db_column="Updated_At", verbose_name="更新时间")
+
+    class Meta:
+        db_table = "Change_Log_Consumer"
+        verbose_name = "变更日志消费位置"
+        verbose_name_plural = "变更日志消费位置"
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.position}"
+
+
+# 集装箱移动历史：每次位置变化一行（堆场箱位 / 船上 / 已出闸），Left_At 为离开该位置的时间（当前位置为空）
+# 由 movements.py 从变更日志增量写入；MySQL 下按 Moved_At 按月分区（见迁移 0010），分区表不能有外键
+class ContainerMovement(models.Model):
+    LOCATION_CHOICES = [
+        ("Yard", "堆场"),
+        ("Vessel", "船上"),
+        ("Gate", "已出闸"),
+    ]
+
+    movement_id = models.BigAutoField(primary_key=True, db_column="Movement_ID")
+    container_master_id = models.ForeignKey(
+        ContainerMaster, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name="movements", db_column="Container_Master_ID", verbose_name="集装箱",
+    )
+    location_type = models.CharField(max_length=10, choices=LOCATION_CHOICES, db_column="Location_Type", verbose_name="位置类型")
+    slot_id = models.ForeignKey(
+        YardSlot, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True,
+        related_name="+", db_column="Slot_ID", verbose_name="箱位",
+    )
+    block_id = models.ForeignKey(
+        YardBlock, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True,
+        related_name="+", db_column="Block_ID", verbose_name="堆场区",
+    )
+    vessel_visit_id = models.ForeignKey(
+        VesselVisit, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True,
+        related_name="+", db_column="Vessel_Visit_ID", verbose_name="船舶访问",
+    )
+    task_id = models.ForeignKey(
+        Task, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True,
+        related_name="+", db_column="Task_ID", verbose_name="任务",
+    )
+    moved_at = models.DateTimeField(db_column="Moved_At", verbose_name="到达时间")
+    left_at = models.DateTimeField(null=True, blank=True, db_column="Left_At", verbose_name="离开时间")
+
+    class Meta:
+        db_table = "Container_Movement"
+        verbose_name = "集装箱移动历史"
+        verbose_name_plural = "集装箱移动历史"
+        indexes = [
+            # 某集装箱在时刻 T 的位置：按到达时间倒序取第一条
+            models.Index(fields=["container_master_id", "moved_at"], name="IX_Movement_Container"),
+            # 堆场区在时刻 T 的在场箱 / 时间段内的停留：Left_At 为空或晚于起点
+            models.Index(fields=["block_id", "left_at", "moved_at"], name="IX_Movement_Block"),
+        ]
 
     def __str__(self):
-        return f"{self.task_type} - {self.container_master_id.container_number}"
\ No newline at end of file
+        return f"{self.container_master_id_id} {self.location_type} @ {self.moved_at}"
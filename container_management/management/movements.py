@@ -0,0 +1,409 @@
+"""
+集装箱移动历史
+
+Task.Movement_Timestamp 与集装箱/箱位的当前状态只保留“现在”，Container_Movement 记录每个集装箱
+每一次位置变化（堆场箱位 / 船上 / 已出闸）与到达、离开时间，回答“某时刻在哪里”“在各堆场区停留多久”：
+- location_at(集装箱, T)：(Container_Master_ID, Moved_At) 索引上按到达时间倒序取一行
+- block_inventory_at(堆场区, T) / dwell_by_block(起, 止)：(Block_ID, Left_At, Moved_At) 索引上
+  取 Left_At 为空或晚于起点的停留，不扫描 Task 表
+
+写入来源为变更日志（change_log.py）的 CONSUMER 消费方：
+- 任务由未完成变为 Completed：Load 为船上（记录船舶访问）、GateOut 为已出闸，其余为目标箱位所在堆场区
+- 箱位放入集装箱（如后台直接修改箱位）：该箱位。同一批变更中有该集装箱的完成任务，
+  或放入的箱位就是该集装箱最近一次已完成任务（按库中数据）的目标箱位时，视为任务完成的联动而跳过——
+  task_batch.complete_tasks 先写全部任务再写箱位，同一次完成的箱位变更可能落在之后的批次中；
+  直接放回最近一次任务目标箱位的后台修改因此不会单独记录
+与集装箱当前位置相同的记录跳过；新记录写入时把上一条记录的 Left_At 设为新记录的到达时间。
+查询前先 sync() 追上变更日志，查询结果包含最新的移动。
+
+历史数据由 backfill() 按已完成任务重建（container_movements backfill 命令）：移动时间取 Movement_Timestamp，
+未填写时（如信号补写之前在后台改为完成的任务）取变更日志中该任务变为 Completed 的时间，
+两者都没有（变更日志已清理）的任务跳过并计数。
+
+MySQL 下表按 Moved_At 做 RANGE COLUMNS 分区：p_history 存放迁移之前的数据，之后每月一个分区，
+p_future 兜底；container_movements partitions 命令（每月定时执行）从 p_future 拆出未来的月份。
+按时间范围的查询只访问涉及的分区。分区表的唯一键必须包含分区列，主键为 (Movement_ID, Moved_At)，且不能有外键。
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Max, Q, Value, When
+
+from . import change_log, rawsql
+from .models import ChangeLog, ChangeLogConsumer, ContainerMaster, ContainerMovement, Task, YardBlock, YardSlot
+
+
+CONSUMER = 'container_movements'
+# 任务类型 -> 完成后的位置类型；其余任务类型（Discharge / GateIn / Move）为目标箱位所在堆场
+TASK_LOCATION = {'Load': 'Vessel', 'GateOut': 'Gate'}
+# 关闭上一条记录时 CASE 表达式每条 UPDATE 包含的集装箱数
+UPDATE_CHUNK = 500
+# 重建时每批处理的集装箱数
+BACKFILL_CHUNK = 500
+
+# MySQL 分区
+PARTITION_MONTHS_AHEAD = 3
+HISTORY_PARTITION = 'p_history'
+FUTURE_PARTITION = 'p_future'
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _resolve_container(container):
+    """集装箱对象、编号或箱号 -> 编号"""
+    if isinstance(container, ContainerMaster):
+        return container.pk
+    if isinstance(container, int) or str(container).isdigit():
+        return int(container)
+    return ContainerMaster.objects.values_list('pk', flat=True).get(container_number=container)
+
+
+def _slot_blocks(slot_ids):
+    slot_ids = {slot_id for slot_id in slot_ids if slot_id is not None}
+    if not slot_ids:
+        return {}
+    return dict(YardSlot.objects.filter(pk__in=slot_ids).values_list('pk', 'stack_id__block_id'))
+
+
+def task_move(task_id, task_type, container_id, to_slot_id, vessel_visit_id, moved_at):
+    """已完成任务对应的移动：{'container', 'location_type', 'slot', 'vessel_visit', 'task', 'moved_at'}"""
+    location_type = TASK_LOCATION.get(task_type, 'Yard')
+    return {
+        'container': container_id,
+        'location_type': location_type,
+        'slot': to_slot_id if location_type == 'Yard' else None,
+        'vessel_visit': vessel_visit_id if location_type == 'Vessel' else None,
+        'task': task_id,
+        'moved_at': moved_at,
+    }
+
+
+def _location_key(location_type, slot_id, vessel_visit_id):
+    return location_type, slot_id, vessel_visit_id
+
+
+def _build_rows(moves, current, blocks):
+    """
+    按顺序把移动转换为新记录；current 为 {集装箱: 当前位置键}，就地更新。
+    返回 (新记录列表, {集装箱: 库中已有的未结束记录的离开时间})
+    """
+    rows = []
+    pending = {}
+    closes = {}
+    for move in moves:
+        container_id = move['container']
+        key = _location_key(move['location_type'], move['slot'], move['vessel_visit'])
+        if current.get(container_id) == key:
+            continue
+        if container_id in pending:
+            pending[container_id].left_at = move['moved_at']
+        elif container_id in current:
+            closes[container_id] = move['moved_at']
+        row = ContainerMovement(
+            container_master_id_id=container_id,
+            location_type=move['location_type'],
+            slot_id_id=move['slot'],
+            block_id_id=blocks.get(move['slot']),
+            vessel_visit_id_id=move['vessel_visit'],
+            task_id_id=move['task'],
+            moved_at=move['moved_at'],
+        )
+        rows.append(row)
+        pending[container_id] = row
+        current[container_id] = key
+    return rows, closes
+
+
+def record(moves):
+    """
+    按顺序写入移动，返回新增的记录数。同一批内同一集装箱的记录首尾相接
+    """
+    if not moves:
+        return 0
+    open_rows = ContainerMovement.objects.filter(
+        container_master_id__in={move['container'] for move in moves}, left_at__isnull=True
+    ).values_list('container_master_id', 'location_type', 'slot_id', 'vessel_visit_id')
+    current = {
+        container_id: _location_key(location_type, slot_id, visit_id)
+        for container_id, location_type, slot_id, visit_id in open_rows
+    }
+    rows, closes = _build_rows(moves, current, _slot_blocks(move['slot'] for move in moves))
+    with transaction.atomic():
+        for chunk in _chunks(sorted(closes.items()), UPDATE_CHUNK):
+            ContainerMovement.objects.filter(
+                container_master_id__in=[container_id for container_id, _at in chunk], left_at__isnull=True
+            ).update(left_at=Case(
+                *[When(container_master_id=container_id, then=Value(at)) for container_id, at in chunk],
+                output_field=DateTimeField(),
+            ))
+        ContainerMovement.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _last_task_slots(container_ids):
+    """集装箱最近一次已完成任务的目标箱位：{集装箱: 箱位}"""
+    slots = {}
+    for chunk in _chunks(sorted(container_ids), UPDATE_CHUNK):
+        slots.update(
+            Task.objects.filter(container_master_id__in=chunk, status='Completed')
+            .order_by('container_master_id', 'movement_timestamp', 'task_id')
+            .values_list('container_master_id', 'to_slot_id')
+        )
+    return slots
+
+
+def changes_to_moves(changes):
+    """把一批变更日志（Task / Yard_Slot）转换为按变更顺序排列的移动"""
+    completed = {
+        change.change_id for change in changes
+        if change.table_name == 'Task' and change.new_status == 'Completed'
+        and change.operation != 'D' and change.old_status != 'Completed'
+    }
+    task_containers = {
+        change.detail.get('Container_Master_ID') for change in changes if change.change_id in completed
+    }
+    placed = {
+        (change.detail or {}).get('Current_Container_ID') for change in changes
+        if change.table_name == 'Yard_Slot' and change.operation != 'D'
+    }
+    task_slots = _last_task_slots(placed - task_containers - {None})
+    moves = []
+    for change in changes:
+        detail = change.detail or {}
+        if change.change_id in completed:
+            moves.append(task_move(
+                change.row_id, detail.get('Task_Type'), detail.get('Container_Master_ID'),
+                detail.get('To_Slot_ID'), detail.get('Vessel_Visit_ID'), change.changed_at,
+            ))
+        elif change.table_name == 'Yard_Slot' and change.operation != 'D':
+            container_id = detail.get('Current_Container_ID')
+            if container_id is not None and container_id not in task_containers \
+                    and task_slots.get(container_id) != change.row_id:
+                moves.append({
+                    'container': container_id,
+                    'location_type': 'Yard',
+                    'slot': change.row_id,
+                    'vessel_visit': None,
+                    'task': None,
+                    'moved_at': change.changed_at,
+                })
+    return moves
+
+
+def _record_changes(changes):
+    record(changes_to_moves(changes))
+
+
+def sync():
+    """把变更日志中尚未处理的移动写入历史，返回游标前进的序号数"""
+    return change_log.catch_up(CONSUMER, _record_changes, tables=('Task', 'Yard_Slot'))
+
+
+def _completion_times(task_ids):
+    """变更日志中任务最近一次变为 Completed 的时间：{任务编号: 时间}（(Table_Name, Row_ID) 索引）"""
+    times = {}
+    for chunk in _chunks(task_ids, UPDATE_CHUNK):
+        times.update(
+            ChangeLog.objects.filter(table_name='Task', row_id__in=chunk, new_status='Completed')
+            .exclude(old_status='Completed')
+            .values('row_id')
+            .annotate(completed_at=Max('changed_at'))
+            .values_list('row_id', 'completed_at')
+        )
+    return times
+
+
+def backfill():
+    """
+    清空并按已完成任务（移动时间、任务编号顺序）重建全部移动历史，返回 (写入的记录数, 没有移动时间而跳过的任务数)。
+    按集装箱编号分批读取任务（Container_Master_ID 索引），每个集装箱的全部任务在同一批内处理；
+    变更日志消费位置设为重建开始时的最新序号，重建期间的变更由之后的 sync() 补齐
+    """
+    position = change_log.latest_id()
+    container_ids = list(ContainerMaster.objects.order_by('pk').values_list('pk', flat=True))
+    total = skipped = 0
+    with transaction.atomic():
+        ContainerMovement.objects.all().delete()
+        for chunk in _chunks(container_ids, BACKFILL_CHUNK):
+            tasks = list(
+                Task.objects.filter(
+                    container_master_id__gte=chunk[0], container_master_id__lte=chunk[-1], status='Completed',
+                ).values_list('task_id', 'task_type', 'container_master_id', 'to_slot_id', 'vessel_visit_id', 'movement_timestamp')
+            )
+            completed_at = _completion_times([task[0] for task in tasks if task[5] is None])
+            moves = []
+            for task in tasks:
+                moved_at = task[5] or completed_at.get(task[0])
+                if moved_at is None:
+                    skipped += 1
+                    continue
+                moves.append(task_move(*task[:5], moved_at))
+            moves.sort(key=lambda move: (move['container'], move['moved_at'], move['task']))
+            rows, _closes = _build_rows(moves, {}, _slot_blocks(move['slot'] for move in moves))
+            ContainerMovement.objects.bulk_create(rows, batch_size=1000)
+            total += len(rows)
+        ChangeLogConsumer.objects.update_or_create(consumer=CONSUMER, defaults={'position': position})
+    return total, skipped
+
+
+# ---------------- 查询 ----------------
+
+LOCATION_FIELDS = (
+    'container_master_id', 'location_type', 'slot_id', 'slot_id__slot_coordinates', 'block_id',
+    'vessel_visit_id', 'task_id', 'moved_at', 'left_at',
+)
+
+
+def location_at(container, at, sync_first=True):
+    """
+    集装箱（对象、编号或箱号）在时刻 at 的位置记录（LOCATION_FIELDS 字典），此前没有记录时返回 None
+    """
+    if sync_first:
+        sync()
+    return (
+        ContainerMovement.objects.filter(container_master_id=_resolve_container(container), moved_at__lte=at)
+        .order_by('-moved_at', '-movement_id')
+        .values(*LOCATION_FIELDS)
+        .first()
+    )
+
+
+def history(container, sync_first=True):
+    """集装箱的全部位置记录，按到达时间排序"""
+    if sync_first:
+        sync()
+    return list(
+        ContainerMovement.objects.filter(container_master_id=_resolve_container(container))
+        .order_by('moved_at', 'movement_id')
+        .values(*LOCATION_FIELDS)
+    )
+
+
+def _stays(block_ids, start, end):
+    """与 [start, end) 相交的堆场停留：Left_At 为空或晚于 start，且 Moved_At 早于 end"""
+    queryset = ContainerMovement.objects.filter(moved_at__lt=end).filter(
+        Q(left_at__isnull=True) | Q(left_at__gt=start)
+    )
+    if block_ids is None:
+        return queryset.filter(block_id__isnull=False)
+    return queryset.filter(block_id__in=block_ids)
+
+
+def block_inventory_at(block_id, at, sync_first=True):
+    """时刻 at 位于某堆场区的集装箱：[{'container_master_id', 'container_number', 'slot_coordinates', 'moved_at'}]"""
+    if sync_first:
+        sync()
+    return [
+        {'container_master_id': container_id, 'container_number': number, 'slot_coordinates': coordinates, 'moved_at': moved_at}
+        for container_id, number, coordinates, moved_at in _stays([block_id], at, at + datetime.timedelta(microseconds=1))
+        .order_by('moved_at')
+        .values_list('container_master_id', 'container_master_id__container_number', 'slot_id__slot_coordinates', 'moved_at')
+    ]
+
+
+def dwell_by_block(start, end, block_ids=None, sync_first=True):
+    """
+    [start, end) 内各堆场区的停留统计（停留时间截取到时间段内）：
+    {堆场区编号: {'block_name', 'stays', 'containers', 'total_hours', 'avg_hours'}}
+    """
+    if sync_first:
+        sync()
+    totals = {}
+    for block_id, container_id, moved_at, left_at in _stays(block_ids, start, end).values_list(
+        'block_id', 'container_master_id', 'moved_at', 'left_at'
+    ):
+        seconds = (min(left_at or end, end) - max(moved_at, start)).total_seconds()
+        stats = totals.setdefault(block_id, {'stays': 0, 'containers': set(), 'seconds': 0.0})
+        stats['stays'] += 1
+        stats['containers'].add(container_id)
+        stats['seconds'] += seconds
+    names = dict(YardBlock.objects.filter(pk__in=list(totals)).values_list('pk', 'block_name'))
+    return {
+        block_id: {
+            'block_name': names.get(block_id),
+            'stays': stats['stays'],
+            'containers': len(stats['containers']),
+            'total_hours': round(stats['seconds'] / 3600, 2),
+            'avg_hours': round(stats['seconds'] / 3600 / stats['stays'], 2),
+        }
+        for block_id, stats in sorted(totals.items())
+    }
+
+
+# ---------------- MySQL 分区 ----------------
+
+def _add_months(month, count):
+    year, index = divmod(month.month - 1 + count, 12)
+    return datetime.date(month.year + year, index + 1, 1)
+
+
+def partition_name(month):
+    return f'p{month:%Y%m}'
+
+
+def _partition_clause(month):
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{_add_months(month, 1)}')"
+
+
+def existing_partitions():
+    """Container_Movement 当前的分区名（未分区或非 MySQL 时为空集合）"""
+    if connection.vendor != 'mysql':
+        return set()
+    return {name for (name,) in rawsql.fetch_all(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Container_Movement' AND PARTITION_NAME IS NOT NULL",
+        label='movement_partitions',
+    )}
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD, today=None):
+    """
+    从 p_future 中拆出本月起 months_ahead 个月内尚不存在的月分区，返回新建的分区名。
+    未分区或非 MySQL 时不做任何事
+    """
+    existing = existing_partitions()
+    if FUTURE_PARTITION not in existing:
+        return []
+    month = (today or datetime.date.today()).replace(day=1)
+    months = [
+        _add_months(month, offset) for offset in range(months_ahead + 1)
+        if partition_name(_add_months(month, offset)) not in existing
+    ]
+    if not months:
+        return []
+    # p_future 之前的最后一个分区必须早于新分区：只拆出最后一个已有月份之后的月份
+    last = max((name for name in existing if name not in (HISTORY_PARTITION, FUTURE_PARTITION)), default=None)
+    months = [item for item in months if last is None or partition_name(item) > last]
+    if not months:
+        return []
+    clauses = ', '.join(_partition_clause(item) for item in months)
+    rawsql.execute(
+        f'ALTER TABLE Container_Movement REORGANIZE PARTITION {FUTURE_PARTITION} INTO '
+        f'({clauses}, PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE))',
+        label='movement_partitions',
+    )
+    return [partition_name(item) for item in months]
+
+
+def partition_table(schema_editor=None):
+    """
+    迁移中把 Container_Movement 改为按 Moved_At 分区的表（仅 MySQL）：
+    主键加入 Moved_At，本月之前的数据进入 p_history，随后建立未来的月分区
+    """
+    conn = schema_editor.connection if schema_editor else connection
+    if conn.vendor != 'mysql':
+        return
+    month = datetime.date.today().replace(day=1)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            'ALTER TABLE Container_Movement DROP PRIMARY KEY, ADD PRIMARY KEY (Movement_ID, Moved_At)'
+        )
+        cursor.execute(
+            'ALTER TABLE Container_Movement PARTITION BY RANGE COLUMNS(Moved_At) ('
+            f"PARTITION {HISTORY_PARTITION} VALUES LESS THAN ('{month}'), "
+            f'PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE))'
+        )
+    ensure_partitions()
@@ -0,0 +1,215 @@
+"""
+后台列表的 keyset（游标）分页与估算总数
+
+默认分页每次加载都执行精确 COUNT(*)，深页使用 LIMIT/OFFSET，耗时随页码线性增长。
+KeysetChangeList 改为按排序键翻页：
+- 下一页：WHERE (排序键, 主键) 在上一页最后一行之后 ORDER BY ... LIMIT n+1
+- 上一页：反向排序取本页第一行之前的 n+1 行，再倒序显示
+- 末页：反向排序直接取前 n+1 行
+每页都是索引上的一次范围扫描，与所处深度无关。游标由 ?cursor= 参数携带（排序键值的编码）；
+无法解码或与排序键不符的游标抛出 InvalidCursor，返回 400（而不是后台默认的 ?e=1 重定向）。
+
+排序键必须是本表非空的普通字段（默认按主键倒序）；按关联字段或可空字段排序时回退到
+默认的页码分页，总数仍使用估算值。
+
+总数使用 estimate_count：MySQL 下未过滤时读取 information_schema.TABLES.TABLE_ROWS，
+带过滤条件时取 EXPLAIN 的预估行数；估算值较小（低于 EXACT_COUNT_THRESHOLD）时直接精确计数。
+"""
+import base64
+import binascii
+import json
+
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import BadRequest, FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import rawsql
+
+
+CURSOR_VAR = 'cursor'
+# 低于该值时精确计数的代价可以忽略
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class InvalidCursor(BadRequest):
+    """分页游标无效（被篡改或与当前排序不符）"""
+
+
+def table_rows_estimate(model):
+    """MySQL 表统计信息中的行数估算（InnoDB 为采样值）"""
+    rows = rawsql.fetch_value(
+        "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        [model._meta.db_table],
+        label='table_rows_estimate',
+    )
+    return int(rows or 0)
+
+
+def explain_rows_estimate(queryset):
+    """MySQL 优化器对过滤后行数的估算：EXPLAIN 中本表的 rows * filtered%"""
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    table = queryset.model._meta.db_table
+    for row in rawsql.fetch_all('EXPLAIN ' + sql, params, row=rawsql.as_dict, label='explain_rows_estimate'):
+        if row.get('table') == table:
+            return int((row.get('rows') or 0) * float(row.get('filtered') or 100) / 100)
+    return 0
+
+
+def estimate_count(queryset):
+    """
+    返回 (总数, 是否为估算值)；非 MySQL 数据库或估算值较小时精确计数
+    """
+    if connection.vendor == 'mysql':
+        if queryset.query.where:
+            estimate = explain_rows_estimate(queryset)
+        else:
+            estimate = table_rows_estimate(queryset.model)
+        if estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate, True
+    return queryset.count(), False
+
+
+class EstimatedCountPaginator(Paginator):
+    """count 使用估算值的分页器（页码分页回退时使用）"""
+
+    @cached_property
+    def count(self):
+        count, self.estimated = estimate_count(self.object_list)
+        return count
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('无效的分页游标')
+    if direction not in ('next', 'prev', 'last') or not isinstance(values, list):
+        raise InvalidCursor('无效的分页游标')
+    return direction, values
+
+
+def keyset_fields(queryset):
+    """
+    把 queryset 的排序解析为 [(字段, 是否倒序)]；无法用于 keyset 时返回 None
+    """
+    opts = queryset.model._meta
+    keys = []
+    for part in queryset.query.order_by:
+        if not isinstance(part, str):
+            return None
+        name = part.lstrip('-')
+        try:
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if field.is_relation or field.null or not field.concrete:
+            return None
+        keys.append((field, part.startswith('-')))
+    # 最后一个排序键必须唯一，保证游标位置确定
+    if not keys or (keys[-1][0] != opts.pk and not keys[-1][0].unique):
+        return None
+    return keys
+
+
+def keyset_condition(keyset, values, reverse=False):
+    """排序方向上位于 values（各排序键的值）之后（reverse 时为之前）的行的过滤条件"""
+    condition = Q()
+    for i, (field, desc) in enumerate(keyset):
+        lookup = 'lt' if desc != reverse else 'gt'
+        term = Q(**{f'{field.attname}__{lookup}': values[i]})
+        for j, (prev_field, _prev_desc) in enumerate(keyset[:i]):
+            term &= Q(**{prev_field.attname: values[j]})
+        condition |= term
+    return condition
+
+
+class KeysetChangeList(ChangeList):
+    """按排序键翻页的 ChangeList，游标参数不参与列表筛选"""
+    cursor = None
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # 游标只用于取当前页，不保留到筛选、排序、搜索生成的链接中
+        if CURSOR_VAR in self.params:
+            self.cursor = self.params.pop(CURSOR_VAR)
+            self.filter_params.pop(CURSOR_VAR, None)
+        return super().get_queryset(request, exclude_parameters)
+
+    def keyset_fields(self):
+        return keyset_fields(self.queryset)
+
+    def cursor_values(self, obj):
+        return [field.value_to_string(obj) for field, _desc in self.keyset]
+
+    def after(self, values, reverse=False):
+        """排序方向上位于游标之后（reverse 时为之前）的行"""
+        try:
+            values = [field.to_python(value) for (field, _desc), value in zip(self.keyset, values, strict=True)]
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor('无效的分页游标')
+        return keyset_condition(self.keyset, values, reverse)
+
+    def reversed_queryset(self):
+        return self.queryset.order_by(*[
+            field.attname if desc else f'-{field.attname}' for field, desc in self.keyset
+        ])
+
+    def get_results(self, request):
+        self.keyset = self.keyset_fields()
+        self.keyset_links = None
+        if self.keyset is None or self.list_editable or self.show_all:
+            super().get_results(request)
+            self.result_count_estimated = getattr(self.paginator, 'estimated', False)
+            return
+
+        direction, values = decode_cursor(self.cursor) if self.cursor else (None, None)
+        per_page = self.list_per_page
+        if direction == 'next':
+            rows = list(self.queryset.filter(self.after(values))[:per_page + 1])
+            has_prev, has_next = True, len(rows) > per_page
+            rows = rows[:per_page]
+        elif direction in ('prev', 'last'):
+            queryset = self.reversed_queryset()
+            if direction == 'prev':
+                queryset = queryset.filter(self.after(values, reverse=True))
+            rows = list(queryset[:per_page + 1])
+            has_prev, has_next = len(rows) > per_page, direction == 'prev'
+            rows = rows[:per_page][::-1]
+        else:
+            rows = list(self.queryset[:per_page + 1])
+            has_prev, has_next = False, len(rows) > per_page
+            rows = rows[:per_page]
+
+        self.result_count, self.result_count_estimated = estimate_count(self.queryset)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_prev or has_next
+        self.paginator = Paginator(rows, per_page)
+        if not rows:
+            # 游标已失效（如对应行被删除后的末页）：只保留回到首页的链接
+            self.keyset_links = {'first': self.get_query_string(remove=[CURSOR_VAR]), 'prev': None, 'next': None, 'last': None}
+            return
+        self.keyset_links = {
+            'first': self.get_query_string(remove=[CURSOR_VAR]) if has_prev else None,
+            'prev': self.get_query_string({CURSOR_VAR: encode_cursor('prev', self.cursor_values(rows[0]))})
+            if has_prev else None,
+            'next': self.get_query_string({CURSOR_VAR: encode_cursor('next', self.cursor_values(rows[-1]))})
+            if has_next else None,
+            'last': self.get_query_string({CURSOR_VAR: encode_cursor('last', [])}) if has_next else None,
+        }
@@ -0,0 +1,133 @@
+"""
+用户权限缓存
+
+每个用户的权限名称集合（frozenset）与推导出的角色只从数据库读取一次，之后：
+- 进程内字典直接命中，权限检查不产生数据库查询
+- 共享缓存（django cache）保存同一份数据，供其它进程复用
+
+失效采用版本号：全局代号 + 每个用户的版本号都保存在共享缓存中，
+读取时一次 get_many 取回两个版本号，与进程内副本不一致即重新加载。
+版本号取 time.time_ns()，不会重复：版本号键被缓存淘汰后重新生成的是一个从未用过的新值，
+不会重新命中失效之前写入的缓存项（相当于一次失效）。
+- UserPermissions / Users 变化：invalidate_user(user_id)，只使该用户失效
+- Permissions 变化（权限改名/删除）：invalidate_all()，所有用户失效
+信号处理器见 signals.py；sync_user.py / reset_password.py 修改用户后也会调用。
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import UserPermissions, Users
+
+
+GENERATION_KEY = 'permission_cache:generation'
+USER_VERSION_KEY = 'permission_cache:version:{user_id}'
+ENTRY_KEY = 'permission_cache:entry:{generation}:{version}:{user_id}'
+ENTRY_TIMEOUT = 60 * 60
+
+# 直接分配该权限 ID 的用户视为 viewer（与原 get_user_role 的判断一致）
+VIEWER_PERMISSION_ID = 9
+OPERATOR_KEYS = frozenset({'CREATE_TASK', 'UPDATE_TASK', 'OPERATOR'})
+VIEWER_KEYS = frozenset({'VIEW_INVENTORY', 'VIEW_STATISTICS', 'VIEW'})
+
+# user_id -> (generation, version, entry)
+_local = {}
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def _versions(user_id):
+    user_key = USER_VERSION_KEY.format(user_id=user_id)
+    values = cache.get_many([GENERATION_KEY, user_key])
+    for key in (GENERATION_KEY, user_key):
+        if key not in values:
+            # 版本号尚不存在（或已被淘汰）：生成新值；并发时以先写入者为准
+            cache.add(key, _new_version(), None)
+            values[key] = cache.get(key) or _new_version()
+    return values[GENERATION_KEY], values[user_key]
+
+
+def _bump(key):
+    cache.set(key, _new_version(), None)
+
+
+def derive_role(permission_ids, permission_names):
+    """
+    根据权限推导角色：'admin', 'operator', 'viewer', 'guest'
+    """
+    if VIEWER_PERMISSION_ID in permission_ids:
+        return 'viewer'
+    perm_set = {p.strip().upper() for p in permission_names if p}
+    if 'ADMIN' in perm_set:
+        return 'admin'
+    if perm_set & OPERATOR_KEYS:
+        return 'operator'
+    if perm_set & VIEWER_KEYS:
+        return 'viewer'
+    return 'guest'
+
+
+def load_entry(user_id):
+    """
+    从数据库读取用户权限（一次查询），返回 {'permissions': frozenset, 'role': str}
+    """
+    rows = list(
+        UserPermissions.objects.filter(user_id_id=user_id)
+        .values_list('permission_id_id', 'permission_id__permission_name')
+    )
+    permission_ids = {pid for pid, _name in rows}
+    names = frozenset(name.strip() for _pid, name in rows if name)
+    return {'permissions': names, 'role': derive_role(permission_ids, names)}
+
+
+def get_entry(user_id):
+    """
+    读取用户的权限缓存项，依次尝试进程内字典、共享缓存、数据库
+    """
+    generation, version = _versions(user_id)
+    local = _local.get(user_id)
+    if local is not None and local[0] == generation and local[1] == version:
+        return local[2]
+
+    entry_key = ENTRY_KEY.format(generation=generation, version=version, user_id=user_id)
+    entry = cache.get(entry_key)
+    if entry is None:
+        entry = load_entry(user_id)
+        cache.set(entry_key, entry, ENTRY_TIMEOUT)
+    _local[user_id] = (generation, version, entry)
+    return entry
+
+
+def get_permissions(user_id):
+    """用户权限名称集合（frozenset）"""
+    if not user_id:
+        return frozenset()
+    return get_entry(user_id)['permissions']
+
+
+def get_role(user_id):
+    """由用户权限推导的角色（不考虑 Django 超级用户）"""
+    if not user_id:
+        return 'guest'
+    return get_entry(user_id)['role']
+
+
+def invalidate_user(user_id):
+    """使单个用户的权限缓存失效"""
+    if not user_id:
+        return
+    _local.pop(user_id, None)
+    _bump(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_username(username):
+    """按用户名使权限缓存失效（供 sync_user.py / reset_password.py 等脚本使用）"""
+    invalidate_user(Users.objects.filter(username=username).values_list('user_id', flat=True).first())
+
+
+def invalidate_all():
+    """使所有用户的权限缓存失效"""
+    _local.clear()
+    _bump(GENERATION_KEY)
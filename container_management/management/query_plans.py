@@ -0,0 +1,156 @@
+"""
+热点查询执行计划检查
+
+HOT_QUERIES 登记仪表板、视图与后台列表依赖的热点查询，以及每条查询中不允许全表扫描的表。
+check_query_plans 命令对每条查询执行 EXPLAIN：
+- MySQL：EXPLAIN 结果中受检表的 type 为 ALL（且预估行数不低于 min_rows）即视为全表扫描
+- SQLite（本地开发）：EXPLAIN QUERY PLAN 中出现 "SCAN <表>" 且未使用索引即视为全表扫描
+新增热点查询时在此登记，并在 models.py / SQL 脚本中补充对应索引。
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from . import rawsql
+from .models import ContainerMaster, ContainerMovement, Task, VesselVisit, YardSlot
+
+
+# 名称 -> 查询构造函数（返回 QuerySet 或 (sql, params)）、不允许全表扫描的表、说明；
+# tables 对应 MySQL EXPLAIN 的 table 列（表名或别名）；vendors 限定只在指定数据库上检查
+HOT_QUERIES = {
+    'task_pending_by_priority': {
+        'build': lambda: Task.objects.filter(status='Pending').order_by('priority', 'task_id')[:50],
+        'tables': ('Task',),
+        'description': '待执行任务按优先级排序（View_Pending_Tasks / 后台任务筛选）',
+    },
+    'task_by_type': {
+        'build': lambda: Task.objects.filter(task_type='Load').order_by('-task_id')[:50],
+        'tables': ('Task',),
+        'description': '后台任务列表按任务类型筛选',
+    },
+    'task_dispatch_queue': {
+        'build': lambda: Task.objects.filter(status='Pending', task_type='Load').order_by('priority', 'task_id')[:1],
+        'tables': ('Task',),
+        'description': '任务派发：按类型划分的队列取队首',
+    },
+    'task_assigned_pending': {
+        'build': lambda: Task.objects.filter(assigned_user_id=1, status='Pending').order_by('priority', 'task_id')[:10],
+        'tables': ('Task',),
+        'description': '操作员仪表板：指派给我的待执行任务',
+    },
+    'task_executed_completed': {
+        'build': lambda: Task.objects.filter(actual_executor_id=1, status='Completed'),
+        'tables': ('Task',),
+        'description': '操作员仪表板：由我完成的任务',
+    },
+    'yard_available_slots': {
+        'build': lambda: YardSlot.objects.filter(slot_status='Available', current_container_id__isnull=True)[:50],
+        'tables': ('Yard_Slot',),
+        'description': '可用箱位（View_Yard_Available_Slots / 后台箱位筛选）',
+    },
+    'visit_by_status': {
+        'build': lambda: VesselVisit.objects.filter(status='AtBerth'),
+        'tables': ('Vessel_Visit',),
+        'description': '靠泊中的船舶访问（后台筛选）',
+    },
+    'visit_recent_arrivals': {
+        'build': lambda: VesselVisit.objects.filter(ata__gte=timezone.now() - timedelta(days=7)).order_by('-ata')[:50],
+        'tables': ('Vessel_Visit',),
+        'description': '最近到港的船舶访问',
+    },
+    'container_by_number': {
+        'build': lambda: ContainerMaster.objects.filter(container_number='ABCU1234567'),
+        'tables': ('Container_Master',),
+        'description': '按完整箱号查找集装箱',
+    },
+    'slot_by_coordinates_prefix': {
+        'build': lambda: YardSlot.objects.filter(slot_coordinates__istartswith='LD001-1').order_by('slot_coordinates')[:20],
+        'tables': ('Yard_Slot',),
+        'description': '按坐标前缀查找箱位（后台搜索 / 自动补全）',
+        'vendors': ('mysql',),
+    },
+    'view_pending_tasks': {
+        'build': lambda: ('SELECT * FROM View_Pending_Tasks LIMIT 50', []),
+        'tables': ('t',),
+        'description': 'View_Pending_Tasks 视图',
+        'vendors': ('mysql',),
+    },
+    'view_yard_available_slots': {
+        'build': lambda: ('SELECT * FROM View_Yard_Available_Slots LIMIT 50', []),
+        'tables': ('slot',),
+        'description': 'View_Yard_Available_Slots 视图',
+        'vendors': ('mysql',),
+    },
+    'movement_location_at': {
+        'build': lambda: ContainerMovement.objects.filter(
+            container_master_id=1, moved_at__lte=timezone.now()
+        ).order_by('-moved_at', '-movement_id')[:1],
+        'tables': ('Container_Movement',),
+        'description': '集装箱在某时刻的位置（movements.location_at）',
+    },
+    'movement_block_dwell': {
+        'build': lambda: ContainerMovement.objects.filter(
+            block_id=1, moved_at__lt=timezone.now(), left_at__isnull=True
+        ),
+        'tables': ('Container_Movement',),
+        'description': '堆场区当前在场集装箱（movements.block_inventory_at）',
+    },
+    'view_container_location_tracking': {
+        'build': lambda: ('SELECT * FROM View_Container_Location_Tracking LIMIT 50', []),
+        'tables': ('t', 't2'),
+        'description': 'View_Container_Location_Tracking 视图（船上位置取自最近一次完成的 Load 任务）',
+        'vendors': ('mysql',),
+    },
+}
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?("?)(\w+)\1(?: AS (\w+))?(.*)$')
+
+
+def query_sql(spec):
+    built = spec['build']()
+    if isinstance(built, tuple):
+        return built
+    return built.query.sql_with_params()
+
+
+def explain(sql, params):
+    """执行 EXPLAIN，返回 [dict]（列名 -> 值）"""
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    return rawsql.fetch_all(prefix + sql, params, row=rawsql.as_dict, label='explain')
+
+
+def full_scans(plan, min_rows=0):
+    """从执行计划中找出全表扫描，返回 [(表, 说明)]"""
+    scans = []
+    for row in plan:
+        if connection.vendor == 'sqlite':
+            match = SQLITE_SCAN_RE.match(row.get('detail', ''))
+            if match and 'INDEX' not in match.group(4):
+                scans += [(name, row['detail']) for name in match.group(2, 3) if name]
+        elif (row.get('type') or '').upper() == 'ALL' and (row.get('rows') or 0) >= min_rows:
+            scans.append((row.get('table'), f"type=ALL rows={row.get('rows')}"))
+    return scans
+
+
+def check(names=None, min_rows=0):
+    """
+    检查已登记的热点查询，返回 [{'name', 'description', 'skipped', 'plan', 'violations'}]
+    """
+    reports = []
+    for name, spec in HOT_QUERIES.items():
+        if names and name not in names:
+            continue
+        vendors = spec.get('vendors')
+        report = {'name': name, 'description': spec['description'], 'skipped': False, 'plan': [], 'violations': []}
+        if vendors and connection.vendor not in vendors:
+            report['skipped'] = True
+        else:
+            report['plan'] = explain(*query_sql(spec))
+            report['violations'] = [
+                (table, detail) for table, detail in full_scans(report['plan'], min_rows)
+                if table in spec['tables']
+            ]
+        reports.append(report)
+    return reports
@@ -0,0 +1,153 @@
+"""
+原始 SQL 访问层
+
+仪表板、视图样本、导出、执行计划检查等处直接执行 SQL 时统一经过这里：
+- 行适配器：as_tuple / as_list / as_dict / as_namedtuple，按列名把游标返回的元组转换为所需类型，
+  调用方不再各自 dict(zip(...)) 或 list(row)
+- fetch_all / fetch_columns / fetch_one / fetch_value：一次取回全部结果，适合小结果集
+- stream：逐批（chunk_size）取数的生成器，结果集不在 Python 中整体物化；
+  MySQL 下使用服务端游标（SSCursor，mysqlclient 与 pymysql 均提供，同样经 Django 游标包装，
+  计入 connection.queries / CaptureQueriesContext），
+  其它数据库使用 connection.chunked_cursor()（PostgreSQL 为命名游标）
+- 计时钩子：每条语句执行（流式读取时到读取结束）后调用 TIMING_HOOKS 中的函数
+  hook(label, sql, elapsed_ms, rows)；默认的 log_query 超过 SLOW_QUERY_MS 时记 warning
+"""
+import logging
+import time
+from collections import namedtuple
+
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+# 流式读取时每批取回的行数
+CHUNK_SIZE = 2000
+# 超过该耗时（毫秒）的语句记为慢查询
+SLOW_QUERY_MS = 500
+
+
+# ---------------- 行适配器：接收列名，返回把单行元组转换为目标类型的函数 ----------------
+
+def as_tuple(columns):
+    return tuple
+
+
+def as_list(columns):
+    return list
+
+
+def as_dict(columns):
+    return lambda row: dict(zip(columns, row))
+
+
+def as_namedtuple(columns):
+    return namedtuple('Row', columns, rename=True)._make
+
+
+# ---------------- 计时钩子 ----------------
+
+def log_query(label, sql, elapsed_ms, rows):
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning('慢查询 %s：%.1f ms，%s 行\n%s', label, elapsed_ms, rows, sql)
+    else:
+        logger.debug('%s：%.1f ms，%s 行', label, elapsed_ms, rows)
+
+
+TIMING_HOOKS = [log_query]
+
+
+def _report(label, sql, started, rows):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for hook in TIMING_HOOKS:
+        hook(label or sql.split(None, 1)[0], sql, elapsed_ms, rows)
+
+
+# ---------------- 执行 ----------------
+
+def _columns(cursor):
+    return [column[0] for column in cursor.description] if cursor.description else []
+
+
+def execute(sql, params=None, label=None):
+    """执行不返回结果的语句，返回影响行数"""
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rowcount = cursor.rowcount
+    _report(label, sql, started, rowcount)
+    return rowcount
+
+
+def fetch_columns(sql, params=None, row=as_tuple, label=None):
+    """返回 (列名列表, 行列表)"""
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = _columns(cursor)
+        adapt = row(columns)
+        rows = [adapt(values) for values in cursor.fetchall()]
+    _report(label, sql, started, len(rows))
+    return columns, rows
+
+
+def fetch_all(sql, params=None, row=as_tuple, label=None):
+    return fetch_columns(sql, params, row, label)[1]
+
+
+def fetch_one(sql, params=None, row=as_tuple, label=None):
+    """返回第一行，无结果时返回 None"""
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        values = cursor.fetchone()
+        result = None if values is None else row(_columns(cursor))(values)
+    _report(label, sql, started, 0 if values is None else 1)
+    return result
+
+
+def fetch_value(sql, params=None, default=None, label=None):
+    """返回第一行第一列，无结果时返回 default"""
+    values = fetch_one(sql, params, label=label)
+    return default if values is None else values[0]
+
+
+def _server_side_cursor():
+    """
+    服务端游标，与 connection.cursor() 一样经 Django 的游标包装：
+    执行时经过 execute_wrappers，DEBUG / CaptureQueriesContext 下记录到 connection.queries
+    """
+    connection.ensure_connection()
+    if connection.vendor == 'mysql':
+        from django.db.backends.mysql.base import CursorWrapper as MySQLCursorWrapper
+        from MySQLdb.cursors import SSCursor
+        with connection.wrap_database_errors:
+            cursor = MySQLCursorWrapper(connection.connection.cursor(SSCursor))
+        return connection._prepare_cursor(cursor)
+    return connection.chunked_cursor()
+
+
+def stream(sql, params=None, row=as_tuple, chunk_size=CHUNK_SIZE, header=False, label=None):
+    """
+    逐批读取结果并逐行产出；header=True 时第一项为列名列表。
+    服务端游标读完（或生成器关闭）前同一连接不能执行其它查询
+    """
+    started = time.perf_counter()
+    count = 0
+    cursor = _server_side_cursor()
+    try:
+        cursor.execute(sql, params)
+        columns = _columns(cursor)
+        if header:
+            yield columns
+        adapt = row(columns)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            count += len(rows)
+            for values in rows:
+                yield adapt(values)
+    finally:
+        cursor.close()
+        _report(label, sql, started, count)
@@ -0,0 +1,277 @@
+"""
+聚合搜索索引
+
+Search_Index 表为每个可搜索对象（集装箱、订舱单、作业任务、船舶访问、相关方）保存一行，
+Content 汇总该对象可被搜索的关键字，Search_Key 为其主标识：
+- MySQL：Content 上的 ngram FULLTEXT 索引，MATCH ... AGAINST 短语检索并按相关度排序
+- 其它数据库（本地开发）：对 Search_Index 单表做 LIKE 匹配
+
+search() 只对 Search_Index 执行一次排序查询，每种类型最多取 limit_per_type 条命中，
+再按主键批量取回对象供模板渲染；箱号类输入先走 container_query 的索引快速路径。
+
+索引维护：
+- 对象保存/删除：signals.py 调用 index_object / remove_object
+- 相关方、船舶、港口改名或箱号变化：reindex_dependents 重建引用它们的索引行
+- 批量 SQL 或首次部署：rebuild_search_index 命令全量重建
+"""
+from django.apps import apps as django_apps
+from django.db import connection, transaction
+from django.db.models import Q
+
+from . import container_query, rawsql
+from .models import Booking, ContainerMaster, Party, PortMaster, SearchIndex, Task, VesselMaster, VesselVisit
+
+
+def _join(*parts):
+    return ' '.join(str(p) for p in parts if p)
+
+
+def _party_name(party):
+    return party.party_name if party else None
+
+
+# 对象类型 -> 模型名、取数时的 select_related、主标识与索引内容
+SOURCES = {
+    'container': {
+        'model': 'ContainerMaster',
+        'related': ('owner_party_id',),
+        'key': lambda c: c.container_number,
+        'content': lambda c: _join(c.container_number, c.type_code_id, _party_name(c.owner_party_id)),
+    },
+    'booking': {
+        'model': 'Booking',
+        'related': ('shipper_party_id', 'consignee_party_id'),
+        'key': lambda b: b.booking_number,
+        'content': lambda b: _join(
+            b.booking_number, b.status, _party_name(b.shipper_party_id), _party_name(b.consignee_party_id)
+        ),
+    },
+    'task': {
+        'model': 'Task',
+        'related': ('container_master_id',),
+        'key': lambda t: t.container_master_id.container_number,
+        'content': lambda t: _join(t.container_master_id.container_number, t.task_type, t.status),
+    },
+    'visit': {
+        'model': 'VesselVisit',
+        'related': ('vessel_id', 'port_id'),
+        'key': lambda v: v.voyage_number_in,
+        'content': lambda v: _join(
+            v.voyage_number_in, v.voyage_number_out, v.vessel_id.vessel_name, v.port_id.port_name
+        ),
+    },
+    'party': {
+        'model': 'Party',
+        'related': (),
+        'key': lambda p: p.party_name,
+        'content': lambda p: _join(p.party_name, p.contact_person, p.scac_code),
+    },
+}
+
+# 模板渲染每种类型时需要的关联对象
+DISPLAY_RELATED = {
+    'container': ('type_code', 'owner_party_id'),
+    'booking': ('voyage_id', 'shipper_party_id', 'consignee_party_id'),
+    'task': ('container_master_id', 'vessel_visit_id'),
+    'visit': ('vessel_id', 'port_id'),
+    'party': (),
+}
+
+MODEL_TYPES = {source['model']: object_type for object_type, source in SOURCES.items()}
+
+
+def object_type_for(model):
+    return MODEL_TYPES.get(model.__name__)
+
+
+def build_entry(object_type, obj):
+    source = SOURCES[object_type]
+    return source['key'](obj) or '', source['content'](obj)
+
+
+def index_object(obj):
+    """新增或更新单个对象的索引行"""
+    object_type = object_type_for(type(obj))
+    key, content = build_entry(object_type, obj)
+    SearchIndex.objects.update_or_create(
+        object_type=object_type,
+        object_id=obj.pk,
+        defaults={'search_key': key, 'content': content},
+    )
+
+
+def remove_object(model, pk):
+    SearchIndex.objects.filter(object_type=object_type_for(model), object_id=pk).delete()
+
+
+def reindex_queryset(object_type, queryset, batch_size=2000, index_model=SearchIndex):
+    """
+    按批重建 queryset 中对象的索引行（先删后插），返回处理的对象数
+    """
+    source = SOURCES[object_type]
+    queryset = queryset.select_related(*source['related']).order_by('pk')
+    total = 0
+    last_pk = None
+    while True:
+        batch_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(batch_qs[:batch_size])
+        if not batch:
+            return total
+        last_pk = batch[-1].pk
+        rows = []
+        for obj in batch:
+            key, content = build_entry(object_type, obj)
+            rows.append(index_model(object_type=object_type, object_id=obj.pk, search_key=key, content=content))
+        with transaction.atomic():
+            index_model.objects.filter(object_type=object_type, object_id__in=[obj.pk for obj in batch]).delete()
+            index_model.objects.bulk_create(rows)
+        total += len(batch)
+
+
+def rebuild(types=None, get_model=None, batch_size=2000):
+    """
+    全量重建索引；get_model 用于在迁移中传入历史模型，返回 {类型: 行数}
+    """
+    if get_model is None:
+        def get_model(name):
+            return django_apps.get_model('management', name)
+    index_model = get_model('SearchIndex')
+    summary = {}
+    for object_type in (types or SOURCES):
+        index_model.objects.filter(object_type=object_type).delete()
+        model = get_model(SOURCES[object_type]['model'])
+        summary[object_type] = reindex_queryset(
+            object_type, model.objects.all(), batch_size=batch_size, index_model=index_model
+        )
+    return summary
+
+
+def reindex_dependents(model, pk):
+    """
+    被其它对象索引内容引用的字段变化后，重建引用它的索引行：
+    相关方 -> 集装箱（箱主）/ 订舱单（发货人、收货人）；船舶、港口 -> 船舶访问；集装箱 -> 作业任务
+    """
+    if model is Party:
+        reindex_queryset('container', ContainerMaster.objects.filter(owner_party_id=pk))
+        reindex_queryset('booking', Booking.objects.filter(Q(shipper_party_id=pk) | Q(consignee_party_id=pk)))
+    elif model is VesselMaster:
+        reindex_queryset('visit', VesselVisit.objects.filter(vessel_id=pk))
+    elif model is PortMaster:
+        reindex_queryset('visit', VesselVisit.objects.filter(port_id=pk))
+    elif model is ContainerMaster:
+        reindex_queryset('task', Task.objects.filter(container_master_id=pk))
+
+
+def _escape_like(value):
+    # 使用 '!' 作为 LIKE 转义符，避免反斜杠在不同数据库中的转义差异
+    return value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+
+def search_hits(query, limit_per_type=10, types=None):
+    """
+    对 Search_Index 执行一次排序查询，返回 [(类型, 对象编号, 得分)]，按得分降序；
+    types 限定只检索部分对象类型
+    """
+    query = query.strip()
+    if not query or types == ():
+        return []
+
+    table = connection.ops.quote_name(SearchIndex._meta.db_table)
+    # 主标识精确命中 > 前缀命中 > 其它命中
+    boost_sql = "CASE WHEN Search_Key = %s THEN 100 WHEN Search_Key LIKE %s ESCAPE '!' THEN 10 ELSE 0 END"
+    boost_params = [query, _escape_like(query) + '%']
+    phrase = query.replace('"', ' ').strip()
+    if connection.vendor == 'mysql' and len(phrase) >= 2:
+        # ngram 全文索引的短语检索：匹配连续的 n-gram，相当于子串匹配且可用索引
+        against = f'"{phrase}"'
+        score_sql = f"MATCH(Content) AGAINST (%s IN BOOLEAN MODE) + {boost_sql}"
+        score_params = [against] + boost_params
+        where_sql = "MATCH(Content) AGAINST (%s IN BOOLEAN MODE)"
+        where_params = [against]
+    else:
+        score_sql = boost_sql
+        score_params = boost_params
+        where_sql = "Content LIKE %s ESCAPE '!'"
+        where_params = ['%' + _escape_like(query) + '%']
+    if types is not None:
+        where_sql += f" AND Object_Type IN ({', '.join(['%s'] * len(types))})"
+        where_params += list(types)
+
+    if connection.features.supports_over_clause:
+        # 每种类型各取前 limit_per_type 条
+        sql = f"""
+            SELECT Object_Type, Object_ID, score FROM (
+                SELECT Object_Type, Object_ID, {score_sql} AS score,
+                       ROW_NUMBER() OVER (PARTITION BY Object_Type ORDER BY {score_sql} DESC, Object_ID DESC) AS rn
+                FROM {table}
+                WHERE {where_sql}
+            ) ranked
+            WHERE rn <= %s
+            ORDER BY score DESC, Object_ID DESC
+        """
+        params = score_params + score_params + where_params + [limit_per_type]
+    else:
+        sql = f"""
+            SELECT Object_Type, Object_ID, {score_sql} AS score
+            FROM {table}
+            WHERE {where_sql}
+            ORDER BY score DESC, Object_ID DESC
+            LIMIT %s
+        """
+        params = score_params + where_params + [limit_per_type * len(types or SOURCES)]
+
+    return rawsql.fetch_all(sql, params, label='search_hits')
+
+
+def _load(object_type, ids):
+    """按命中顺序批量取回对象"""
+    if not ids:
+        return []
+    model = django_apps.get_model('management', SOURCES[object_type]['model'])
+    objects = model.objects.select_related(*DISPLAY_RELATED[object_type]).in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def search_container_number(kind, number, limit_per_type=10):
+    """
+    箱号类输入的快速路径：集装箱走 UQ_Container_Number，作业任务走 IX_Search_Key（主标识即箱号），
+    均为等值或前缀范围查找；按索引顺序取前 limit_per_type 条，无需排序整段范围
+    """
+    containers = list(
+        ContainerMaster.objects.select_related(*DISPLAY_RELATED['container'])
+        .filter(container_query.container_number_filter(number))
+        .order_by('container_number')[:limit_per_type]
+    )
+    task_entries = SearchIndex.objects.filter(object_type='task')
+    if kind == 'exact':
+        task_entries = task_entries.filter(search_key=number).order_by('-object_id')
+    else:
+        task_entries = task_entries.filter(search_key__istartswith=number).order_by('search_key')
+    task_ids = list(task_entries.values_list('object_id', flat=True)[:limit_per_type])
+    return {'container': containers, 'task': _load('task', task_ids)}
+
+
+def search(query, limit_per_type=10):
+    """
+    返回 {类型: [对象, ...]}，每个列表按相关度排序。
+    箱号类输入（完整箱号/箱主代码/箱号前缀）的集装箱与任务走索引快速路径，
+    完整箱号不再检索其它类型；其余情况及快速路径无命中时回退到全文/模糊检索。
+    """
+    results = {object_type: [] for object_type in SOURCES}
+    fuzzy_types = None
+    kind, number = container_query.classify(query)
+    if kind:
+        fast = search_container_number(kind, number, limit_per_type)
+        if any(fast.values()):
+            results.update(fast)
+            fuzzy_types = () if kind == 'exact' else tuple(t for t in SOURCES if t not in fast)
+
+    grouped = {}
+    for object_type, object_id, _score in search_hits(query, limit_per_type, types=fuzzy_types):
+        ids = grouped.setdefault(object_type, [])
+        if len(ids) < limit_per_type:
+            ids.append(object_id)
+    for object_type, ids in grouped.items():
+        if object_type in results:
+            results[object_type] = _load(object_type, ids)
+    return results
@@ -0,0 +1,100 @@
+"""
+后台列表页自动 select_related
+
+列表页每一行会渲染 list_display 中的外键（调用关联对象的 __str__），而不少模型的 __str__
+本身又访问外键（如 Berth -> port_id.port_name、YardStack -> block_id.block_name），
+未设置 list_select_related 时每行都会触发额外查询。
+
+这里从 list_display 与各模型 __str__ 的源码（AST）推导出需要的关联路径：
+- list_display 中的外键 / 一对一字段（含 'fk__field' 形式）
+- __str__ 中形如 self.fk.attr 的访问：加入 fk；形如 {self.fk} 直接格式化关联对象时
+  继续展开关联模型的 __str__
+推导结果按模型缓存，ExplicitSaveAdmin.get_list_select_related 使用。
+"""
+import ast
+import inspect
+import textwrap
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+
+
+# __str__ 递归展开的最大深度，防止模型间循环引用
+MAX_DEPTH = 3
+
+
+def _forward_relation(model, name):
+    """返回 model 上名为 name 的正向外键/一对一字段，否则 None"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if field.is_relation and (field.many_to_one or field.one_to_one) and field.concrete:
+        return field
+    return None
+
+
+def _self_attribute_chains(func):
+    """解析函数源码，返回其中所有以 self 开头的属性访问链，如 ('port_id', 'port_name')"""
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    except (OSError, TypeError, SyntaxError):
+        return []
+    attributes = [node for node in ast.walk(tree) if isinstance(node, ast.Attribute)]
+    # self.a.b 中的 self.a 是外层访问的一部分，只从最外层节点取完整的链
+    inner = {id(node.value) for node in attributes}
+    chains = []
+    for node in attributes:
+        if id(node) in inner:
+            continue
+        names = []
+        current = node
+        while isinstance(current, ast.Attribute):
+            names.append(current.attr)
+            current = current.value
+        if isinstance(current, ast.Name) and current.id == 'self':
+            chains.append(tuple(reversed(names)))
+    return chains
+
+
+def _resolve_chain(model, chain, depth):
+    """把一条属性访问链解析为关联路径；链以关联对象结尾时继续展开其 __str__"""
+    paths = []
+    prefix = []
+    for name in chain:
+        field = _forward_relation(model, name)
+        if field is None:
+            return paths
+        prefix.append(name)
+        paths.append('__'.join(prefix))
+        model = field.related_model
+    # 链在关联对象上结束：该对象会被格式化为字符串
+    paths += ['__'.join(prefix) + '__' + path for path in str_relation_paths(model, depth + 1)]
+    return paths
+
+
+@lru_cache(maxsize=None)
+def str_relation_paths(model, depth=0):
+    """模型 __str__ 访问到的关联路径（元组）"""
+    if depth >= MAX_DEPTH:
+        return ()
+    paths = []
+    for chain in _self_attribute_chains(model.__str__):
+        paths += _resolve_chain(model, chain, depth)
+    return tuple(dict.fromkeys(paths))
+
+
+def list_display_relation_paths(model, list_display):
+    """
+    渲染 list_display 所需的关联路径，去除被更长路径覆盖的前缀
+    """
+    paths = []
+    for item in list_display:
+        if not isinstance(item, str):
+            continue
+        if item == '__str__':
+            paths += str_relation_paths(model)
+            continue
+        paths += _resolve_chain(model, tuple(item.split('__')), 0)
+    paths = list(dict.fromkeys(paths))
+    return [path for path in paths if not any(other.startswith(path + '__') for other in paths)]
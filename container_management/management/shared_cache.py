@@ -0,0 +1,113 @@
+"""
+共享缓存上的防击穿读取
+
+settings.CACHES 配置为多进程共享的后端（默认文件缓存，可换 Redis / Memcached）后，
+所有 worker 复用同一份缓存值。get_or_compute 在此基础上避免缓存过期时的并发回源：
+- 单飞（single-flight）：回源前用 cache.add 抢占锁键，同一时刻只有一个请求重新计算；
+  cache.add 在 Memcached / Redis / 数据库缓存上是原子操作，文件缓存上存在极小的竞争窗口，
+  最坏情况是两个进程同时重算一次
+- 过期后继续提供旧值：缓存项在新鲜期（ttl）之后还保留 stale_ttl 秒，期间未抢到锁的请求
+  直接返回旧值，由抢到锁的请求刷新
+- 完全没有缓存值（冷启动）时，未抢到锁的请求短暂等待其它请求的结果，超时后自行计算
+- TTL 抖动：新鲜期乘以 [1 - jitter, 1 + jitter] 内的随机系数，避免同时写入的键同时过期
+- 命中统计：每个键的 hit / stale / miss 次数记录在共享缓存中，stats() 读取；
+  文件缓存的 incr 不是原子操作，并发较高时统计值偏小；计数键也可能被缓存淘汰，
+  仅作参考统计，不用于任何需要持久保存的状态
+"""
+import random
+import time
+
+from django.core.cache import cache
+
+
+STALE_TTL = 300
+JITTER = 0.1
+# 回源锁的最长持有时间（秒），计算进程异常退出时锁自动释放
+LOCK_TIMEOUT = 30
+# 冷启动时等待其它请求计算结果的最长时间（秒）与轮询间隔
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.05
+COUNTER_KINDS = ('hit', 'stale', 'miss')
+
+ENTRY_KEY = 'shared_cache:entry:{key}'
+LOCK_KEY = 'shared_cache:lock:{key}'
+COUNTER_KEY = 'shared_cache:count:{kind}:{key}'
+
+
+def _count(key, kind):
+    counter_key = COUNTER_KEY.format(kind=kind, key=key)
+    try:
+        cache.incr(counter_key)
+    except ValueError:
+        if not cache.add(counter_key, 1, None):
+            cache.incr(counter_key)
+
+
+def _store(key, value, ttl, stale_ttl, jitter):
+    fresh_for = ttl * random.uniform(1 - jitter, 1 + jitter)
+    cache.set(ENTRY_KEY.format(key=key), (time.time() + fresh_for, value), fresh_for + stale_ttl)
+
+
+def _recompute(key, compute, ttl, stale_ttl, jitter):
+    try:
+        value = compute()
+        _store(key, value, ttl, stale_ttl, jitter)
+        return value
+    finally:
+        cache.delete(LOCK_KEY.format(key=key))
+
+
+def get_or_compute(key, compute, ttl, stale_ttl=STALE_TTL, jitter=JITTER):
+    """
+    读取 key 对应的缓存值，缺失或过期时调用 compute() 重新计算。
+    compute 抛出异常时不写缓存，异常向调用方传播
+    """
+    entry = cache.get(ENTRY_KEY.format(key=key))
+    if entry is not None:
+        fresh_until, value = entry
+        if time.time() < fresh_until:
+            _count(key, 'hit')
+            return value
+        _count(key, 'stale')
+        if cache.add(LOCK_KEY.format(key=key), 1, LOCK_TIMEOUT):
+            return _recompute(key, compute, ttl, stale_ttl, jitter)
+        # 其它请求正在刷新：先返回旧值
+        return value
+
+    _count(key, 'miss')
+    if cache.add(LOCK_KEY.format(key=key), 1, LOCK_TIMEOUT):
+        return _recompute(key, compute, ttl, stale_ttl, jitter)
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(ENTRY_KEY.format(key=key))
+        if entry is not None:
+            return entry[1]
+    return compute()
+
+
+def refresh(key, compute, ttl, stale_ttl=STALE_TTL, jitter=JITTER):
+    """无条件重新计算并写入（后台刷新任务使用），返回新值"""
+    value = compute()
+    _store(key, value, ttl, stale_ttl, jitter)
+    return value
+
+
+def invalidate(key):
+    cache.delete(ENTRY_KEY.format(key=key))
+
+
+def stats(keys):
+    """各键的命中统计：{key: {'hit': n, 'stale': n, 'miss': n}}"""
+    counter_keys = {
+        (key, kind): COUNTER_KEY.format(kind=kind, key=key) for key in keys for kind in COUNTER_KINDS
+    }
+    values = cache.get_many(list(counter_keys.values()))
+    return {
+        key: {kind: values.get(counter_keys[key, kind], 0) for kind in COUNTER_KINDS}
+        for key in keys
+    }
+
+
+def reset_stats(keys):
+    cache.delete_many([COUNTER_KEY.format(kind=kind, key=key) for key in keys for kind in COUNTER_KINDS])
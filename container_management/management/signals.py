@@ -0,0 +1,303 @@
+"""
+模型信号处理器：在模型保存/删除时增量维护派生数据（状态计数、堆场利用率、权限缓存、搜索索引等）
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import autocomplete, counters, permission_cache, search_index, yard_utilization
+from .slot_allocator import allocator
+from .models import (
+    Booking,
+    ContainerMaster,
+    Party,
+    Permissions,
+    PortMaster,
+    Task,
+    UserPermissions,
+    Users,
+    VesselMaster,
+    VesselVisit,
+    YardBlock,
+    YardSlot,
+    YardStack,
+    YardUtilization,
+)
+
+
+# 模型 -> 计数来源表
+COUNTED_MODELS = {
+    model: source for source, (model, _field) in counters.COUNTER_SOURCES.items()
+}
+
+
+def _status_field(model):
+    return counters.COUNTER_SOURCES[COUNTED_MODELS[model]][1]
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_save, sender=ContainerMaster)
+@receiver(pre_save, sender=VesselVisit)
+def remember_old_status(sender, instance, raw=False, **kwargs):
+    """
+    保存前从数据库读取旧状态，供 post_save 计算状态流转
+    """
+    if raw or instance.pk is None:
+        instance._counter_old = None
+        return
+    field = _status_field(sender)
+    columns = [field, 'atd'] if sender is VesselVisit else [field]
+    instance._counter_old = sender.objects.filter(pk=instance.pk).values(*columns).first()
+
+
+@receiver(pre_save, sender=Task)
+def stamp_task_completion(sender, instance, raw=False, **kwargs):
+    """
+    任务变为 Completed 而未填写实际移动时间（如在后台直接改状态）时记为当前时间，
+    移动历史按该时间记录；使用 remember_old_status 读取的旧状态（同为 pre_save，先注册先执行）
+    """
+    if raw or instance.status != 'Completed' or instance.movement_timestamp is not None:
+        return
+    old = getattr(instance, '_counter_old', None)
+    if old and old[_status_field(sender)] == 'Completed':
+        return
+    instance.movement_timestamp = timezone.now()
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=ContainerMaster)
+@receiver(post_save, sender=VesselVisit)
+def update_status_counter(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    field = _status_field(sender)
+    old = getattr(instance, '_counter_old', None)
+    new_status = getattr(instance, field)
+    if sender is VesselVisit:
+        # 与 TRG_Vessel_Visit_Auto_Complete 保持一致：首次设置 ATD 时数据库会把状态改为 Completed
+        old_atd = old['atd'] if old else None
+        if instance.atd is not None and old_atd is None and not created:
+            new_status = 'Completed'
+    if old is None and not created:
+        # 主键已存在但库中查不到旧行（如显式指定主键的插入），按新增处理
+        created = True
+    counters.record_transition(
+        COUNTED_MODELS[sender],
+        old[field] if old else None,
+        new_status,
+        created=created,
+    )
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=ContainerMaster)
+@receiver(post_delete, sender=VesselVisit)
+def release_status_counter(sender, instance, **kwargs):
+    counters.apply_delta(COUNTED_MODELS[sender], getattr(instance, _status_field(sender)), -1)
+
+
+# ---------------- 堆场利用率快照 ----------------
+
+def _stack_block_id(stack_id):
+    return YardStack.objects.filter(pk=stack_id).values_list('block_id', flat=True).first()
+
+
+@receiver(post_save, sender=YardBlock)
+def create_block_utilization(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        YardUtilization.objects.get_or_create(block_id=instance)
+
+
+@receiver(pre_save, sender=YardStack)
+def remember_old_stack_block(sender, instance, raw=False, **kwargs):
+    instance._utilization_old_block = None
+    if not raw and instance.pk is not None:
+        instance._utilization_old_block = _stack_block_id(instance.pk)
+
+
+@receiver(post_save, sender=YardStack)
+def update_stack_utilization(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_block = getattr(instance, '_utilization_old_block', None)
+    if created or old_block is None:
+        yard_utilization.apply_delta(instance.block_id_id, stacks=1)
+    elif old_block != instance.block_id_id:
+        # 堆栈换区：整栈的箱位与占用数一起迁移
+        slot_count = YardSlot.objects.filter(stack_id=instance.pk).count()
+        occupied = YardSlot.objects.filter(stack_id=instance.pk, current_container_id__isnull=False).count()
+        yard_utilization.apply_delta(old_block, stacks=-1, slots=-slot_count, occupied=-occupied)
+        yard_utilization.apply_delta(instance.block_id_id, stacks=1, slots=slot_count, occupied=occupied)
+
+
+@receiver(post_delete, sender=YardStack)
+def release_stack_utilization(sender, instance, **kwargs):
+    yard_utilization.apply_delta(instance.block_id_id, stacks=-1, create_missing=False)
+
+
+@receiver(pre_save, sender=YardSlot)
+def remember_old_slot_state(sender, instance, raw=False, **kwargs):
+    instance._utilization_old = None
+    if not raw and instance.pk is not None:
+        instance._utilization_old = (
+            YardSlot.objects.filter(pk=instance.pk)
+            .values('stack_id', 'stack_id__block_id', 'current_container_id')
+            .first()
+        )
+
+
+@receiver(post_save, sender=YardSlot)
+def update_slot_utilization(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_utilization_old', None)
+    new_occupied = 1 if instance.current_container_id_id is not None else 0
+    if created or old is None:
+        yard_utilization.apply_delta(_stack_block_id(instance.stack_id_id), slots=1, occupied=new_occupied)
+        return
+
+    old_occupied = 1 if old['current_container_id'] is not None else 0
+    if old['stack_id'] == instance.stack_id_id:
+        yard_utilization.apply_delta(old['stack_id__block_id'], occupied=new_occupied - old_occupied)
+    else:
+        yard_utilization.apply_delta(old['stack_id__block_id'], slots=-1, occupied=-old_occupied)
+        yard_utilization.apply_delta(_stack_block_id(instance.stack_id_id), slots=1, occupied=new_occupied)
+
+
+@receiver(pre_delete, sender=YardSlot)
+def remember_deleted_slot_block(sender, instance, **kwargs):
+    # 级联删除时堆栈可能先于 post_delete 被删除，因此在删除前记录所属堆场区
+    instance._utilization_block = _stack_block_id(instance.stack_id_id)
+
+
+@receiver(post_delete, sender=YardSlot)
+def release_slot_utilization(sender, instance, **kwargs):
+    occupied = 1 if instance.current_container_id_id is not None else 0
+    yard_utilization.apply_delta(
+        getattr(instance, '_utilization_block', None),
+        slots=-1,
+        occupied=-occupied,
+        create_missing=False,
+    )
+
+
+# ---------------- 箱位分配索引 ----------------
+
+@receiver(post_save, sender=YardSlot)
+@receiver(post_delete, sender=YardSlot)
+def refresh_slot_allocator(sender, instance, raw=False, **kwargs):
+    if not raw:
+        allocator.refresh_slots([instance.pk])
+
+
+@receiver(post_save, sender=YardBlock)
+def invalidate_slot_allocator(sender, instance, created, raw=False, **kwargs):
+    # 堆场区类型可能变化，已加载的索引下次访问时重载
+    if not created and not raw:
+        allocator.invalidate()
+
+
+@receiver(post_save, sender=Task)
+def sync_task_slots(sender, instance, created, raw=False, **kwargs):
+    """
+    任务完成：TRG_Task_Complete_Update_Slot 已释放起始箱位、占用目标箱位，按库中状态更新索引；
+    任务取消：归还目标箱位的预留
+    """
+    if raw:
+        return
+    old = getattr(instance, '_counter_old', None)
+    if old is not None and old[_status_field(sender)] == instance.status:
+        return
+    if instance.status == 'Completed':
+        allocator.refresh_slots([instance.from_slot_id_id, instance.to_slot_id_id])
+    elif instance.status == 'Cancelled':
+        allocator.release(instance.to_slot_id_id)
+
+
+# ---------------- 权限缓存失效 ----------------
+
+@receiver(post_save, sender=UserPermissions)
+@receiver(post_delete, sender=UserPermissions)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    permission_cache.invalidate_user(instance.user_id_id)
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def invalidate_user(sender, instance, **kwargs):
+    permission_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Permissions)
+@receiver(post_delete, sender=Permissions)
+def invalidate_all_permissions(sender, instance, **kwargs):
+    permission_cache.invalidate_all()
+
+
+# ---------------- 搜索索引 ----------------
+
+# 被其它对象索引内容引用的字段：变化时需要重建引用方的索引行
+DEPENDENT_FIELDS = {
+    Party: ['party_name'],
+    VesselMaster: ['vessel_name'],
+    PortMaster: ['port_name'],
+    ContainerMaster: ['container_number'],
+}
+
+
+@receiver(pre_save, sender=Party)
+@receiver(pre_save, sender=VesselMaster)
+@receiver(pre_save, sender=PortMaster)
+@receiver(pre_save, sender=ContainerMaster)
+def remember_search_dependents(sender, instance, raw=False, **kwargs):
+    instance._search_old = None
+    if not raw and instance.pk is not None:
+        instance._search_old = sender.objects.filter(pk=instance.pk).values(*DEPENDENT_FIELDS[sender]).first()
+
+
+@receiver(post_save, sender=ContainerMaster)
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=VesselVisit)
+@receiver(post_save, sender=Party)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search_index.index_object(instance)
+
+
+@receiver(post_save, sender=Party)
+@receiver(post_save, sender=VesselMaster)
+@receiver(post_save, sender=PortMaster)
+@receiver(post_save, sender=ContainerMaster)
+def update_dependent_search_index(sender, instance, created, raw=False, **kwargs):
+    old = getattr(instance, '_search_old', None)
+    if raw or created or old is None:
+        return
+    if any(old[field] != getattr(instance, field) for field in DEPENDENT_FIELDS[sender]):
+        search_index.reindex_dependents(sender, instance.pk)
+
+
+@receiver(post_delete, sender=ContainerMaster)
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=VesselVisit)
+@receiver(post_delete, sender=Party)
+def remove_search_index(sender, instance, **kwargs):
+    search_index.remove_object(sender, instance.pk)
+
+
+# ---------------- 自动补全缓存失效 ----------------
+
+@receiver(post_save, sender=ContainerMaster)
+@receiver(post_save, sender=YardSlot)
+@receiver(post_save, sender=YardStack)
+@receiver(post_save, sender=VesselVisit)
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=ContainerMaster)
+@receiver(post_delete, sender=YardSlot)
+@receiver(post_delete, sender=YardStack)
+@receiver(post_delete, sender=VesselVisit)
+@receiver(post_delete, sender=Users)
+def invalidate_autocomplete(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.invalidate(sender)
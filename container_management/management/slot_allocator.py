@@ -0,0 +1,315 @@
+"""
+箱位分配
+
+进程内维护可用箱位索引，按堆场区类型（BLOCK_TYPE_CHOICES）分组：
+- 每个堆栈一个小根堆 (层号, 箱位编号)：栈内最低的可用层
+- 每种堆场区类型一个小根堆 (层号, 堆栈编号)：各堆栈最低可用层的候选，取堆顶即为最优箱位
+最优箱位 = 所有匹配类型堆栈中层号最低的可用箱位（先铺满底层，减少翻箱），
+层号相同时取堆栈编号最小者。查询为堆顶读取，预留/归还为 O(log n) 的堆操作；
+堆中过期的候选采用惰性删除，出堆时与堆栈当前最低层比对。
+
+预留通过单条条件 UPDATE 原子完成：
+    UPDATE Yard_Slot SET Slot_Status = 'Reserved'
+    WHERE Slot_ID = ? AND Slot_Status = 'Available' AND Current_Container_ID IS NULL
+影响行数为 0 说明该箱位已被其它进程占用或预留，丢弃后取下一个候选，不会重复分配。
+
+与数据库保持一致：
+- TRG_Task_Complete_Update_Slot 在任务完成时把目标箱位置为 Occupied（预留 -> 占用）、
+  起始箱位置为 Available；signals.py 在任务完成后把起始箱位重新读入索引
+- 任务取消时归还其目标箱位的预留（Reserved -> Available）
+- 预留记录 Reserved_At；超过 RESERVATION_TTL 秒仍没有未完成（Pending / InProgress）任务以其为目标箱位的
+  预留视为遗弃（如经分配接口预留后没有创建任务），每次全量重载前由 release_expired() 归还。
+  Reserved_At 为空的预留（后台手工设置）不自动归还
+- 箱位保存/删除、堆场区类型变化经 signals.py 同步；其它进程或批量 SQL 的变化
+  由 RELOAD_INTERVAL 定期全量重载兜底
+"""
+import heapq
+import threading
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from . import autocomplete
+from .models import ContainerMaster, ContainerTypeDict, Task, YardSlot
+
+
+# 集装箱组代码 -> 可用的堆场区类型（按优先级）
+GROUP_BLOCK_TYPES = {
+    'RF': ('Reefer',),
+    'RE': ('Reefer',),
+    'RT': ('Reefer',),
+    'TK': ('Heavy', 'Standard'),
+    'TN': ('Heavy', 'Standard'),
+    'OT': ('Heavy', 'Standard'),
+}
+DEFAULT_BLOCK_TYPES = ('Standard', 'Temporary')
+# 索引最长使用时间（秒），超过后下次访问时全量重载
+RELOAD_INTERVAL = 300
+# 单次预留时尝试的候选数上限（候选被其它进程抢先预留时重试）
+MAX_ATTEMPTS = 50
+# 预留后等待任务引用的最长时间（秒）
+RESERVATION_TTL = 1800
+
+
+class NoSlotAvailable(Exception):
+    """没有满足条件的可用箱位"""
+
+
+def block_types_for(type_code=None, group_code=None):
+    """根据箱型（或组代码）给出可用的堆场区类型"""
+    if group_code is None and type_code:
+        group_code = ContainerTypeDict.objects.filter(pk=type_code).values_list('group_code', flat=True).first()
+    return GROUP_BLOCK_TYPES.get((group_code or '').upper(), DEFAULT_BLOCK_TYPES)
+
+
+class SlotAllocator:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded_at = None
+
+    # ---------------- 索引维护 ----------------
+
+    def _reset(self):
+        # slot_id -> (stack_id, 层号, 坐标)
+        self.slots = {}
+        # stack_id -> 堆场区类型
+        self.stack_types = {}
+        # stack_id -> [(层号, slot_id)]
+        self.stack_heaps = {}
+        # 堆场区类型 -> [(层号, stack_id)]
+        self.type_heaps = {}
+
+    def load(self):
+        """归还过期的预留后，从数据库全量加载可用箱位（一次查询）"""
+        self.release_expired()
+        rows = (
+            YardSlot.objects.filter(slot_status='Available', current_container_id__isnull=True)
+            .values_list('slot_id', 'stack_id', 'tier_number', 'slot_coordinates', 'stack_id__block_id__block_type')
+        )
+        with self._lock:
+            self._reset()
+            for slot_id, stack_id, tier, coordinates, block_type in rows.iterator(chunk_size=5000):
+                self.stack_types[stack_id] = block_type
+                self.slots[slot_id] = (stack_id, tier, coordinates)
+                self.stack_heaps.setdefault(stack_id, []).append((tier, slot_id))
+            for stack_id, heap in self.stack_heaps.items():
+                heapq.heapify(heap)
+                self.type_heaps.setdefault(self.stack_types[stack_id], []).append((heap[0][0], stack_id))
+            for heap in self.type_heaps.values():
+                heapq.heapify(heap)
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """下次访问时全量重载"""
+        self.loaded_at = None
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > RELOAD_INTERVAL:
+            self.load()
+
+    @property
+    def is_loaded(self):
+        return self.loaded_at is not None
+
+    def _add(self, slot_id, stack_id, tier, coordinates, block_type):
+        if slot_id in self.slots:
+            return
+        self.slots[slot_id] = (stack_id, tier, coordinates)
+        self.stack_types[stack_id] = block_type
+        heapq.heappush(self.stack_heaps.setdefault(stack_id, []), (tier, slot_id))
+        if self._stack_top(stack_id) == (tier, slot_id):
+            # 该堆栈的最低可用层变化：推入新的候选，旧候选出堆时惰性丢弃
+            heapq.heappush(self.type_heaps.setdefault(block_type, []), (tier, stack_id))
+
+    def _remove(self, slot_id):
+        # 只从 slots 中移除，堆中的条目在出堆时惰性丢弃
+        return self.slots.pop(slot_id, None)
+
+    def _stack_top(self, stack_id):
+        """堆栈当前最低的可用层 (层号, slot_id)，顺带清理已移除的条目"""
+        heap = self.stack_heaps.get(stack_id)
+        while heap and self.slots.get(heap[0][1], (None, None))[:2] != (stack_id, heap[0][0]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _candidate(self, block_type):
+        """某类型堆场区的最优箱位编号，无可用箱位时返回 None"""
+        heap = self.type_heaps.get(block_type)
+        while heap:
+            tier, stack_id = heap[0]
+            if self.stack_types.get(stack_id) != block_type:
+                # 堆场区类型已变化，该堆栈的候选在新类型的堆中
+                heapq.heappop(heap)
+                continue
+            top = self._stack_top(stack_id)
+            if top is not None and top[0] == tier:
+                return top[1]
+            heapq.heappop(heap)
+            if top is not None:
+                heapq.heappush(heap, (top[0], stack_id))
+        return None
+
+    def refresh_slots(self, slot_ids):
+        """
+        按数据库当前状态更新指定箱位在索引中的位置（仅在索引已加载时执行）
+        """
+        slot_ids = [slot_id for slot_id in slot_ids if slot_id is not None]
+        if not self.is_loaded or not slot_ids:
+            return
+        rows = (
+            YardSlot.objects.filter(pk__in=slot_ids)
+            .values_list('slot_id', 'stack_id', 'tier_number', 'slot_coordinates',
+                         'stack_id__block_id__block_type', 'slot_status', 'current_container_id')
+        )
+        with self._lock:
+            seen = set()
+            for slot_id, stack_id, tier, coordinates, block_type, status, container_id in rows:
+                seen.add(slot_id)
+                known = self.slots.get(slot_id)
+                if known is not None and known[:2] != (stack_id, tier):
+                    # 换栈/换层：先移除旧位置
+                    self._remove(slot_id)
+                if status == 'Available' and container_id is None:
+                    self._add(slot_id, stack_id, tier, coordinates, block_type)
+                else:
+                    self._remove(slot_id)
+            for slot_id in set(slot_ids) - seen:
+                self._remove(slot_id)
+
+    # ---------------- 查询与预留 ----------------
+
+    def _describe(self, slot_id):
+        stack_id, tier, coordinates = self.slots[slot_id]
+        return {
+            'slot_id': slot_id,
+            'slot_coordinates': coordinates,
+            'stack_id': stack_id,
+            'tier_number': tier,
+            'block_type': self.stack_types[stack_id],
+        }
+
+    def best(self, block_types=DEFAULT_BLOCK_TYPES):
+        """按 block_types 的优先级返回最优可用箱位（不预留），无可用箱位时返回 None"""
+        self.ensure_loaded()
+        with self._lock:
+            for block_type in block_types:
+                slot_id = self._candidate(block_type)
+                if slot_id is not None:
+                    return self._describe(slot_id)
+        return None
+
+    def reserve(self, block_types=DEFAULT_BLOCK_TYPES):
+        """
+        选出最优箱位并原子地置为 Reserved，返回箱位信息；
+        没有可用箱位时抛出 NoSlotAvailable
+        """
+        self.ensure_loaded()
+        for _attempt in range(MAX_ATTEMPTS):
+            with self._lock:
+                slot = None
+                for block_type in block_types:
+                    slot_id = self._candidate(block_type)
+                    if slot_id is not None:
+                        slot = self._describe(slot_id)
+                        self._remove(slot_id)
+                        break
+            if slot is None:
+                break
+            reserved = YardSlot.objects.filter(
+                pk=slot['slot_id'], slot_status='Available', current_container_id__isnull=True
+            ).update(slot_status='Reserved', reserved_at=timezone.now())
+            if reserved:
+                # 条件 UPDATE 不经过模型信号，手动使箱位自动补全缓存失效
+                autocomplete.invalidate(YardSlot)
+                return slot
+            # 已被其它进程占用或预留：该候选已从索引移除，继续取下一个
+        raise NoSlotAvailable(f'堆场区类型 {", ".join(block_types)} 中没有可用箱位')
+
+    def reserve_many(self, block_types, count):
+        """
+        按最优顺序一次预留 count 个箱位（批量作业计划使用），返回箱位信息列表。
+        须在事务中调用：候选先 SELECT ... FOR UPDATE 锁定并确认仍可用，再用一条 UPDATE 置为 Reserved；
+        可用箱位不足时抛出 NoSlotAvailable，由调用方回滚事务
+        """
+        self.ensure_loaded()
+        reserved = []
+        while len(reserved) < count:
+            with self._lock:
+                batch = []
+                while len(reserved) + len(batch) < count:
+                    slot_id = next(
+                        (candidate for candidate in map(self._candidate, block_types) if candidate is not None), None
+                    )
+                    if slot_id is None:
+                        break
+                    batch.append(self._describe(slot_id))
+                    self._remove(slot_id)
+            if not batch:
+                break
+            locked = set(
+                YardSlot.objects.select_for_update()
+                .filter(pk__in=[slot['slot_id'] for slot in batch], slot_status='Available',
+                        current_container_id__isnull=True)
+                .values_list('pk', flat=True)
+            )
+            if locked:
+                YardSlot.objects.filter(pk__in=locked).update(slot_status='Reserved', reserved_at=timezone.now())
+            reserved += [slot for slot in batch if slot['slot_id'] in locked]
+        if len(reserved) < count:
+            # 事务将回滚，已从索引移除的候选需要重新加载
+            self.invalidate()
+            raise NoSlotAvailable(f'堆场区类型 {", ".join(block_types)} 中可用箱位不足 {count} 个')
+        if reserved:
+            autocomplete.invalidate(YardSlot)
+        return reserved
+
+    def release(self, slot_id):
+        """归还预留（Reserved -> Available），返回是否归还成功"""
+        released = YardSlot.objects.filter(
+            pk=slot_id, slot_status='Reserved', current_container_id__isnull=True
+        ).update(slot_status='Available', reserved_at=None)
+        if released:
+            autocomplete.invalidate(YardSlot)
+            self.refresh_slots([slot_id])
+        return bool(released)
+
+    def release_expired(self, ttl=RESERVATION_TTL):
+        """
+        归还预留超过 ttl 秒、且没有未完成任务以其为目标箱位的箱位，返回归还的数量。
+        单条 UPDATE 完成，判断与归还之间不会有任务插入进来
+        """
+        referenced = Task.objects.filter(
+            status__in=('Pending', 'InProgress'), to_slot_id__isnull=False
+        ).values('to_slot_id')
+        released = YardSlot.objects.filter(
+            slot_status='Reserved', current_container_id__isnull=True,
+            reserved_at__lt=timezone.now() - timedelta(seconds=ttl),
+        ).exclude(pk__in=referenced).update(slot_status='Available', reserved_at=None)
+        if released:
+            autocomplete.invalidate(YardSlot)
+            # 已加载的索引在下次全量重载时纳入归还的箱位
+            self.invalidate()
+        return released
+
+    def stats(self):
+        """各类型堆场区的可用箱位数"""
+        self.ensure_loaded()
+        with self._lock:
+            totals = {}
+            for stack_id, _tier, _coordinates in self.slots.values():
+                block_type = self.stack_types[stack_id]
+                totals[block_type] = totals.get(block_type, 0) + 1
+            return totals
+
+
+# 进程内共享的分配器实例
+allocator = SlotAllocator()
+
+
+def reserve_for_container(container):
+    """为集装箱（ContainerMaster 实例或编号）预留最优箱位"""
+    if not isinstance(container, ContainerMaster):
+        container = ContainerMaster.objects.select_related('type_code').get(pk=container)
+    block_types = block_types_for(group_code=container.type_code.group_code)
+    return allocator.reserve(block_types)
@@ -0,0 +1,367 @@
+"""
+批量作业任务
+
+一次船舶装卸涉及数千个箱子，逐条创建/完成任务会为每一行触发
+TRG_Task_Complete_Update_Container / TRG_Task_Complete_Update_Slot，往返次数与锁持有时间都随行数线性增长。
+
+create_plan：在一个事务中为整份装船/卸船计划创建任务
+- 箱号、箱位坐标各用一次查询批量解析；未指定起始箱位时取集装箱当前所在箱位
+- 未指定目标箱位时由 slot_allocator 按箱型一次性批量预留；装船（Load）、出闸（GateOut）的集装箱
+  离开堆场，不自动预留堆场箱位，必须显式指定目标箱位
+- 多行 INSERT（bulk_create）写入任务，随后维护状态计数与搜索索引。MySQL 的多行 INSERT 不返回主键：
+  每条 INSERT 之后读取本连接的 LAST_INSERT_ID()（该语句的第一个自增值），简单 INSERT 的自增值连续，
+  再按编号区间核对写入的行，不与其它并发写入的任务混淆
+
+complete_tasks：在一个事务中批量完成任务，结果与逐条完成时触发器产生的结果一致
+- 会话变量 @tos_batch_mode = 1 使上述两个触发器跳过（MySQL）
+- 按任务编号顺序在内存中推演集装箱状态与箱位占用的最终结果，再用集合式 UPDATE 写回
+- 手动维护 Status_Counter、Yard_Utilization、搜索索引与箱位分配索引
+
+install_completion_triggers：按 sqlutil/triggers.sql 重新创建上述两个触发器（迁移 0012 调用），
+已有的 MySQL 数据库换成维护 Status_Counter / Yard_Utilization 并识别 @tos_batch_mode 的版本
+"""
+from collections import Counter
+from contextlib import contextmanager
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import autocomplete, counters, rawsql, search_index, yard_utilization
+from .models import ContainerMaster, Task, Users, VesselVisit, YardSlot
+from .slot_allocator import NoSlotAvailable, allocator, block_types_for
+
+
+# 与 TRG_Task_Complete_Update_Container 一致：任务类型 -> 完成后集装箱状态
+CONTAINER_STATUS_AFTER = {
+    'Load': 'OnVessel',
+    'Discharge': 'InYard',
+    'GateOut': 'GateOut',
+    'GateIn': 'InYard',
+}
+TASK_TYPES = [choice for choice, _label in Task._meta.get_field('task_type').choices]
+# 不自动预留目标箱位的任务类型（集装箱离开堆场）
+EXPLICIT_TARGET_TYPES = ('Load', 'GateOut')
+# CASE 表达式每条 UPDATE 包含的行数上限
+UPDATE_CHUNK = 500
+# 每条多行 INSERT 的任务数
+INSERT_CHUNK = 1000
+# 批量完成时跳过、由 complete_tasks 代为完成其联动的触发器
+COMPLETION_TRIGGERS = ('TRG_Task_Complete_Update_Container', 'TRG_Task_Complete_Update_Slot')
+TRIGGERS_FILE = settings.BASE_DIR.parent / 'sqlutil' / 'triggers.sql'
+
+
+class BatchError(Exception):
+    """批量计划校验失败；errors 为 [(序号, 说明)]"""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+@contextmanager
+def batch_mode():
+    """MySQL 下在当前会话设置 @tos_batch_mode = 1，使任务完成触发器跳过"""
+    if connection.vendor != 'mysql':
+        yield
+        return
+    rawsql.execute('SET @tos_batch_mode = 1', label='batch_mode')
+    try:
+        yield
+    finally:
+        rawsql.execute('SET @tos_batch_mode = 0', label='batch_mode')
+
+
+def completion_trigger_sql():
+    """sqlutil/triggers.sql 中任务完成触发器的 CREATE TRIGGER 语句：{触发器名: 语句}（去掉 DELIMITER 结束符）"""
+    text = TRIGGERS_FILE.read_text(encoding='utf-8')
+    statements = {}
+    for name in COMPLETION_TRIGGERS:
+        start = text.index(f'CREATE TRIGGER `{name}`')
+        statements[name] = text[start:text.index('END$$', start) + len('END')]
+    return statements
+
+
+def install_completion_triggers(schema_editor=None):
+    """（MySQL）删除并按 triggers.sql 重新创建任务完成触发器；其它数据库上没有这两个触发器，不做任何事"""
+    conn = schema_editor.connection if schema_editor else connection
+    if conn.vendor != 'mysql':
+        return
+    with conn.cursor() as cursor:
+        for name, sql in completion_trigger_sql().items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS `{name}`')
+            cursor.execute(sql)
+
+
+def _chunks(items, size=UPDATE_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _resolve_user(user):
+    if user is None or isinstance(user, Users):
+        return user
+    if isinstance(user, int) or str(user).isdigit():
+        return Users.objects.get(pk=int(user))
+    return Users.objects.get(username=user)
+
+
+def _resolve_moves(moves):
+    """
+    把计划中的箱号/箱位坐标批量解析为编号，返回 [(集装箱, 起始箱位, 目标箱位, 优先级)]；
+    目标箱位未指定时为 None
+    """
+    numbers = {str(m['container']).strip().upper() for m in moves if not str(m.get('container', '')).isdigit()}
+    containers = dict(
+        ContainerMaster.objects.filter(container_number__in=numbers).values_list('container_number', 'pk')
+    )
+    coordinates = {
+        str(m[key]).strip() for m in moves for key in ('from_slot', 'to_slot')
+        if m.get(key) not in (None, '') and not str(m[key]).isdigit()
+    }
+    slots = dict(YardSlot.objects.filter(slot_coordinates__in=coordinates).values_list('slot_coordinates', 'pk'))
+
+    errors = []
+    resolved = []
+    for index, move in enumerate(moves):
+        raw = str(move.get('container', '')).strip()
+        container_id = int(raw) if raw.isdigit() else containers.get(raw.upper())
+        if container_id is None:
+            errors.append((index, f'集装箱不存在: {raw}'))
+            continue
+        slot_ids = []
+        for key in ('from_slot', 'to_slot'):
+            value = move.get(key)
+            if value in (None, ''):
+                slot_ids.append(None)
+            elif str(value).isdigit():
+                slot_ids.append(int(value))
+            elif str(value).strip() in slots:
+                slot_ids.append(slots[str(value).strip()])
+            else:
+                errors.append((index, f'箱位不存在: {value}'))
+                break
+        else:
+            resolved.append((index, container_id, slot_ids[0], slot_ids[1], int(move.get('priority') or 100)))
+    if errors:
+        raise BatchError(f'{len(errors)} 条作业校验失败', errors)
+
+    # 未指定起始箱位：取集装箱当前所在箱位（一次查询）
+    missing_from = {container_id for _i, container_id, from_slot, _to, _p in resolved if from_slot is None}
+    current = dict(
+        YardSlot.objects.filter(current_container_id__in=missing_from).values_list('current_container_id', 'pk')
+    )
+    result = []
+    for index, container_id, from_slot, to_slot, priority in resolved:
+        from_slot = from_slot or current.get(container_id)
+        if from_slot is None:
+            errors.append((index, f'集装箱 {container_id} 不在堆场中，需指定起始箱位'))
+            continue
+        result.append((container_id, from_slot, to_slot, priority))
+    if errors:
+        raise BatchError(f'{len(errors)} 条作业校验失败', errors)
+    return result
+
+
+def _allocate_targets(moves):
+    """为未指定目标箱位的作业按箱型批量预留箱位"""
+    pending = [i for i, move in enumerate(moves) if move[2] is None]
+    if not pending:
+        return moves
+    group_codes = dict(
+        ContainerMaster.objects.filter(pk__in={moves[i][0] for i in pending})
+        .values_list('pk', 'type_code__group_code')
+    )
+    by_types = {}
+    for i in pending:
+        by_types.setdefault(block_types_for(group_code=group_codes.get(moves[i][0])), []).append(i)
+    moves = list(moves)
+    for block_types, indexes in by_types.items():
+        reserved = allocator.reserve_many(block_types, len(indexes))
+        for i, slot in zip(indexes, reserved):
+            container_id, from_slot, _to_slot, priority = moves[i]
+            moves[i] = (container_id, from_slot, slot['slot_id'], priority)
+    return moves
+
+
+def _insert_tasks(tasks):
+    """
+    多行 INSERT 写入任务，返回按输入顺序的任务编号。
+    MySQL 下逐条 INSERT 读取 LAST_INSERT_ID()，并核对编号区间内正是本次写入的行
+    """
+    task_ids = []
+    for chunk in _chunks(tasks, INSERT_CHUNK):
+        created = Task.objects.bulk_create(chunk)
+        if None not in (task.pk for task in created):
+            task_ids.extend(task.pk for task in created)
+            continue
+        first = rawsql.fetch_value('SELECT LAST_INSERT_ID()', label='create_plan')
+        ids = list(range(first, first + len(chunk)))
+        stored = dict(
+            Task.objects.filter(pk__in=ids).values_list('pk', 'container_master_id')
+        )
+        if [stored.get(pk) for pk in ids] != [task.container_master_id_id for task in chunk]:
+            raise BatchError('无法确定新任务的编号（自增值不连续，请检查 innodb_autoinc_lock_mode）')
+        task_ids.extend(ids)
+    return task_ids
+
+
+def create_plan(task_type, moves, created_by, vessel_visit=None, assigned_user=None):
+    """
+    在一个事务中为整份计划创建任务。moves 为字典列表：
+        {'container': 箱号或编号, 'from_slot': 坐标或编号（可选）, 'to_slot': 坐标或编号（Load / GateOut 必填）, 'priority': 数字（可选）}
+    返回 {'created': 数量, 'task_ids': [...]}（与 moves 顺序一致）；
+    校验失败时抛出 BatchError，箱位不足时抛出 NoSlotAvailable
+    """
+    if task_type not in TASK_TYPES:
+        raise BatchError(f'未知任务类型: {task_type}')
+    if not moves:
+        raise BatchError('计划为空')
+    if task_type in EXPLICIT_TARGET_TYPES:
+        errors = [(index, '装船/出闸作业必须指定目标箱位') for index, move in enumerate(moves) if move.get('to_slot') in (None, '')]
+        if errors:
+            raise BatchError(f'{len(errors)} 条作业校验失败', errors)
+    created_by = _resolve_user(created_by)
+    assigned_user = _resolve_user(assigned_user)
+    if vessel_visit is not None and not isinstance(vessel_visit, VesselVisit):
+        vessel_visit = VesselVisit.objects.get(pk=vessel_visit)
+
+    try:
+        with transaction.atomic():
+            resolved = _allocate_targets(_resolve_moves(moves))
+            task_ids = _insert_tasks([
+                Task(
+                    task_type=task_type,
+                    status='Pending',
+                    container_master_id_id=container_id,
+                    from_slot_id_id=from_slot,
+                    to_slot_id_id=to_slot,
+                    vessel_visit_id=vessel_visit,
+                    created_by_user_id=created_by,
+                    assigned_user_id=assigned_user,
+                    priority=priority,
+                )
+                for container_id, from_slot, to_slot, priority in resolved
+            ])
+            counters.apply_delta('Task', 'Pending', len(task_ids))
+            search_index.reindex_queryset('task', Task.objects.filter(pk__in=task_ids))
+    except (BatchError, NoSlotAvailable):
+        raise
+    except Exception:
+        # 事务已回滚，批量预留时从索引中移除的箱位需要重新加载
+        allocator.invalidate()
+        raise
+    return {'created': len(task_ids), 'task_ids': task_ids}
+
+
+def _apply_counter_deltas(source, *deltas):
+    total = Counter()
+    for delta in deltas:
+        total.update(delta)
+    for status, delta in total.items():
+        if delta:
+            counters.apply_delta(source, status, delta)
+
+
+def _final_slot_states(tasks, slot_before):
+    """
+    按任务编号顺序推演 TRG_Task_Complete_Update_Slot 的效果：起始箱位清空、目标箱位放入集装箱，
+    返回 {箱位编号: 集装箱编号或 None}
+    """
+    state = {slot_id: container_id for slot_id, (_block, container_id) in slot_before.items()}
+    for task in tasks:
+        state[task['from_slot_id']] = None
+        state[task['to_slot_id']] = task['container_master_id']
+    return state
+
+
+def complete_tasks(task_ids, executor=None, timestamp=None):
+    """
+    在一个事务中批量完成任务，返回 {'completed': 数量, 'skipped': 已完成或不存在的数量}
+    """
+    task_ids = sorted({int(pk) for pk in task_ids})
+    executor = _resolve_user(executor)
+    timestamp = timestamp or timezone.now()
+
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update()
+            .filter(pk__in=task_ids).exclude(status='Completed')
+            .order_by('pk')
+            .values('task_id', 'task_type', 'status', 'container_master_id', 'from_slot_id', 'to_slot_id')
+        )
+        if not tasks:
+            return {'completed': 0, 'skipped': len(task_ids)}
+        ids = [task['task_id'] for task in tasks]
+
+        # 更新前的状态：集装箱状态、涉及箱位的所属堆场区与占用情况
+        container_ids = {task['container_master_id'] for task in tasks}
+        container_before = dict(
+            ContainerMaster.objects.select_for_update().filter(pk__in=container_ids)
+            .values_list('pk', 'current_status')
+        )
+        slot_ids = {task['from_slot_id'] for task in tasks} | {task['to_slot_id'] for task in tasks}
+        slot_before = {
+            slot_id: (block_id, container_id)
+            for slot_id, block_id, container_id in YardSlot.objects.select_for_update().filter(pk__in=slot_ids)
+            .values_list('pk', 'stack_id__block_id', 'current_container_id')
+        }
+
+        # 集装箱最终状态：同一集装箱有多条任务时以编号最大的任务为准（与逐行触发顺序一致）
+        container_after = {}
+        for task in tasks:
+            new_status = CONTAINER_STATUS_AFTER.get(task['task_type'])
+            if new_status is not None:
+                container_after[task['container_master_id']] = new_status
+        slot_after = _final_slot_states(tasks, slot_before)
+        placed = [cid for cid in slot_after.values() if cid is not None]
+        if len(placed) != len(set(placed)):
+            # 逐条完成时同样会违反 UQ_Slot_Container：同一集装箱的后续任务起始箱位不是前一任务的目标箱位
+            raise BatchError('同一集装箱的多条任务箱位不连续，完成后会同时占用多个箱位')
+
+        with batch_mode():
+            for chunk in _chunks(ids):
+                Task.objects.filter(pk__in=chunk).update(
+                    status='Completed', actual_executor_id=executor, movement_timestamp=timestamp
+                )
+            ordered = sorted(container_after.items(), key=lambda item: item[1])
+            for status, group in groupby(ordered, key=lambda item: item[1]):
+                for chunk in _chunks([pk for pk, _status in group]):
+                    ContainerMaster.objects.filter(pk__in=chunk).update(current_status=status)
+            # 先清空全部涉及的箱位，再放入最终的集装箱，避免 UQ_Slot_Container 的中间冲突
+            for chunk in _chunks(sorted(slot_after)):
+                YardSlot.objects.filter(pk__in=chunk).update(current_container_id=None, slot_status='Available')
+            occupied = sorted((slot_id, cid) for slot_id, cid in slot_after.items() if cid is not None)
+            for chunk in _chunks(occupied):
+                YardSlot.objects.filter(pk__in=[slot_id for slot_id, _cid in chunk]).update(
+                    current_container_id=Case(*[When(pk=slot_id, then=Value(cid)) for slot_id, cid in chunk]),
+                    slot_status='Occupied',
+                )
+
+        # 派生数据：状态计数（按状态汇总后每个状态一条 UPDATE）、堆场利用率
+        task_delta = Counter(task['status'] for task in tasks)
+        _apply_counter_deltas('Task', {status: -n for status, n in task_delta.items()}, {'Completed': len(tasks)})
+        container_delta = Counter(
+            container_before.get(cid) for cid, status in container_after.items() if container_before.get(cid) != status
+        )
+        container_gain = Counter(
+            status for cid, status in container_after.items() if container_before.get(cid) != status
+        )
+        _apply_counter_deltas(
+            'Container_Master', {status: -n for status, n in container_delta.items()}, container_gain
+        )
+        block_delta = {}
+        for slot_id, (block_id, container_id) in slot_before.items():
+            change = (slot_after[slot_id] is not None) - (container_id is not None)
+            if change:
+                block_delta[block_id] = block_delta.get(block_id, 0) + change
+        for block_id, occupied_delta in block_delta.items():
+            yard_utilization.apply_delta(block_id, occupied=occupied_delta)
+        search_index.reindex_queryset('task', Task.objects.filter(pk__in=ids))
+
+    allocator.refresh_slots(slot_ids)
+    autocomplete.invalidate(YardSlot)
+    autocomplete.invalidate(ContainerMaster)
+    return {'completed': len(tasks), 'skipped': len(task_ids) - len(tasks)}
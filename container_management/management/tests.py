@@ -1,3 +1,500 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
+from urllib.parse import parse_qs
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import counters, dispatch, pagination, task_batch, yard_utilization
+from .admin import ExplicitSaveAdmin
+from .models import (
+    Berth,
+    Booking,
+    ContainerMaster,
+    ContainerTypeDict,
+    Party,
+    Permissions,
+    PortMaster,
+    StatusCounter,
+    Task,
+    UserPermissions,
+    Users,
+    VesselMaster,
+    VesselVisit,
+    YardBlock,
+    YardSlot,
+    YardStack,
+    YardUtilization,
+)
+from . import slot_allocator as allocator_module
+from .slot_allocator import allocator
+
+
+def create_rows(n):
+    """创建一组相互关联的记录（每个列表页各增加一行），n 用于生成唯一值"""
+    party = Party.objects.create(party_name=f'测试相关方{n}', party_type='COMPANY')
+    port = PortMaster.objects.create(port_name=f'测试港{n}', port_code=f'T{n:04d}', country='CN')
+    berth = Berth.objects.create(port_id=port, berth_name=f'泊位{n}')
+    vessel = VesselMaster.objects.create(vessel_name=f'测试船{n}', imo_number=f'{n:07d}', carrier_party_id=party)
+    visit = VesselVisit.objects.create(
+        vessel_id=vessel, port_id=port, berth_id=berth,
+        voyage_number_in=f'IN{n}', voyage_number_out=f'OUT{n}',
+    )
+    Booking.objects.create(
+        booking_number=f'BK{n}', shipper_party_id=party, consignee_party_id=party, voyage_id=visit,
+    )
+    container_type, _ = ContainerTypeDict.objects.get_or_create(
+        type_code='22G1', defaults={'nominal_size': 20, 'group_code': 'GP'}
+    )
+    container = ContainerMaster.objects.create(
+        container_number=f'TSTU{n:07d}', type_code=container_type, owner_party_id=party, current_status='InYard',
+    )
+    block = YardBlock.objects.create(block_name=f'测试区{n}', block_type='Standard')
+    stack = YardStack.objects.create(block_id=block, bay_number=1, row_number=1)
+    from_slot = YardSlot.objects.create(
+        stack_id=stack, tier_number=1, slot_coordinates=f'T{n}-1', slot_status='Occupied',
+        current_container_id=container,
+    )
+    to_slot = YardSlot.objects.create(stack_id=stack, tier_number=2, slot_coordinates=f'T{n}-2')
+    user = Users.objects.create(
+        username=f'tester{n}', email=f'tester{n}@example.com', hashed_password=b'', party_id=party,
+    )
+    permission = Permissions.objects.create(permission_name=f'TEST_{n}')
+    UserPermissions.objects.create(user_id=user, permission_id=permission)
+    Task.objects.create(
+        task_type='Move', container_master_id=container, from_slot_id=from_slot, to_slot_id=to_slot,
+        vessel_visit_id=visit, created_by_user_id=user, assigned_user_id=user,
+    )
+
+
+class ChangeListQueryCountTests(TestCase):
+    """后台列表页的查询数不随行数增长（ExplicitSaveAdmin 自动推导 select_related）"""
+
+    def setUp(self):
+        superuser = User.objects.create_superuser('admin_test', 'admin_test@example.com', 'password')
+        self.client.force_login(superuser)
+        self.admins = [
+            model_admin for model, model_admin in admin.site._registry.items()
+            if isinstance(model_admin, ExplicitSaveAdmin)
+        ]
+
+    def changelist_query_counts(self):
+        counts = {}
+        for model_admin in self.admins:
+            opts = model_admin.model._meta
+            url = f'/admin/{opts.app_label}/{opts.model_name}/'
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[url] = len(ctx.captured_queries)
+        return counts
+
+    def test_query_count_is_constant_per_page(self):
+        for n in range(2):
+            create_rows(n)
+        few_rows = self.changelist_query_counts()
+        for n in range(2, 8):
+            create_rows(n)
+        more_rows = self.changelist_query_counts()
+        self.assertEqual(few_rows, more_rows)
+
+    def test_select_related_derived_from_str(self):
+        # Berth.__str__ -> port_id.port_name；VesselVisit.__str__ -> vessel_id
+        booking_admin = admin.site._registry[Booking]
+        visit_admin = admin.site._registry[VesselVisit]
+        self.assertIn('voyage_id__vessel_id', booking_admin.get_list_select_related(None))
+        self.assertIn('berth_id__port_id', visit_admin.get_list_select_related(None))
+
+
+class KeysetPaginationTests(TestCase):
+    """后台列表的 keyset 分页：多键排序（含相同值）下翻页完整且不重复，游标无效时返回 400"""
+
+    def setUp(self):
+        superuser = User.objects.create_superuser('admin_test', 'admin_test@example.com', 'password')
+        self.client.force_login(superuser)
+        for n in range(7):
+            create_rows(n)
+        # 按 task_type 排序时有大量相同值，由主键区分先后
+        ids = list(Task.objects.order_by('pk').values_list('pk', flat=True))
+        Task.objects.filter(pk__in=ids[::3]).update(task_type='Load')
+        self.url = '/admin/management/task/'
+        self.task_admin = admin.site._registry[Task]
+        self.per_page = self.task_admin.list_per_page
+        self.task_admin.list_per_page = 3
+
+    def tearDown(self):
+        self.task_admin.list_per_page = self.per_page
+
+    def get_page(self, query):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200, query)
+        cl = response.context['cl']
+        return [task.pk for task in cl.result_list], cl.keyset_links
+
+    def test_pages_cover_ordering_with_ties(self):
+        # o=2：按 task_type 升序，ChangeList 自动追加 -pk 作为唯一的末位排序键
+        expected = list(Task.objects.order_by('task_type', '-pk').values_list('pk', flat=True))
+        seen, links = self.get_page('?o=2')
+        pages = [seen]
+        while links['next']:
+            page, links = self.get_page(links['next'])
+            pages.append(page)
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertIsNone(links['last'])
+
+        # 从末页向前翻，得到同样的分页
+        _first, links = self.get_page('?o=2')
+        backwards = []
+        page, links = self.get_page(links['last'])
+        backwards.append(page)
+        while links['prev']:
+            page, links = self.get_page(links['prev'])
+            backwards.append(page)
+        self.assertEqual([pk for page in reversed(backwards) for pk in page], expected)
+        self.assertEqual(backwards[0], expected[-len(backwards[0]):])
+
+    def test_invalid_cursor_returns_400(self):
+        _page, links = self.get_page('?o=2')
+        cursor = parse_qs(links['next'].lstrip('?'))['cursor'][0]
+        tampered = pagination.encode_cursor('next', ['Move'])
+        wrong_type = pagination.encode_cursor('next', ['Move', 'abc'])
+        for bad in ('!!garbage', cursor[:-2] + 'xx', tampered, wrong_type, pagination.encode_cursor('up', [])):
+            response = self.client.get(f'{self.url}?o=2&cursor={bad}')
+            self.assertEqual(response.status_code, 400, bad)
+
+    def test_estimated_count_fallback(self):
+        queryset = Task.objects.all()
+        self.assertEqual(pagination.estimate_count(queryset), (7, False))
+        with mock.patch.object(connection, 'vendor', 'mysql'), \
+                mock.patch.object(pagination, 'table_rows_estimate', return_value=50000), \
+                mock.patch.object(pagination, 'explain_rows_estimate', return_value=20) as explain:
+            self.assertEqual(pagination.estimate_count(queryset), (50000, True))
+            # 过滤后估算值低于阈值：精确计数
+            self.assertEqual(pagination.estimate_count(queryset.filter(task_type='Load')), (3, False))
+            explain.assert_called_once()
+            paginator = pagination.EstimatedCountPaginator(queryset.order_by('pk'), 3)
+            self.assertEqual(paginator.count, 50000)
+            self.assertTrue(paginator.estimated)
+
+
+# 任务类型 -> 完成后集装箱状态（SQL 片段），与 TRG_Task_Complete_Update_Container 一致
+_CONTAINER_STATUS_SQL = (
+    "CASE NEW.Task_Type WHEN 'Load' THEN 'OnVessel' WHEN 'Discharge' THEN 'InYard' "
+    "WHEN 'GateOut' THEN 'GateOut' WHEN 'GateIn' THEN 'InYard' END"
+)
+_OLD_CONTAINER_STATUS_SQL = (
+    "(SELECT Current_Status FROM Container_Master WHERE Container_Master_ID = NEW.Container_Master_ID)"
+)
+_SLOT_BLOCK_SQL = (
+    "(SELECT st.Block_ID FROM Yard_Slot s JOIN Yard_Stack st ON s.Stack_ID = st.Stack_ID "
+    "WHERE s.Slot_ID = NEW.{column} AND s.Current_Container_ID IS {occupied})"
+)
+# SQLite 下与 sqlutil/triggers.sql 中两个任务完成触发器等价的版本（本地开发库不安装 MySQL 触发器）
+SQLITE_COMPLETION_TRIGGERS = {
+    'TRG_Task_Complete_Update_Container': f"""
+        CREATE TRIGGER TRG_Task_Complete_Update_Container AFTER UPDATE ON Task
+        WHEN NEW.Status = 'Completed' AND OLD.Status != 'Completed'
+            AND {_CONTAINER_STATUS_SQL} IS NOT NULL
+            AND {_OLD_CONTAINER_STATUS_SQL} IS NOT {_CONTAINER_STATUS_SQL}
+        BEGIN
+            INSERT INTO Status_Counter (Source_Table, Status, Total)
+            VALUES ('Container_Master', IFNULL({_OLD_CONTAINER_STATUS_SQL}, ''), -1)
+            ON CONFLICT (Source_Table, Status) DO UPDATE SET Total = Total - 1;
+            INSERT INTO Status_Counter (Source_Table, Status, Total)
+            VALUES ('Container_Master', {_CONTAINER_STATUS_SQL}, 1)
+            ON CONFLICT (Source_Table, Status) DO UPDATE SET Total = Total + 1;
+            UPDATE Container_Master SET Current_Status = {_CONTAINER_STATUS_SQL}
+            WHERE Container_Master_ID = NEW.Container_Master_ID;
+        END""",
+    'TRG_Task_Complete_Update_Slot': f"""
+        CREATE TRIGGER TRG_Task_Complete_Update_Slot AFTER UPDATE ON Task
+        WHEN NEW.Status = 'Completed' AND OLD.Status != 'Completed'
+        BEGIN
+            UPDATE Yard_Utilization SET Occupied_Count = Occupied_Count - 1
+            WHERE NEW.From_Slot_ID IS NOT NEW.To_Slot_ID
+                AND Block_ID = {_SLOT_BLOCK_SQL.format(column='From_Slot_ID', occupied='NOT NULL')};
+            UPDATE Yard_Utilization SET Occupied_Count = Occupied_Count + 1
+            WHERE NEW.From_Slot_ID IS NOT NEW.To_Slot_ID
+                AND Block_ID = {_SLOT_BLOCK_SQL.format(column='To_Slot_ID', occupied='NULL')};
+            UPDATE Yard_Slot SET Current_Container_ID = NULL, Slot_Status = 'Available'
+            WHERE Slot_ID = NEW.From_Slot_ID;
+            UPDATE Yard_Slot SET Current_Container_ID = NEW.Container_Master_ID, Slot_Status = 'Occupied'
+            WHERE Slot_ID = NEW.To_Slot_ID;
+        END""",
+}
+
+
+def completion_trigger_sql():
+    """当前数据库上两个任务完成触发器的 CREATE TRIGGER 语句；MySQL 取自 sqlutil/triggers.sql"""
+    if connection.vendor != 'mysql':
+        return SQLITE_COMPLETION_TRIGGERS
+    return task_batch.completion_trigger_sql()
+
+
+class TaskBatchTests(TransactionTestCase):
+    """
+    complete_tasks 的结果与逐条 save() 完成（由任务完成触发器联动）一致：
+    集装箱状态、箱位占用、状态计数与堆场利用率
+    """
+
+    def setUp(self):
+        for n in range(4):
+            create_rows(n)
+        tasks = list(Task.objects.order_by('pk'))
+        self.set_task_type(tasks[1], 'Discharge')
+        container = tasks[1].container_master_id
+        container.current_status = 'OnVessel'
+        container.save()
+        self.set_task_type(tasks[2], 'Load')
+        # 跨堆场区移箱：两个堆场区的占用数各变化 1
+        tasks[3].to_slot_id = YardSlot.objects.create(
+            stack_id=tasks[0].to_slot_id.stack_id, tier_number=4, slot_coordinates='T0-4',
+        )
+        tasks[3].save()
+        # 同一集装箱的第二条任务：从第一条任务的目标箱位装船
+        first = tasks[0]
+        slot = YardSlot.objects.create(
+            stack_id=first.to_slot_id.stack_id, tier_number=3, slot_coordinates='T0-3',
+        )
+        Task.objects.create(
+            task_type='Load', container_master_id=first.container_master_id, from_slot_id=first.to_slot_id,
+            to_slot_id=slot, created_by_user_id=first.created_by_user_id,
+        )
+        self.task_ids = list(Task.objects.order_by('pk').values_list('pk', flat=True))
+
+    def tearDown(self):
+        self.drop_triggers()
+        allocator.invalidate()
+
+    @staticmethod
+    def set_task_type(task, task_type):
+        task.task_type = task_type
+        task.save()
+
+    def install_triggers(self):
+        self.drop_triggers()
+        with connection.cursor() as cursor:
+            for sql in completion_trigger_sql().values():
+                cursor.execute(sql)
+
+    def drop_triggers(self):
+        with connection.cursor() as cursor:
+            for name in SQLITE_COMPLETION_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+    def state(self):
+        return {
+            'tasks': dict(Task.objects.values_list('pk', 'status')),
+            'containers': dict(ContainerMaster.objects.values_list('pk', 'current_status')),
+            'slots': {pk: (cid, status) for pk, cid, status in YardSlot.objects.values_list('pk', 'current_container_id', 'slot_status')},
+            'counters': {
+                (source, status): total
+                for source, status, total in StatusCounter.objects.values_list('source_table', 'status', 'total')
+                if total
+            },
+            'utilization': dict(YardUtilization.objects.values_list('block_id', 'occupied_count')),
+        }
+
+    def outcome(self, complete):
+        """执行 complete 后的状态，随后回滚"""
+        with transaction.atomic():
+            complete()
+            state = self.state()
+            transaction.set_rollback(True)
+        allocator.invalidate()
+        return state
+
+    def complete_one_by_one(self):
+        for pk in self.task_ids:
+            task = Task.objects.get(pk=pk)
+            task.status = 'Completed'
+            task.save()
+
+    def test_batch_matches_row_by_row_completion(self):
+        before = self.state()
+        self.install_triggers()
+        row_by_row = self.outcome(self.complete_one_by_one)
+        if connection.vendor != 'mysql':
+            # 只有 MySQL 的触发器识别 @tos_batch_mode；其它数据库上批量完成时不能存在触发器
+            self.drop_triggers()
+        batch = self.outcome(lambda: task_batch.complete_tasks(self.task_ids))
+        self.assertNotEqual(row_by_row, before)
+        self.assertEqual(batch, row_by_row)
+
+    def test_load_requires_explicit_target(self):
+        task = Task.objects.get(pk=self.task_ids[3])
+        moves = [{'container': task.container_master_id.container_number}]
+        with self.assertRaises(task_batch.BatchError):
+            task_batch.create_plan('Load', moves, created_by=task.created_by_user_id)
+
+    def test_task_ids_recovered_per_insert(self):
+        """不返回主键的数据库（MySQL）：按 LAST_INSERT_ID() 取回编号，区间内混入其它任务时拒绝"""
+        task = Task.objects.get(pk=self.task_ids[0])
+        real_bulk_create = Task.objects.bulk_create
+        inserted = []
+
+        def bulk_create_without_pks(objs, **kwargs):
+            created = real_bulk_create(objs, **kwargs)
+            inserted.append(created[0].pk)
+            for obj in created:
+                obj.pk = None
+            return created
+
+        def make_tasks(count):
+            return [
+                Task(task_type='Move', container_master_id=task.container_master_id, from_slot_id=task.from_slot_id,
+                     to_slot_id=task.to_slot_id, created_by_user_id=task.created_by_user_id)
+                for _ in range(count)
+            ]
+
+        with mock.patch.object(Task.objects, 'bulk_create', side_effect=bulk_create_without_pks), \
+                mock.patch.object(task_batch.rawsql, 'fetch_value', side_effect=lambda *a, **k: inserted[-1]):
+            ids = task_batch._insert_tasks(make_tasks(3))
+            self.assertEqual(ids, list(range(inserted[0], inserted[0] + 3)))
+            # 编号区间中有一条不是本次写入的行
+            with mock.patch.object(task_batch.rawsql, 'fetch_value', side_effect=lambda *a, **k: inserted[-1] - 1):
+                with self.assertRaises(task_batch.BatchError):
+                    task_batch._insert_tasks([Task(
+                        task_type='Move', container_master_id=ContainerMaster.objects.exclude(pk=task.container_master_id_id).first(),
+                        from_slot_id=task.from_slot_id, to_slot_id=task.to_slot_id, created_by_user_id=task.created_by_user_id,
+                    )])
+
+
+class DispatchClaimTests(TransactionTestCase):
+    """领取事务只锁任务行：状态计数在事务提交后更新，并发领取者不在 Status_Counter 行上排队"""
+
+    def setUp(self):
+        for n in range(3):
+            create_rows(n)
+        Task.objects.update(assigned_user_id=None)
+        counters.reconcile_source('Task')
+        self.users = list(Users.objects.order_by('pk').values_list('pk', flat=True))
+
+    def task_counts(self):
+        return dict(StatusCounter.objects.filter(source_table='Task').values_list('status', 'total'))
+
+    def test_claims_interleave_outside_counter_update(self):
+        real_record = counters.record_transition
+        claimed = []
+        in_claim_transaction = []
+
+        def record_transition(*args, **kwargs):
+            in_claim_transaction.append(connection.in_atomic_block)
+            if len(in_claim_transaction) == 1:
+                # 第一位领取者更新计数时，第二位领取者完成整个领取
+                claimed.append(dispatch.claim_next(self.users[1]))
+            real_record(*args, **kwargs)
+
+        with mock.patch.object(dispatch.counters, 'record_transition', side_effect=record_transition):
+            first = dispatch.claim_next(self.users[0])
+
+        second, = claimed
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(in_claim_transaction, [False, False])
+        self.assertEqual(self.task_counts(), {'Pending': 1, 'InProgress': 2})
+        self.assertEqual(
+            dict(Task.objects.filter(status='InProgress').values_list('pk', 'assigned_user_id')),
+            {first.pk: self.users[0], second.pk: self.users[1]},
+        )
+
+
+class SlotReservationTests(TestCase):
+    """分配接口的预留没有任务引用时按 RESERVATION_TTL 过期归还，有未完成任务引用的预留保留"""
+
+    def setUp(self):
+        for n in range(2):
+            create_rows(n)
+        allocator.invalidate()
+
+    def tearDown(self):
+        allocator.invalidate()
+
+    def test_expired_orphan_reservations_are_released(self):
+        orphan = allocator.reserve(('Standard',))['slot_id']
+        referenced = allocator.reserve(('Standard',))['slot_id']
+        task = Task.objects.order_by('pk').first()
+        Task.objects.filter(pk=task.pk).update(to_slot_id=referenced)
+        self.assertEqual(allocator.release_expired(), 0)
+
+        expired = timezone.now() - datetime.timedelta(seconds=allocator_module.RESERVATION_TTL + 1)
+        YardSlot.objects.filter(pk__in=[orphan, referenced]).update(reserved_at=expired)
+        # 手工预留（Reserved_At 为空）不自动归还
+        manual = YardSlot.objects.create(
+            stack_id=task.from_slot_id.stack_id, tier_number=5, slot_coordinates='M-5', slot_status='Reserved',
+        )
+
+        self.assertEqual(allocator.release_expired(), 1)
+        self.assertEqual(
+            dict(YardSlot.objects.filter(pk__in=[orphan, referenced, manual.pk]).values_list('pk', 'slot_status')),
+            {orphan: 'Available', referenced: 'Reserved', manual.pk: 'Reserved'},
+        )
+        # 归还的箱位在下次加载时回到可用索引
+        allocator.ensure_loaded()
+        self.assertIn(orphan, allocator.slots)
+
+
+VIEWS_FILE = settings.BASE_DIR.parent / 'sqlutil' / 'views.sql'
+
+
+def view_sql(name):
+    """sqlutil/views.sql 中某个视图的 CREATE VIEW 语句（SQLite 不支持 OR REPLACE）"""
+    text = VIEWS_FILE.read_text(encoding='utf-8')
+    start = text.index(f'CREATE OR REPLACE VIEW `{name}`')
+    statement = text[start:text.index(';', start)]
+    if connection.vendor != 'mysql':
+        statement = statement.replace('CREATE OR REPLACE VIEW', 'CREATE VIEW', 1)
+    return statement
+
+
+class YardUtilizationTotalsTests(TransactionTestCase):
+    """仪表盘的堆场总体利用率与原 View_Yard_Utilization 上的汇总查询一致"""
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP VIEW IF EXISTS View_Yard_Utilization')
+            cursor.execute(view_sql('View_Yard_Utilization'))
+        party = Party.objects.create(party_name='利用率测试', party_type='COMPANY')
+        container_type = ContainerTypeDict.objects.create(type_code='22G1', nominal_size=20, group_code='GP')
+        # 各区占用 0/1、2/3、2/3：按区舍入后平均为 44.45，未舍入直接平均为 44.44；空区利用率为 NULL
+        for n, (slots, occupied) in enumerate([(1, 0), (3, 2), (3, 2), (0, 0)]):
+            block = YardBlock.objects.create(block_name=f'利用率区{n}', block_type='Standard')
+            if not slots:
+                continue
+            stack = YardStack.objects.create(block_id=block, bay_number=1, row_number=1)
+            for tier in range(1, slots + 1):
+                container = None
+                if tier <= occupied:
+                    container = ContainerMaster.objects.create(
+                        container_number=f'UTLU{n}{tier:06d}', type_code=container_type,
+                        owner_party_id=party, current_status='InYard',
+                    )
+                YardSlot.objects.create(
+                    stack_id=stack, tier_number=tier, slot_coordinates=f'U{n}-{tier}',
+                    slot_status='Occupied' if container else 'Available', current_container_id=container,
+                )
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP VIEW IF EXISTS View_Yard_Utilization')
+
+    def test_totals_match_view(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT SUM(箱位总数), SUM(已占用箱位数), ROUND(AVG(利用率_百分比), 2)
+                FROM View_Yard_Utilization
+            """)
+            total, occupied, percent = cursor.fetchone()
+
+        totals = yard_utilization.get_totals()
+        self.assertEqual(totals, {'总箱位数': int(total), '已占用': int(occupied), '利用率': float(percent)})
+        self.assertEqual(totals['利用率'], 44.45)
+        # 逐区利用率同样与视图一致
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 堆场区编号, 利用率_百分比 FROM View_Yard_Utilization')
+            expected = {block_id: None if value is None else float(value) for block_id, value in cursor.fetchall()}
+        self.assertEqual({row['堆场区编号']: row['利用率_百分比'] for row in yard_utilization.view_rows()}, expected)
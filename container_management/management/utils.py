@@ -4,8 +4,8 @@
 from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.db import connection
-from .models import Users, Permissions, UserPermissions
+from . import permission_cache
+from .models import Users
 
 
 def get_user_permissions(user_id):
@@ -17,35 +17,23 @@ def get_user_permissions(user_id):
 
 def has_permission(user_id, permission_name):
     """
-    检查用户是否拥有指定权限
+    检查用户是否拥有指定权限（读取权限缓存，命中时不查询数据库）
     """
-    permissions = get_user_permission_names(user_id)
-    return permission_name in permissions
+    try:
+        return permission_name in permission_cache.get_permissions(user_id)
+    except Exception:
+        return False
 
 
 def get_user_permission_names(user_id):
     """
-    获取用户权限名称列表（优化版本，使用视图）
+    获取用户权限名称列表（按名称排序，来自权限缓存）
+    返回新的列表，调用方可以自由追加（如超级用户追加 'ADMIN'）
     """
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT 权限列表
-                FROM View_User_Permissions
-                WHERE 用户编号 = %s
-            """, [user_id])
-            row = cursor.fetchone()
-            if row and row[0]:
-                return [p.strip() for p in row[0].split(',')]
-            return []
+        return sorted(permission_cache.get_permissions(user_id))
     except Exception:
-        # 如果视图不存在，使用表查询
-        try:
-            user = Users.objects.get(user_id=user_id)
-            permissions = UserPermissions.objects.filter(user_id=user)
-            return [up.permission_id.permission_name for up in permissions]
-        except Exception:
-            return []
+        return []
 
 
 def require_permission(permission_name):
@@ -104,33 +92,8 @@ def get_user_role(user_id, django_user=None):
     if not user_id:
         return 'guest'
     
-    # 优先核查数据库中是否直接分配了权限 ID = 9（视作 viewer）
+    # 角色在权限缓存中随权限集合一起计算（权限 ID = 9 视作 viewer，其余按名称判断）
     try:
-        if UserPermissions.objects.filter(user_id_id=user_id, permission_id_id=9).exists():
-            return 'viewer'
+        return permission_cache.get_role(user_id)
     except Exception:
-        # 查询失败则继续按名称判断
-        pass
-
-    permissions = get_user_permission_names(user_id)
-    
-    # Normalize permission names to uppercase for robust matching
-    try:
-        perm_set = {p.strip().upper() for p in permissions if p}
-    except Exception:
-        perm_set = set()
-
-    if 'ADMIN' in perm_set:
-        return 'admin'
-
-    # Accept both explicit operator permission names and a generic 'OPERATOR' entry
-    operator_keys = {'CREATE_TASK', 'UPDATE_TASK', 'OPERATOR'}
-    if perm_set.intersection(operator_keys):
-        return 'operator'
-
-    viewer_keys = {'VIEW_INVENTORY', 'VIEW_STATISTICS', 'VIEW'}
-    if perm_set.intersection(viewer_keys):
-        return 'viewer'
-
-    return 'guest'
-
+        return 'guest'
@@ -1,14 +1,15 @@
+import json
+
+from django.contrib import admin
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Q
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
 
-from .models import (
-    Booking,
-    ContainerMaster,
-    Party,
-    Task,
-    VesselVisit,
-)
+from . import dispatch, export, search_index, task_batch
+from .autocomplete import CachedAutocompleteJsonView
+from .models import ContainerMaster
+from .slot_allocator import RESERVATION_TTL, NoSlotAvailable, allocator, block_types_for
 
 
 @login_required
@@ -21,56 +22,13 @@ def aggregate_search(request):
 
     containers = bookings = tasks = visits = parties = []
     if query:
-        containers = (
-            ContainerMaster.objects.select_related('type_code', 'owner_party_id')
-            .filter(
-                Q(container_number__icontains=query)
-                | Q(type_code__type_code__icontains=query)
-                | Q(owner_party_id__party_name__icontains=query)
-            )
-            .order_by('-container_master_id')[:10]
-        )
-
-        bookings = (
-            Booking.objects.select_related('voyage_id', 'shipper_party_id', 'consignee_party_id')
-            .filter(
-                Q(booking_number__icontains=query)
-                | Q(status__icontains=query)
-                | Q(shipper_party_id__party_name__icontains=query)
-                | Q(consignee_party_id__party_name__icontains=query)
-            )
-            .order_by('-booking_id')[:10]
-        )
-
-        tasks = (
-            Task.objects.select_related('container_master_id', 'vessel_visit_id')
-            .filter(
-                Q(container_master_id__container_number__icontains=query)
-                | Q(task_type__icontains=query)
-                | Q(status__icontains=query)
-            )
-            .order_by('-task_id')[:10]
-        )
-
-        visits = (
-            VesselVisit.objects.select_related('vessel_id', 'port_id')
-            .filter(
-                Q(vessel_id__vessel_name__icontains=query)
-                | Q(voyage_number_in__icontains=query)
-                | Q(voyage_number_out__icontains=query)
-                | Q(port_id__port_name__icontains=query)
-            )
-            .order_by('-ata', '-vessel_visit_id')[:10]
-        )
-
-        parties = (
-            Party.objects.filter(
-                Q(party_name__icontains=query)
-                | Q(contact_person__icontains=query)
-                | Q(scac_code__icontains=query)
-            )
-            .order_by('-party_id')[:10]
-        )
+        # 一次查询 Search_Index 得到按相关度排序的命中，再按主键取回各类对象
+        results = search_index.search(query, limit_per_type=10)
+        containers = results['container']
+        bookings = results['booking']
+        tasks = results['task']
+        visits = results['visit']
+        parties = results['party']
 
     context = {
         'query': query,
@@ -81,3 +39,166 @@ def aggregate_search(request):
         'parties': parties,
     }
     return render(request, 'management/aggregate_search.html', context)
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(['GET', 'POST'])
+def allocate_slot(request):
+    """
+    箱位分配接口（JSON）：
+    - GET  ?container_id= 或 ?type_code=：返回最优可用箱位（不预留）
+    - POST container_id= 或 type_code=：原子地预留最优箱位（Slot_Status = 'Reserved'）；
+      expires_in 秒内没有未完成任务以该箱位为目标时，预留被自动归还
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    container_id = params.get('container_id')
+    type_code = params.get('type_code')
+    if container_id:
+        type_code = ContainerMaster.objects.filter(pk=container_id).values_list('type_code', flat=True).first()
+        if type_code is None:
+            return JsonResponse({'ok': False, 'error': '集装箱不存在'}, status=404)
+    block_types = block_types_for(type_code=type_code)
+
+    if request.method == 'GET':
+        slot = allocator.best(block_types)
+        if slot is None:
+            return JsonResponse({'ok': False, 'error': '没有可用箱位', 'block_types': block_types}, status=404)
+        return JsonResponse({'ok': True, 'reserved': False, 'slot': slot, 'block_types': block_types})
+
+    if request.session.get('user_role') == 'viewer':
+        return JsonResponse({'ok': False, 'error': '无操作权限：您没有执行该操作的权限。'}, status=403)
+    try:
+        slot = allocator.reserve(block_types)
+    except NoSlotAvailable as exc:
+        return JsonResponse({'ok': False, 'error': str(exc), 'block_types': block_types}, status=409)
+    return JsonResponse({
+        'ok': True, 'reserved': True, 'slot': slot, 'block_types': block_types, 'expires_in': RESERVATION_TTL,
+    })
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(['POST'])
+def batch_create_tasks(request):
+    """
+    批量创建计划任务（JSON）：
+    POST {"task_type": "Load", "vessel_visit": 编号, "assigned_user": 用户, "moves": [{"container": 箱号, ...}]}
+    创建人取当前登录用户；见 task_batch.create_plan
+    """
+    if request.session.get('user_role') == 'viewer':
+        return JsonResponse({'ok': False, 'error': '无操作权限：您没有执行该操作的权限。'}, status=403)
+    if not request.session.get('user_id'):
+        return JsonResponse({'ok': False, 'error': '当前登录用户未关联业务用户，无法作为任务创建人'}, status=400)
+    data = _json_body(request)
+    if not isinstance(data, dict):
+        return JsonResponse({'ok': False, 'error': '请求体不是有效的 JSON 对象'}, status=400)
+    try:
+        result = task_batch.create_plan(
+            data.get('task_type'),
+            data.get('moves') or [],
+            created_by=request.session['user_id'],
+            vessel_visit=data.get('vessel_visit'),
+            assigned_user=data.get('assigned_user'),
+        )
+    except task_batch.BatchError as exc:
+        errors = [{'index': index, 'error': message} for index, message in exc.errors]
+        return JsonResponse({'ok': False, 'error': str(exc), 'errors': errors}, status=400)
+    except NoSlotAvailable as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=409)
+    return JsonResponse({'ok': True, **result})
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(['POST'])
+def batch_complete_tasks(request):
+    """
+    批量完成任务（JSON）：POST {"task_ids": [...]}；实际执行人取当前登录用户
+    """
+    if request.session.get('user_role') == 'viewer':
+        return JsonResponse({'ok': False, 'error': '无操作权限：您没有执行该操作的权限。'}, status=403)
+    data = _json_body(request)
+    task_ids = data.get('task_ids') if isinstance(data, dict) else None
+    if not isinstance(task_ids, list) or not all(str(pk).isdigit() for pk in task_ids):
+        return JsonResponse({'ok': False, 'error': 'task_ids 须为任务编号列表'}, status=400)
+    result = task_batch.complete_tasks(task_ids, executor=request.session.get('user_id'))
+    return JsonResponse({'ok': True, **result})
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+@require_http_methods(['GET', 'POST'])
+def claim_task(request):
+    """
+    任务派发（JSON），队列由 block_id=（堆场区）与 task_type=（可重复）划分：
+    - GET：返回队列中各任务类型的待领取数
+    - POST：为当前操作员领取队首任务（InProgress 并指派），队列为空时返回 404
+    - POST release=任务编号：放弃已领取的任务
+    """
+    params = request.POST if request.method == 'POST' else request.GET
+    try:
+        block_id = int(params['block_id']) if params.get('block_id') else None
+    except ValueError:
+        return JsonResponse({'ok': False, 'error': 'block_id 须为数字'}, status=400)
+    task_types = params.getlist('task_type')
+    unknown = [t for t in task_types if t not in task_batch.TASK_TYPES]
+    if unknown:
+        return JsonResponse({'ok': False, 'error': f'未知任务类型: {", ".join(unknown)}'}, status=400)
+
+    if request.method == 'GET':
+        return JsonResponse({'ok': True, 'queue': dispatch.queue_depths(block_id, task_types)})
+
+    if request.session.get('user_role') == 'viewer':
+        return JsonResponse({'ok': False, 'error': '无操作权限：您没有执行该操作的权限。'}, status=403)
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return JsonResponse({'ok': False, 'error': '当前登录用户未关联业务用户，无法领取任务'}, status=400)
+    if params.get('release'):
+        try:
+            release_id = int(params['release'])
+        except ValueError:
+            return JsonResponse({'ok': False, 'error': 'release 须为任务编号'}, status=400)
+        released = dispatch.release(release_id, user_id)
+        return JsonResponse({'ok': released}, status=200 if released else 409)
+
+    task = dispatch.claim_next(user_id, block_id, task_types)
+    if task is None:
+        return JsonResponse({'ok': False, 'error': '队列中没有待领取的任务'}, status=404)
+    return JsonResponse({
+        'ok': True,
+        'task': {
+            'task_id': task.task_id,
+            'task_type': task.task_type,
+            'priority': task.priority,
+            'container_number': task.container_master_id.container_number,
+            'from_slot_id': task.from_slot_id_id,
+            'to_slot_id': task.to_slot_id_id,
+        },
+    })
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def export_db_view(request, view_name):
+    """导出 sqlutil/views.sql 中的数据库视图（?format=csv|xlsx），见 export.py"""
+    if view_name not in export.EXPORTABLE_VIEWS:
+        raise Http404('未登记的数据库视图')
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.EXPORT_FORMATS:
+        return HttpResponseBadRequest(f'不支持的导出格式: {fmt}')
+    return export.export_response(export.view_rows(view_name), view_name, fmt)
+
+
+def admin_autocomplete(request):
+    """
+    替换 admin 默认的 /admin/autocomplete/：不计数、按字段附加候选条件、缓存结果（见 autocomplete.py）
+    """
+    return CachedAutocompleteJsonView.as_view(admin_site=admin.site)(request)
@@ -0,0 +1,109 @@
+"""
+堆场利用率快照
+
+Yard_Utilization 表按堆场区保存堆栈数、箱位数与已占用箱位数，增量维护点：
+- 箱位/堆栈/堆场区的模型保存与删除：signals.py
+- 任务完成时的箱位联动：TRG_Task_Complete_Update_Slot 触发器
+- 批量 SQL 等其它路径：refresh_yard_utilization 命令全量重建
+
+仪表盘与 fetch_view_sample('View_Yard_Utilization') 均从此表读取，
+读取代价与堆场区数量成正比，与箱位数量无关。
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import YardBlock, YardSlot, YardStack, YardUtilization, decimal_round
+
+
+def apply_delta(block_id, stacks=0, slots=0, occupied=0, create_missing=True):
+    """
+    对某个堆场区的计数做增量调整；若该堆场区尚无快照行则直接全量计算该区。
+    删除路径传 create_missing=False，避免级联删除堆场区时重新插入快照行。
+    """
+    if block_id is None or not (stacks or slots or occupied):
+        return
+    updated = YardUtilization.objects.filter(block_id=block_id).update(
+        stack_count=F('stack_count') + stacks,
+        slot_count=F('slot_count') + slots,
+        occupied_count=F('occupied_count') + occupied,
+    )
+    if not updated and create_missing:
+        refresh([block_id])
+
+
+def refresh(block_ids=None):
+    """
+    从 Yard_Block / Yard_Stack / Yard_Slot 重新统计利用率并覆盖快照，
+    block_ids 为空时重建全部堆场区，返回重建的堆场区数量
+    """
+    blocks = YardBlock.objects.all()
+    stacks = YardStack.objects.all()
+    slots = YardSlot.objects.all()
+    if block_ids is not None:
+        blocks = blocks.filter(block_id__in=block_ids)
+        stacks = stacks.filter(block_id__in=block_ids)
+        slots = slots.filter(stack_id__block_id__in=block_ids)
+
+    stack_totals = dict(
+        stacks.values('block_id').annotate(total=Count('pk')).order_by().values_list('block_id', 'total')
+    )
+    slot_totals = {
+        row['stack_id__block_id']: row
+        for row in slots.values('stack_id__block_id')
+        .annotate(total=Count('pk'), occupied=Count('current_container_id'))
+        .order_by()
+    }
+
+    block_id_list = list(blocks.values_list('block_id', flat=True))
+    rows = []
+    for block_id in block_id_list:
+        slot_row = slot_totals.get(block_id, {})
+        rows.append(YardUtilization(
+            block_id_id=block_id,
+            stack_count=stack_totals.get(block_id, 0),
+            slot_count=slot_row.get('total', 0),
+            occupied_count=slot_row.get('occupied', 0),
+        ))
+
+    with transaction.atomic():
+        stale = YardUtilization.objects.all()
+        if block_ids is not None:
+            stale = stale.filter(block_id__in=block_ids)
+        stale.delete()
+        YardUtilization.objects.bulk_create(rows)
+    return len(rows)
+
+
+def view_rows():
+    """
+    以 View_Yard_Utilization 相同的列名返回每个堆场区一行
+    """
+    rows = []
+    for item in YardUtilization.objects.select_related('block_id').order_by('block_id'):
+        rows.append({
+            '堆场区编号': item.block_id_id,
+            '堆场区名称': item.block_id.block_name,
+            '堆场区类型': item.block_id.block_type,
+            '堆栈总数': item.stack_count,
+            '箱位总数': item.slot_count,
+            '已占用箱位数': item.occupied_count,
+            '空闲箱位数': item.free_count,
+            '利用率_百分比': item.utilization_percent,
+        })
+    return rows
+
+
+def get_totals():
+    """
+    堆场总体利用率，口径与原 View_Yard_Utilization 上的
+    SUM(箱位总数) / SUM(已占用箱位数) / ROUND(AVG(利用率_百分比), 2) 一致：
+    对各堆场区已舍入到 2 位的利用率求平均（无箱位的堆场区为 NULL，不参与平均），
+    AVG 结果保留 6 位后再舍入到 2 位
+    """
+    items = list(YardUtilization.objects.only('slot_count', 'occupied_count'))
+    percents = [item.utilization_percent_decimal for item in items if item.slot_count]
+    return {
+        '总箱位数': sum(item.slot_count for item in items),
+        '已占用': sum(item.occupied_count for item in items),
+        '利用率': float(decimal_round(sum(percents) / len(percents), 6, 2)) if percents else 0,
+    }
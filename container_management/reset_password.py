@@ -13,6 +13,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'container_management.settings')
 django.setup()
 
 from django.contrib.auth.models import User
+from management import permission_cache
 
 def reset_password(username, new_password):
     """重置用户密码"""
@@ -20,6 +21,7 @@ def reset_password(username, new_password):
         user = User.objects.get(username=username)
         user.set_password(new_password)
         user.save()
+        permission_cache.invalidate_username(username)
         print(f'✅ 用户 "{username}" 的密码已成功重置！')
         print(f'   新密码: {new_password}')
         return True
@@ -95,6 +97,7 @@ def create_superuser(username, email, password):
                         is_active=True
                     )
                 print(f'✅ 用户 "{username}" 已同步到Users表')
+            permission_cache.invalidate_username(username)
         except Exception as sync_error:
             print(f'⚠️  同步到Users表时出错：{str(sync_error)}')
             print('   您可以稍后使用 sync_user.py 工具手动同步')
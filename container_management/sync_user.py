@@ -14,7 +14,8 @@ django.setup()
 
 from django.contrib.auth.models import User
 from management.models import Users, Party
-from django.db import transaction
+from management import autocomplete, permission_cache
+from django.db import IntegrityError, transaction
 
 def sync_user_to_db(django_username):
     """将Django用户同步到数据库Users表"""
@@ -29,6 +30,7 @@ def sync_user_to_db(django_username):
             print(f'   用户ID: {db_user.user_id}')
             print(f'   全名: {db_user.full_name or "未设置"}')
             print(f'   邮箱: {db_user.email}')
+            permission_cache.invalidate_user(db_user.user_id)
             return db_user
         
         # 创建Users表记录
@@ -60,6 +62,7 @@ def sync_user_to_db(django_username):
                 hashed_password=b'',  # 不存储密码，使用Django认证
                 is_active=django_user.is_active
             )
+        permission_cache.invalidate_user(db_user.user_id)
         
         print(f'✅ 成功在Users表中创建用户记录')
         print(f'   用户ID: {db_user.user_id}')
@@ -84,37 +87,107 @@ def sync_user_to_db(django_username):
         traceback.print_exc()
         return None
 
-def sync_all_users():
-    """同步所有Django用户到Users表"""
-    django_users = User.objects.all()
+def resolve_free_email(username, email, taken_emails):
+    """
+    在内存中为新用户挑选未被占用的邮箱（规则与 sync_user_to_db 一致），并登记到 taken_emails。
+    taken_emails 保存小写邮箱：MySQL 唯一索引的排序规则不区分大小写
+    """
+    email = email or f'{username}@example.com'
+    if email.lower() in taken_emails:
+        counter = 1
+        candidate = f'{username}{counter}@example.com'
+        while candidate.lower() in taken_emails:
+            counter += 1
+            candidate = f'{username}{counter}@example.com'
+        email = candidate
+    taken_emails.add(email.lower())
+    return email
+
+def sync_all_users(dry_run=False, batch_size=500):
+    """
+    同步所有Django用户到Users表（集合方式）
+    一次读取已有的用户名和邮箱，在内存中解决邮箱冲突，
+    再按批次在事务中 bulk_create 缺失的记录；dry_run=True 时只打印差异不写库。
+    用户名、邮箱按小写比较（与 MySQL 唯一索引不区分大小写的排序规则一致）；
+    某批写入违反唯一约束时逐行重试，只有冲突的用户记为失败
+    """
+    django_users = list(
+        User.objects.order_by('id').values_list('username', 'email', 'first_name', 'last_name', 'is_active')
+    )
     if not django_users:
         print('没有Django用户需要同步')
         return
     
-    print(f'找到 {django_users.count()} 个Django用户，开始同步...\n')
+    print(f'找到 {len(django_users)} 个Django用户，开始同步{"（dry-run，不写入数据库）" if dry_run else ""}...\n')
     
-    success_count = 0
-    skip_count = 0
-    error_count = 0
+    existing_usernames = {name.lower() for name in Users.objects.values_list('username', flat=True)}
+    taken_emails = {email.lower() for email in Users.objects.values_list('email', flat=True)}
     
-    for django_user in django_users:
-        print(f'\n处理用户: {django_user.username}')
-        if Users.objects.filter(username=django_user.username).exists():
-            print(f'  ⏭️  已存在，跳过')
+    to_create = []
+    renamed = []
+    skip_count = 0
+    for username, email, first_name, last_name, is_active in django_users:
+        if username.lower() in existing_usernames:
             skip_count += 1
-        else:
-            result = sync_user_to_db(django_user.username)
-            if result:
-                success_count += 1
-            else:
-                error_count += 1
+            continue
+        existing_usernames.add(username.lower())
+        free_email = resolve_free_email(username, email, taken_emails)
+        if free_email != (email or f'{username}@example.com'):
+            renamed.append((username, email or f'{username}@example.com', free_email))
+        full_name = f'{first_name} {last_name}'.strip() or username
+        to_create.append(Users(
+            username=username,
+            email=free_email,
+            full_name=full_name,
+            hashed_password=b'',  # 不存储密码，使用Django认证
+            is_active=is_active
+        ))
+    
+    for username, original_email, free_email in renamed:
+        print(f'  ⚠️  {username}: 邮箱 {original_email} 已存在，使用: {free_email}')
+    
+    success_count = 0
+    error_count = 0
+    if not dry_run:
+        for start in range(0, len(to_create), batch_size):
+            batch = to_create[start:start + batch_size]
+            try:
+                with transaction.atomic():
+                    Users.objects.bulk_create(batch, batch_size=batch_size)
+                success_count += len(batch)
+            except IntegrityError as e:
+                print(f'⚠️  第 {start // batch_size + 1} 批（{len(batch)} 个用户）违反唯一约束，逐个重试：{str(e)}')
+                for db_user in batch:
+                    try:
+                        with transaction.atomic():
+                            db_user.save(force_insert=True)
+                        success_count += 1
+                    except IntegrityError as row_error:
+                        error_count += 1
+                        print(f'❌ 用户 {db_user.username} 写入失败：{str(row_error)}')
+            except Exception as e:
+                error_count += len(batch)
+                print(f'❌ 第 {start // batch_size + 1} 批（{len(batch)} 个用户）写入失败：{str(e)}')
+        if success_count:
+            # bulk_create 不经过模型信号，手动使用户自动补全缓存失效
+            autocomplete.invalidate(Users)
     
     print(f'\n' + '='*60)
-    print(f'同步完成！')
-    print(f'  成功: {success_count}')
-    print(f'  跳过: {skip_count}')
-    print(f'  失败: {error_count}')
+    print(f'同步完成！' if not dry_run else 'dry-run 差异：')
+    print(f'  待创建: {len(to_create)}')
+    print(f'  邮箱改名: {len(renamed)}')
+    print(f'  跳过(已存在): {skip_count}')
+    if not dry_run:
+        print(f'  成功: {success_count}')
+        print(f'  失败: {error_count}')
     print('='*60)
+    return {
+        'to_create': len(to_create),
+        'renamed': len(renamed),
+        'skipped': skip_count,
+        'created': success_count,
+        'failed': error_count,
+    }
 
 def create_user_with_sync(username, email, password, full_name=None, is_superuser=False):
     """创建Django用户并同步到Users表"""
@@ -149,6 +222,7 @@ def create_user_with_sync(username, email, password, full_name=None, is_superuse
         if db_user and full_name:
             db_user.full_name = full_name
             db_user.save()
+            permission_cache.invalidate_user(db_user.user_id)
         
         return django_user, db_user
         
@@ -167,12 +241,13 @@ if __name__ == '__main__':
         print('  1. 同步单个用户:')
         print('     python sync_user.py sync <用户名>')
         print('\n  2. 同步所有Django用户:')
-        print('     python sync_user.py sync-all')
+        print('     python sync_user.py sync-all [--dry-run]')
         print('\n  3. 创建用户并同步（推荐）:')
         print('     python sync_user.py create <用户名> <邮箱> <密码> [全名] [--superuser]')
         print('\n示例：')
         print('  python sync_user.py sync admin')
         print('  python sync_user.py sync-all')
+        print('  python sync_user.py sync-all --dry-run')
         print('  python sync_user.py create admin admin@example.com password123 "系统管理员" --superuser')
         print('=' * 60)
         sys.exit(1)
@@ -188,7 +263,7 @@ if __name__ == '__main__':
         sync_user_to_db(username)
     
     elif command == 'sync-all':
-        sync_all_users()
+        sync_all_users(dry_run='--dry-run' in sys.argv)
     
     elif command == 'create':
         if len(sys.argv) < 5:
@@ -160,12 +160,14 @@ CREATE TABLE `Yard_Slot` (
     `Slot_Coordinates` VARCHAR(50) NOT NULL COMMENT '坐标',
     `Slot_Status` VARCHAR(20) NOT NULL DEFAULT 'Available' COMMENT '状态',
     `Current_Container_ID` INT NULL COMMENT '当前集装箱编号',
+    `Reserved_At` DATETIME(6) NULL COMMENT '预留时间 (箱位分配器预留, 超时未被任务引用时归还)',
     PRIMARY KEY (`Slot_ID`),
     UNIQUE INDEX `UQ_Slot_Coordinates` (`Slot_Coordinates`),
     UNIQUE INDEX `UQ_Stack_Tier` (`Stack_ID`, `Tier_Number`),
     UNIQUE INDEX `UQ_Slot_Container` (`Current_Container_ID`),
     CONSTRAINT `FK_Slot_belongs_to_Stack` FOREIGN KEY (`Stack_ID`) REFERENCES `Yard_Stack`(`Stack_ID`),
-    CONSTRAINT `FK_Slot_occupied_by_Container` FOREIGN KEY (`Current_Container_ID`) REFERENCES `Container_Master`(`Container_Master_ID`)
+    CONSTRAINT `FK_Slot_occupied_by_Container` FOREIGN KEY (`Current_Container_ID`) REFERENCES `Container_Master`(`Container_Master_ID`),
+    INDEX `IX_Slot_Status` (`Slot_Status`)
 ) ENGINE=InnoDB COMMENT='箱位';
 
 /* * 表: Vessel_Visit * 描述:  船舶的单次挂靠, 核心枢纽 */
@@ -183,7 +185,9 @@ CREATE TABLE `Vessel_Visit` (
     CONSTRAINT `FK_Visit_is_for_Vessel` FOREIGN KEY (`Vessel_ID`) REFERENCES `Vessel_Master`(`Vessel_ID`),
     CONSTRAINT `FK_Visit_is_at_Port` FOREIGN KEY (`Port_ID`) REFERENCES `Port_Master`(`Port_ID`),
     CONSTRAINT `FK_Visit_at_Berth` FOREIGN KEY (`Berth_ID`) REFERENCES `Berth`(`Berth_ID`),
-    CONSTRAINT `CHK_Visit_Time_Logic` CHECK (`ATD` >= `ATA` OR `ATD` IS NULL)
+    CONSTRAINT `CHK_Visit_Time_Logic` CHECK (`ATD` >= `ATA` OR `ATD` IS NULL),
+    INDEX `IX_Visit_Status` (`Status`),
+    INDEX `IX_Visit_ATA` (`ATA`)
 ) ENGINE=InnoDB COMMENT='船舶访问';
 
 
@@ -231,7 +235,12 @@ CREATE TABLE `Task` (
     CONSTRAINT `FK_Task_related_to_Visit` FOREIGN KEY (`Vessel_Visit_ID`) REFERENCES `Vessel_Visit`(`Vessel_Visit_ID`),
     CONSTRAINT `FK_Task_created_by_User` FOREIGN KEY (`Created_By_User_ID`) REFERENCES `Users`(`User_ID`),
     CONSTRAINT `FK_Task_assigned_to_User` FOREIGN KEY (`Assigned_User_ID`) REFERENCES `Users`(`User_ID`),
-    CONSTRAINT `FK_Task_executed_by_User` FOREIGN KEY (`Actual_Executor_ID`) REFERENCES `Users`(`User_ID`)
+    CONSTRAINT `FK_Task_executed_by_User` FOREIGN KEY (`Actual_Executor_ID`) REFERENCES `Users`(`User_ID`),
+    INDEX `IX_Task_Assigned_Status` (`Assigned_User_ID`, `Status`, `Priority`),
+    INDEX `IX_Task_Executor_Status` (`Actual_Executor_ID`, `Status`),
+    INDEX `IX_Task_Status_Priority` (`Status`, `Priority`),
+    INDEX `IX_Task_Type` (`Task_Type`),
+    INDEX `IX_Task_Queue` (`Status`, `Task_Type`, `Priority`)
 ) ENGINE=InnoDB COMMENT='作业任务 (计划与执行)';
 /*
  * =========================================
@@ -270,3 +279,85 @@ JOIN `Yard_Block` yb ON ys.Block_ID = yb.Block_ID
 LEFT JOIN `Party` p ON cm.Owner_Party_ID = p.Party_ID
 WHERE slot.Current_Container_ID IS NOT NULL;
 
+/*
+ * =========================================
+ * 组 6: 派生汇总表 (由应用信号与触发器增量维护)
+ * =========================================
+ */
+
+/* * 表: Status_Counter * 描述:  各业务表按状态的记录数, 替代全表 COUNT(*) GROUP BY */
+CREATE TABLE `Status_Counter` (
+    `Counter_ID` INT NOT NULL AUTO_INCREMENT COMMENT '计数编号',
+    `Source_Table` VARCHAR(50) NOT NULL COMMENT '来源表 (Task, Container_Master, Vessel_Visit)',
+    `Status` VARCHAR(20) NOT NULL DEFAULT '' COMMENT '状态 (空字符串表示 NULL)',
+    `Total` BIGINT NOT NULL DEFAULT 0 COMMENT '数量',
+    PRIMARY KEY (`Counter_ID`),
+    UNIQUE INDEX `UQ_Counter_Source_Status` (`Source_Table`, `Status`)
+) ENGINE=InnoDB COMMENT='状态计数';
+
+/* * 表: Yard_Utilization * 描述:  按堆场区物化的利用率快照, 替代 View_Yard_Utilization 的全表聚合 */
+CREATE TABLE `Yard_Utilization` (
+    `Block_ID` INT NOT NULL COMMENT '堆场区编号',
+    `Stack_Count` INT NOT NULL DEFAULT 0 COMMENT '堆栈总数',
+    `Slot_Count` INT NOT NULL DEFAULT 0 COMMENT '箱位总数',
+    `Occupied_Count` INT NOT NULL DEFAULT 0 COMMENT '已占用箱位数',
+    `Updated_At` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (`Block_ID`),
+    CONSTRAINT `FK_Utilization_of_Block` FOREIGN KEY (`Block_ID`) REFERENCES `Yard_Block`(`Block_ID`) ON DELETE CASCADE
+) ENGINE=InnoDB COMMENT='堆场利用率';
+
+/* * 表: Search_Index * 描述:  聚合搜索索引, Content 汇总箱号/订舱号/航次号/船名/相关方名称/SCAC 等关键字 */
+CREATE TABLE `Search_Index` (
+    `Entry_ID` INT NOT NULL AUTO_INCREMENT COMMENT '索引编号',
+    `Object_Type` VARCHAR(20) NOT NULL COMMENT '对象类型 (container, booking, task, visit, party)',
+    `Object_ID` INT NOT NULL COMMENT '对象编号',
+    `Search_Key` VARCHAR(255) NOT NULL COMMENT '主标识 (箱号、订舱号等)',
+    `Content` LONGTEXT NOT NULL COMMENT '索引内容',
+    PRIMARY KEY (`Entry_ID`),
+    UNIQUE INDEX `UQ_Search_Object` (`Object_Type`, `Object_ID`),
+    INDEX `IX_Search_Key` (`Search_Key`),
+    FULLTEXT INDEX `FT_Search_Content` (`Content`) WITH PARSER ngram
+) ENGINE=InnoDB COMMENT='搜索索引';
+
+/* * 表: Change_Log * 描述:  变更日志 (CDC), 由 triggers.sql 中的 TRG_*_Change_Log_* 触发器追加, Change_ID 为全局序号 */
+CREATE TABLE `Change_Log` (
+    `Change_ID` BIGINT NOT NULL AUTO_INCREMENT COMMENT '变更序号',
+    `Table_Name` VARCHAR(30) NOT NULL COMMENT '来源表 (Task, Yard_Slot, Container_Master, Vessel_Visit)',
+    `Row_ID` INT NOT NULL COMMENT '记录编号',
+    `Operation` CHAR(1) NOT NULL COMMENT '操作 (I 插入, U 更新, D 删除)',
+    `Old_Status` VARCHAR(20) NULL COMMENT '原状态',
+    `New_Status` VARCHAR(20) NULL COMMENT '新状态',
+    `Detail` JSON NULL COMMENT '变更后 (删除时为删除前) 的关键列',
+    `Changed_At` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) COMMENT '变更时间',
+    PRIMARY KEY (`Change_ID`),
+    INDEX `IX_Change_Log_Row` (`Table_Name`, `Row_ID`)
+) ENGINE=InnoDB COMMENT='变更日志';
+
+/* * 表: Change_Log_Consumer * 描述:  变更日志各消费方已处理到的序号 */
+CREATE TABLE `Change_Log_Consumer` (
+    `Consumer` VARCHAR(50) NOT NULL COMMENT '消费方',
+    `Position` BIGINT NOT NULL DEFAULT 0 COMMENT '已处理序号',
+    `Updated_At` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
+    PRIMARY KEY (`Consumer`)
+) ENGINE=InnoDB COMMENT='变更日志消费位置';
+
+/* * 表: Container_Movement * 描述:  集装箱位置变化历史, 由 container_movements sync 从变更日志写入
+ * 按 Moved_At 按月分区 (分区表的主键需包含分区列且不能有外键), container_movements partitions 每月从 p_future 拆出新月份 */
+CREATE TABLE `Container_Movement` (
+    `Movement_ID` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录编号',
+    `Container_Master_ID` INT NOT NULL COMMENT '集装箱编号',
+    `Location_Type` VARCHAR(10) NOT NULL COMMENT '位置类型 (Yard, Vessel, Gate)',
+    `Slot_ID` INT NULL COMMENT '箱位编号 (在堆场时)',
+    `Block_ID` INT NULL COMMENT '堆场区编号 (在堆场时)',
+    `Vessel_Visit_ID` INT NULL COMMENT '船舶访问编号 (在船上时)',
+    `Task_ID` INT NULL COMMENT '产生该位置的任务',
+    `Moved_At` DATETIME(6) NOT NULL COMMENT '到达时间',
+    `Left_At` DATETIME(6) NULL COMMENT '离开时间 (当前位置为 NULL)',
+    PRIMARY KEY (`Movement_ID`, `Moved_At`),
+    INDEX `IX_Movement_Container` (`Container_Master_ID`, `Moved_At`),
+    INDEX `IX_Movement_Block` (`Block_ID`, `Left_At`, `Moved_At`)
+) ENGINE=InnoDB COMMENT='集装箱移动历史'
+PARTITION BY RANGE COLUMNS(`Moved_At`) (
+    PARTITION `p_history` VALUES LESS THAN ('2026-01-01'),
+    PARTITION `p_future` VALUES LESS THAN (MAXVALUE)
+);
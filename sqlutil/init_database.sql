@@ -174,12 +174,14 @@ CREATE TABLE `Yard_Slot` (
     `Slot_Coordinates` VARCHAR(50) NOT NULL COMMENT '坐标',
     `Slot_Status` VARCHAR(20) NOT NULL DEFAULT 'Available' COMMENT '状态',
     `Current_Container_ID` INT NULL COMMENT '当前集装箱编号',
+    `Reserved_At` DATETIME(6) NULL COMMENT '预留时间 (箱位分配器预留, 超时未被任务引用时归还)',
     PRIMARY KEY (`Slot_ID`),
     UNIQUE INDEX `UQ_Slot_Coordinates` (`Slot_Coordinates`),
     UNIQUE INDEX `UQ_Stack_Tier` (`Stack_ID`, `Tier_Number`),
     UNIQUE INDEX `UQ_Slot_Container` (`Current_Container_ID`),
     CONSTRAINT `FK_Slot_belongs_to_Stack` FOREIGN KEY (`Stack_ID`) REFERENCES `Yard_Stack`(`Stack_ID`),
-    CONSTRAINT `FK_Slot_occupied_by_Container` FOREIGN KEY (`Current_Container_ID`) REFERENCES `Container_Master`(`Container_Master_ID`)
+    CONSTRAINT `FK_Slot_occupied_by_Container` FOREIGN KEY (`Current_Container_ID`) REFERENCES `Container_Master`(`Container_Master_ID`),
+    INDEX `IX_Slot_Status` (`Slot_Status`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='箱位';
 
 /* 表: Vessel_Visit - 船舶的单次挂靠, 核心枢纽 */
@@ -197,7 +199,9 @@ CREATE TABLE `Vessel_Visit` (
     CONSTRAINT `FK_Visit_is_for_Vessel` FOREIGN KEY (`Vessel_ID`) REFERENCES `Vessel_Master`(`Vessel_ID`),
     CONSTRAINT `FK_Visit_is_at_Port` FOREIGN KEY (`Port_ID`) REFERENCES `Port_Master`(`Port_ID`),
     CONSTRAINT `FK_Visit_at_Berth` FOREIGN KEY (`Berth_ID`) REFERENCES `Berth`(`Berth_ID`),
-    CONSTRAINT `CHK_Visit_Time_Logic` CHECK (`ATD` >= `ATA` OR `ATD` IS NULL)
+    CONSTRAINT `CHK_Visit_Time_Logic` CHECK (`ATD` >= `ATA` OR `ATD` IS NULL),
+    INDEX `IX_Visit_Status` (`Status`),
+    INDEX `IX_Visit_ATA` (`ATA`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='船舶访问';
 
 -- =========================================
@@ -242,9 +246,96 @@ CREATE TABLE `Task` (
     CONSTRAINT `FK_Task_related_to_Visit` FOREIGN KEY (`Vessel_Visit_ID`) REFERENCES `Vessel_Visit`(`Vessel_Visit_ID`),
     CONSTRAINT `FK_Task_created_by_User` FOREIGN KEY (`Created_By_User_ID`) REFERENCES `Users`(`User_ID`),
     CONSTRAINT `FK_Task_assigned_to_User` FOREIGN KEY (`Assigned_User_ID`) REFERENCES `Users`(`User_ID`),
-    CONSTRAINT `FK_Task_executed_by_User` FOREIGN KEY (`Actual_Executor_ID`) REFERENCES `Users`(`User_ID`)
+    CONSTRAINT `FK_Task_executed_by_User` FOREIGN KEY (`Actual_Executor_ID`) REFERENCES `Users`(`User_ID`),
+    INDEX `IX_Task_Assigned_Status` (`Assigned_User_ID`, `Status`, `Priority`),
+    INDEX `IX_Task_Executor_Status` (`Actual_Executor_ID`, `Status`),
+    INDEX `IX_Task_Status_Priority` (`Status`, `Priority`),
+    INDEX `IX_Task_Type` (`Task_Type`),
+    INDEX `IX_Task_Queue` (`Status`, `Task_Type`, `Priority`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='作业任务 (计划与执行)';
 
+/* 表: Container_Movement - 集装箱位置变化历史 (按 Moved_At 按月分区, 由 container_movements sync 从变更日志写入) */
+CREATE TABLE `Container_Movement` (
+    `Movement_ID` BIGINT NOT NULL AUTO_INCREMENT COMMENT '记录编号',
+    `Container_Master_ID` INT NOT NULL COMMENT '集装箱编号',
+    `Location_Type` VARCHAR(10) NOT NULL COMMENT '位置类型 (Yard, Vessel, Gate)',
+    `Slot_ID` INT NULL COMMENT '箱位编号 (在堆场时)',
+    `Block_ID` INT NULL COMMENT '堆场区编号 (在堆场时)',
+    `Vessel_Visit_ID` INT NULL COMMENT '船舶访问编号 (在船上时)',
+    `Task_ID` INT NULL COMMENT '产生该位置的任务',
+    `Moved_At` DATETIME(6) NOT NULL COMMENT '到达时间',
+    `Left_At` DATETIME(6) NULL COMMENT '离开时间 (当前位置为 NULL)',
+    PRIMARY KEY (`Movement_ID`, `Moved_At`),
+    INDEX `IX_Movement_Container` (`Container_Master_ID`, `Moved_At`),
+    INDEX `IX_Movement_Block` (`Block_ID`, `Left_At`, `Moved_At`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='集装箱移动历史'
+PARTITION BY RANGE COLUMNS(`Moved_At`) (
+    PARTITION `p_history` VALUES LESS THAN ('2026-01-01'),
+    PARTITION `p_future` VALUES LESS THAN (MAXVALUE)
+);
+
+-- =========================================
+-- 组 4b: 派生汇总表与变更日志
+-- TRG_Task_Complete_Update_Container / TRG_Task_Complete_Update_Slot 会写入 Status_Counter 与 Yard_Utilization，
+-- 必须在安装 triggers.sql 之前创建；初始数据由 reconcile_status_counters、refresh_yard_utilization、rebuild_search_index 命令生成
+-- =========================================
+
+/* 表: Status_Counter - 各业务表按状态的记录数, 替代全表 COUNT(*) GROUP BY */
+CREATE TABLE `Status_Counter` (
+    `Counter_ID` INT NOT NULL AUTO_INCREMENT COMMENT '计数编号',
+    `Source_Table` VARCHAR(50) NOT NULL COMMENT '来源表 (Task, Container_Master, Vessel_Visit)',
+    `Status` VARCHAR(20) NOT NULL DEFAULT '' COMMENT '状态 (空字符串表示 NULL)',
+    `Total` BIGINT NOT NULL DEFAULT 0 COMMENT '数量',
+    PRIMARY KEY (`Counter_ID`),
+    UNIQUE INDEX `UQ_Counter_Source_Status` (`Source_Table`, `Status`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='状态计数';
+
+/* 表: Yard_Utilization - 按堆场区物化的利用率快照, 替代 View_Yard_Utilization 的全表聚合 */
+CREATE TABLE `Yard_Utilization` (
+    `Block_ID` INT NOT NULL COMMENT '堆场区编号',
+    `Stack_Count` INT NOT NULL DEFAULT 0 COMMENT '堆栈总数',
+    `Slot_Count` INT NOT NULL DEFAULT 0 COMMENT '箱位总数',
+    `Occupied_Count` INT NOT NULL DEFAULT 0 COMMENT '已占用箱位数',
+    `Updated_At` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (`Block_ID`),
+    CONSTRAINT `FK_Utilization_of_Block` FOREIGN KEY (`Block_ID`) REFERENCES `Yard_Block`(`Block_ID`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='堆场利用率';
+
+/* 表: Search_Index - 聚合搜索索引, Content 汇总箱号/订舱号/航次号/船名/相关方名称/SCAC 等关键字 */
+CREATE TABLE `Search_Index` (
+    `Entry_ID` INT NOT NULL AUTO_INCREMENT COMMENT '索引编号',
+    `Object_Type` VARCHAR(20) NOT NULL COMMENT '对象类型 (container, booking, task, visit, party)',
+    `Object_ID` INT NOT NULL COMMENT '对象编号',
+    `Search_Key` VARCHAR(255) NOT NULL COMMENT '主标识 (箱号、订舱号等)',
+    `Content` LONGTEXT NOT NULL COMMENT '索引内容',
+    PRIMARY KEY (`Entry_ID`),
+    UNIQUE INDEX `UQ_Search_Object` (`Object_Type`, `Object_ID`),
+    INDEX `IX_Search_Key` (`Search_Key`),
+    FULLTEXT INDEX `FT_Search_Content` (`Content`) WITH PARSER ngram
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='搜索索引';
+
+/* 表: Change_Log - 变更日志 (CDC), 由 triggers.sql 中的 TRG_*_Change_Log_* 触发器追加, Change_ID 为全局序号 */
+CREATE TABLE `Change_Log` (
+    `Change_ID` BIGINT NOT NULL AUTO_INCREMENT COMMENT '变更序号',
+    `Table_Name` VARCHAR(30) NOT NULL COMMENT '来源表 (Task, Yard_Slot, Container_Master, Vessel_Visit)',
+    `Row_ID` INT NOT NULL COMMENT '记录编号',
+    `Operation` CHAR(1) NOT NULL COMMENT '操作 (I 插入, U 更新, D 删除)',
+    `Old_Status` VARCHAR(20) NULL COMMENT '原状态',
+    `New_Status` VARCHAR(20) NULL COMMENT '新状态',
+    `Detail` JSON NULL COMMENT '变更后 (删除时为删除前) 的关键列',
+    `Changed_At` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) COMMENT '变更时间',
+    PRIMARY KEY (`Change_ID`),
+    INDEX `IX_Change_Log_Row` (`Table_Name`, `Row_ID`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='变更日志';
+
+/* 表: Change_Log_Consumer - 变更日志各消费方已处理到的序号 */
+CREATE TABLE `Change_Log_Consumer` (
+    `Consumer` VARCHAR(50) NOT NULL COMMENT '消费方',
+    `Position` BIGINT NOT NULL DEFAULT 0 COMMENT '已处理序号',
+    `Updated_At` DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
+    PRIMARY KEY (`Consumer`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='变更日志消费位置';
+
 -- =========================================
 -- 组 5: 视图
 -- =========================================
@@ -489,9 +580,15 @@ LEFT JOIN `Party` p ON cm.Owner_Party_ID = p.Party_ID
 LEFT JOIN `Yard_Slot` slot ON slot.Current_Container_ID = cm.Container_Master_ID
 LEFT JOIN `Yard_Stack` ys ON slot.Stack_ID = ys.Stack_ID
 LEFT JOIN `Yard_Block` yb ON ys.Block_ID = yb.Block_ID
-LEFT JOIN `Task` t ON t.Container_Master_ID = cm.Container_Master_ID 
-    AND t.Status = 'Completed' 
-    AND t.Task_Type = 'Load'
+LEFT JOIN `Task` t ON cm.Current_Status = 'OnVessel'
+    AND t.Task_ID = (
+        SELECT t2.Task_ID FROM `Task` t2
+        WHERE t2.Container_Master_ID = cm.Container_Master_ID
+            AND t2.Status = 'Completed'
+            AND t2.Task_Type = 'Load'
+        ORDER BY t2.Movement_Timestamp DESC, t2.Task_ID DESC
+        LIMIT 1
+    )
 LEFT JOIN `Vessel_Visit` vv ON t.Vessel_Visit_ID = vv.Vessel_Visit_ID
 LEFT JOIN `Vessel_Master` vm ON vv.Vessel_ID = vm.Vessel_ID;
 
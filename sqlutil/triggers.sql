@@ -11,8 +11,9 @@ USE `box_management`;
 -- =========================================
 -- 触发器1：任务完成时自动更新集装箱状态
 -- =========================================
--- 功能：当任务状态更新为"已完成"时，根据任务类型自动更新集装箱的当前状态
--- 联动：Task 表 → Container_Master 表
+-- 功能：当任务状态更新为"已完成"时，根据任务类型自动更新集装箱的当前状态，
+--       并同步维护 Status_Counter 中 Container_Master 的状态计数
+-- 联动：Task 表 → Container_Master 表 / Status_Counter 表
 
 DELIMITER $$
 
@@ -22,31 +23,42 @@ CREATE TRIGGER `TRG_Task_Complete_Update_Container`
 AFTER UPDATE ON `Task`
 FOR EACH ROW
 BEGIN
-    -- 只有当状态从非"已完成"变为"已完成"时才执行
-    IF NEW.Status = 'Completed' AND OLD.Status != 'Completed' THEN
+    DECLARE v_old_status VARCHAR(20) DEFAULT NULL;
+    DECLARE v_new_status VARCHAR(20) DEFAULT NULL;
+
+    -- 只有当状态从非"已完成"变为"已完成"时才执行；
+    -- 批量完成（task_batch.py）在会话中设置 @tos_batch_mode = 1 并自行做集合式更新，此时跳过
+    IF NEW.Status = 'Completed' AND OLD.Status != 'Completed' AND IFNULL(@tos_batch_mode, 0) = 0 THEN
         -- 装船任务：集装箱状态更新为"在船上"
-        IF NEW.Task_Type = 'Load' THEN
-            UPDATE Container_Master 
-            SET Current_Status = 'OnVessel'
-            WHERE Container_Master_ID = NEW.Container_Master_ID;
-        
-        -- 卸船任务：集装箱状态更新为"在堆场"
-        ELSEIF NEW.Task_Type = 'Discharge' THEN
-            UPDATE Container_Master 
-            SET Current_Status = 'InYard'
-            WHERE Container_Master_ID = NEW.Container_Master_ID;
-        
+        -- 卸船/进闸任务：集装箱状态更新为"在堆场"
         -- 出闸任务：集装箱状态更新为"已出闸"
-        ELSEIF NEW.Task_Type = 'GateOut' THEN
-            UPDATE Container_Master 
-            SET Current_Status = 'GateOut'
+        SET v_new_status = CASE NEW.Task_Type
+            WHEN 'Load' THEN 'OnVessel'
+            WHEN 'Discharge' THEN 'InYard'
+            WHEN 'GateOut' THEN 'GateOut'
+            WHEN 'GateIn' THEN 'InYard'
+            ELSE NULL
+        END;
+
+        IF v_new_status IS NOT NULL THEN
+            SELECT Current_Status INTO v_old_status
+            FROM Container_Master
             WHERE Container_Master_ID = NEW.Container_Master_ID;
-        
-        -- 进闸任务：集装箱状态更新为"在堆场"
-        ELSEIF NEW.Task_Type = 'GateIn' THEN
+
             UPDATE Container_Master 
-            SET Current_Status = 'InYard'
+            SET Current_Status = v_new_status
             WHERE Container_Master_ID = NEW.Container_Master_ID;
+
+            -- 状态计数：旧状态 -1，新状态 +1（NULL 状态以空字符串记录）
+            IF NOT (v_old_status <=> v_new_status) THEN
+                INSERT INTO Status_Counter (Source_Table, Status, Total)
+                VALUES ('Container_Master', IFNULL(v_old_status, ''), -1)
+                ON DUPLICATE KEY UPDATE Total = Total - 1;
+
+                INSERT INTO Status_Counter (Source_Table, Status, Total)
+                VALUES ('Container_Master', v_new_status, 1)
+                ON DUPLICATE KEY UPDATE Total = Total + 1;
+            END IF;
         END IF;
     END IF;
 END$$
@@ -56,8 +68,9 @@ DELIMITER ;
 -- =========================================
 -- 触发器2：任务完成时自动更新箱位状态
 -- =========================================
--- 功能：当任务完成时，自动更新起始箱位和目标箱位的状态
--- 联动：Task 表 → Yard_Slot 表
+-- 功能：当任务完成时，自动更新起始箱位和目标箱位的状态，
+--       并同步维护 Yard_Utilization 中各堆场区的已占用箱位数
+-- 联动：Task 表 → Yard_Slot 表 / Yard_Utilization 表
 
 DELIMITER $$
 
@@ -67,8 +80,31 @@ CREATE TRIGGER `TRG_Task_Complete_Update_Slot`
 AFTER UPDATE ON `Task`
 FOR EACH ROW
 BEGIN
-    -- 只有当状态从非"已完成"变为"已完成"时才执行
-    IF NEW.Status = 'Completed' AND OLD.Status != 'Completed' THEN
+    DECLARE v_from_block INT DEFAULT NULL;
+    DECLARE v_from_occupied TINYINT DEFAULT 0;
+    DECLARE v_to_block INT DEFAULT NULL;
+    DECLARE v_to_occupied TINYINT DEFAULT 0;
+
+    -- 只有当状态从非"已完成"变为"已完成"时才执行；
+    -- 批量完成（task_batch.py）在会话中设置 @tos_batch_mode = 1 并自行做集合式更新，此时跳过
+    IF NEW.Status = 'Completed' AND OLD.Status != 'Completed' AND IFNULL(@tos_batch_mode, 0) = 0 THEN
+        -- 记录起始/目标箱位所在堆场区及更新前是否占用
+        IF NEW.From_Slot_ID IS NOT NULL THEN
+            SELECT st.Block_ID, (s.Current_Container_ID IS NOT NULL)
+            INTO v_from_block, v_from_occupied
+            FROM Yard_Slot s
+            JOIN Yard_Stack st ON s.Stack_ID = st.Stack_ID
+            WHERE s.Slot_ID = NEW.From_Slot_ID;
+        END IF;
+
+        IF NEW.To_Slot_ID IS NOT NULL THEN
+            SELECT st.Block_ID, (s.Current_Container_ID IS NOT NULL)
+            INTO v_to_block, v_to_occupied
+            FROM Yard_Slot s
+            JOIN Yard_Stack st ON s.Stack_ID = st.Stack_ID
+            WHERE s.Slot_ID = NEW.To_Slot_ID;
+        END IF;
+
         -- 清空起始箱位的集装箱，设置为可用状态
         UPDATE Yard_Slot 
         SET Current_Container_ID = NULL,
@@ -80,6 +116,21 @@ BEGIN
         SET Current_Container_ID = NEW.Container_Master_ID,
             Slot_Status = 'Occupied'
         WHERE Slot_ID = NEW.To_Slot_ID;
+
+        -- 利用率快照：起始箱位由占用变为空闲 -1，目标箱位由空闲变为占用 +1
+        IF NOT (NEW.From_Slot_ID <=> NEW.To_Slot_ID) THEN
+            IF v_from_block IS NOT NULL AND v_from_occupied THEN
+                UPDATE Yard_Utilization
+                SET Occupied_Count = Occupied_Count - 1
+                WHERE Block_ID = v_from_block;
+            END IF;
+
+            IF v_to_block IS NOT NULL AND NOT v_to_occupied THEN
+                UPDATE Yard_Utilization
+                SET Occupied_Count = Occupied_Count + 1
+                WHERE Block_ID = v_to_block;
+            END IF;
+        END IF;
     END IF;
 END$$
 
@@ -175,6 +226,164 @@ END$$
 
 DELIMITER ;
 
+-- =========================================
+-- 触发器7：变更日志（CDC）
+-- =========================================
+-- 功能：Task / Yard_Slot / Container_Master / Vessel_Visit 的每次插入、更新、删除
+--       向 Change_Log 追加一行（来源表、记录编号、操作、原/新状态、关键列 JSON），
+--       触发器联动与批量 SQL 的修改同样记录；消费方按 Change_ID 增量读取（management/change_log.py）
+-- 联动：Task / Yard_Slot / Container_Master / Vessel_Visit 表 → Change_Log 表
+-- 说明：与迁移 0009 / 0013 安装的触发器相同，语句由 change_log.trigger_sql 生成；
+--       会话变量 @tos_skip_change_log = 1 时不记录（压测数据加载，change_log.suppressed）
+
+DELIMITER $$
+
+DROP TRIGGER IF EXISTS `TRG_Task_Change_Log_Insert`$$
+
+CREATE TRIGGER `TRG_Task_Change_Log_Insert`
+AFTER INSERT ON `Task`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Task', NEW.`Task_ID`, 'I', NULL, NEW.`Status`, JSON_OBJECT('Task_Type', NEW.`Task_Type`, 'Container_Master_ID', NEW.`Container_Master_ID`, 'From_Slot_ID', NEW.`From_Slot_ID`, 'To_Slot_ID', NEW.`To_Slot_ID`, 'Vessel_Visit_ID', NEW.`Vessel_Visit_ID`, 'Assigned_User_ID', NEW.`Assigned_User_ID`, 'Priority', NEW.`Priority`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Task_Change_Log_Update`$$
+
+CREATE TRIGGER `TRG_Task_Change_Log_Update`
+AFTER UPDATE ON `Task`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Task', NEW.`Task_ID`, 'U', OLD.`Status`, NEW.`Status`, JSON_OBJECT('Task_Type', NEW.`Task_Type`, 'Container_Master_ID', NEW.`Container_Master_ID`, 'From_Slot_ID', NEW.`From_Slot_ID`, 'To_Slot_ID', NEW.`To_Slot_ID`, 'Vessel_Visit_ID', NEW.`Vessel_Visit_ID`, 'Assigned_User_ID', NEW.`Assigned_User_ID`, 'Priority', NEW.`Priority`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Task_Change_Log_Delete`$$
+
+CREATE TRIGGER `TRG_Task_Change_Log_Delete`
+AFTER DELETE ON `Task`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Task', OLD.`Task_ID`, 'D', NULL, NULL, JSON_OBJECT('Task_Type', OLD.`Task_Type`, 'Container_Master_ID', OLD.`Container_Master_ID`, 'From_Slot_ID', OLD.`From_Slot_ID`, 'To_Slot_ID', OLD.`To_Slot_ID`, 'Vessel_Visit_ID', OLD.`Vessel_Visit_ID`, 'Assigned_User_ID', OLD.`Assigned_User_ID`, 'Priority', OLD.`Priority`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Yard_Slot_Change_Log_Insert`$$
+
+CREATE TRIGGER `TRG_Yard_Slot_Change_Log_Insert`
+AFTER INSERT ON `Yard_Slot`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Yard_Slot', NEW.`Slot_ID`, 'I', NULL, NEW.`Slot_Status`, JSON_OBJECT('Stack_ID', NEW.`Stack_ID`, 'Slot_Coordinates', NEW.`Slot_Coordinates`, 'Current_Container_ID', NEW.`Current_Container_ID`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Yard_Slot_Change_Log_Update`$$
+
+CREATE TRIGGER `TRG_Yard_Slot_Change_Log_Update`
+AFTER UPDATE ON `Yard_Slot`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Yard_Slot', NEW.`Slot_ID`, 'U', OLD.`Slot_Status`, NEW.`Slot_Status`, JSON_OBJECT('Stack_ID', NEW.`Stack_ID`, 'Slot_Coordinates', NEW.`Slot_Coordinates`, 'Current_Container_ID', NEW.`Current_Container_ID`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Yard_Slot_Change_Log_Delete`$$
+
+CREATE TRIGGER `TRG_Yard_Slot_Change_Log_Delete`
+AFTER DELETE ON `Yard_Slot`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Yard_Slot', OLD.`Slot_ID`, 'D', NULL, NULL, JSON_OBJECT('Stack_ID', OLD.`Stack_ID`, 'Slot_Coordinates', OLD.`Slot_Coordinates`, 'Current_Container_ID', OLD.`Current_Container_ID`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Container_Master_Change_Log_Insert`$$
+
+CREATE TRIGGER `TRG_Container_Master_Change_Log_Insert`
+AFTER INSERT ON `Container_Master`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Container_Master', NEW.`Container_Master_ID`, 'I', NULL, NEW.`Current_Status`, JSON_OBJECT('Container_Number', NEW.`Container_Number`, 'Type_Code', NEW.`Type_Code`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Container_Master_Change_Log_Update`$$
+
+CREATE TRIGGER `TRG_Container_Master_Change_Log_Update`
+AFTER UPDATE ON `Container_Master`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Container_Master', NEW.`Container_Master_ID`, 'U', OLD.`Current_Status`, NEW.`Current_Status`, JSON_OBJECT('Container_Number', NEW.`Container_Number`, 'Type_Code', NEW.`Type_Code`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Container_Master_Change_Log_Delete`$$
+
+CREATE TRIGGER `TRG_Container_Master_Change_Log_Delete`
+AFTER DELETE ON `Container_Master`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Container_Master', OLD.`Container_Master_ID`, 'D', NULL, NULL, JSON_OBJECT('Container_Number', OLD.`Container_Number`, 'Type_Code', OLD.`Type_Code`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Vessel_Visit_Change_Log_Insert`$$
+
+CREATE TRIGGER `TRG_Vessel_Visit_Change_Log_Insert`
+AFTER INSERT ON `Vessel_Visit`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Vessel_Visit', NEW.`Vessel_Visit_ID`, 'I', NULL, NEW.`Status`, JSON_OBJECT('Vessel_ID', NEW.`Vessel_ID`, 'Berth_ID', NEW.`Berth_ID`, 'ATA', NEW.`ATA`, 'ATD', NEW.`ATD`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Vessel_Visit_Change_Log_Update`$$
+
+CREATE TRIGGER `TRG_Vessel_Visit_Change_Log_Update`
+AFTER UPDATE ON `Vessel_Visit`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Vessel_Visit', NEW.`Vessel_Visit_ID`, 'U', OLD.`Status`, NEW.`Status`, JSON_OBJECT('Vessel_ID', NEW.`Vessel_ID`, 'Berth_ID', NEW.`Berth_ID`, 'ATA', NEW.`ATA`, 'ATD', NEW.`ATD`));
+    END IF;
+END$$
+
+DROP TRIGGER IF EXISTS `TRG_Vessel_Visit_Change_Log_Delete`$$
+
+CREATE TRIGGER `TRG_Vessel_Visit_Change_Log_Delete`
+AFTER DELETE ON `Vessel_Visit`
+FOR EACH ROW
+BEGIN
+    IF IFNULL(@tos_skip_change_log, 0) = 0 THEN
+        INSERT INTO `Change_Log` (`Table_Name`, `Row_ID`, `Operation`, `Old_Status`, `New_Status`, `Detail`)
+        VALUES ('Vessel_Visit', OLD.`Vessel_Visit_ID`, 'D', NULL, NULL, JSON_OBJECT('Vessel_ID', OLD.`Vessel_ID`, 'Berth_ID', OLD.`Berth_ID`, 'ATA', OLD.`ATA`, 'ATD', OLD.`ATD`));
+    END IF;
+END$$
+
+DELIMITER ;
+
 -- =========================================
 -- 验证触发器创建成功
 -- =========================================
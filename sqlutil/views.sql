@@ -270,6 +270,7 @@ GROUP BY u.User_ID, u.Username, u.Full_Name;
 -- 视图9：集装箱位置追踪视图
 -- =========================================
 -- 功能：显示所有集装箱的当前位置和状态
+-- 船上位置取自该集装箱最近一次完成的 Load 任务（相关子查询每个集装箱至多取一条），多次装船的集装箱不会重复成多行
 CREATE OR REPLACE VIEW `View_Container_Location_Tracking` AS
 SELECT 
     cm.Container_Master_ID AS 集装箱编号,
@@ -316,9 +317,15 @@ LEFT JOIN `Party` p ON cm.Owner_Party_ID = p.Party_ID
 LEFT JOIN `Yard_Slot` slot ON slot.Current_Container_ID = cm.Container_Master_ID
 LEFT JOIN `Yard_Stack` ys ON slot.Stack_ID = ys.Stack_ID
 LEFT JOIN `Yard_Block` yb ON ys.Block_ID = yb.Block_ID
-LEFT JOIN `Task` t ON t.Container_Master_ID = cm.Container_Master_ID 
-    AND t.Status = 'Completed' 
-    AND t.Task_Type = 'Load'
+LEFT JOIN `Task` t ON cm.Current_Status = 'OnVessel'
+    AND t.Task_ID = (
+        SELECT t2.Task_ID FROM `Task` t2
+        WHERE t2.Container_Master_ID = cm.Container_Master_ID
+            AND t2.Status = 'Completed'
+            AND t2.Task_Type = 'Load'
+        ORDER BY t2.Movement_Timestamp DESC, t2.Task_ID DESC
+        LIMIT 1
+    )
 LEFT JOIN `Vessel_Visit` vv ON t.Vessel_Visit_ID = vv.Vessel_Visit_ID
 LEFT JOIN `Vessel_Master` vm ON vv.Vessel_ID = vm.Vessel_ID;
 